@@ -1,4 +1,4 @@
 @echo off
 cd /d C:\Helios
 call venv\Scripts\activate.bat
-python core_py\modules\fss\starling_ingestion.py
\ No newline at end of file
+python -m core_py.modules.fss.starling.ingestion
\ No newline at end of file
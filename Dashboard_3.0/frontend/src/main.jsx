@@ -2,9 +2,13 @@ import { StrictMode } from 'react'
 import { createRoot } from 'react-dom/client'
 import './index.css'
 import App from './App.jsx'
+import RealtimeProvider from './context/RealtimeProvider.jsx'
 
 createRoot(document.getElementById('root')).render(
   <StrictMode>
-    <App />
+    {/* one websocket for the whole app; dashboards subscribe via useRealtime() */}
+    <RealtimeProvider>
+      <App />
+    </RealtimeProvider>
   </StrictMode>,
 )
@@ -10,7 +10,7 @@ import ShutdownComplete from "../../components/ShutdownComplete.jsx";
 import Card from "../../components/Card.jsx";
 import Button from "../../components/Button.jsx";
 import Skeleton from "../../components/Skeleton.jsx";
-import RealtimeProvider, { useRealtime } from "../../context/RealtimeProvider.jsx";
+import { useRealtime } from "../../context/RealtimeProvider.jsx";
 import { getJSON, postJSON } from "../../lib/api.js";
 import TodayPanel from "../../components/TodayPanel";
 
@@ -21,14 +21,6 @@ import FixedDeadlinesCard from "../../components/FixedDeadlinesCard.jsx"; // use
 import useHotkeys from "../../hooks/useHotkeys.js";
 
 export default function HeliosDashboard() {
-  return (
-    <RealtimeProvider>
-      <HeliosDashboardBody />
-    </RealtimeProvider>
-  );
-}
-
-function HeliosDashboardBody() {
   const [showSplash, setShowSplash] = useState(true);
   const [shutdownTriggered, setShutdownTriggered] = useState(false);
 
@@ -120,6 +112,20 @@ function HeliosDashboardBody() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [rt, personalTasks]);
 
+  // change feed: refetch only when the backend says tasks / FSS rows changed
+  useEffect(() => {
+    const offTasks = rt.on("tasks", () => fetchTriagedTasks());
+    const offFss = rt.on("fss", async () => {
+      try {
+        setFssSnapshot(await getJSON("/api/fss/snapshot"));
+      } catch (e) {
+        console.error("❌ fss snapshot refetch failed", e);
+      }
+    });
+    return () => { offTasks(); offFss(); };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [rt]);
+
   // API helpers
   async function fetchTriagedTasks(runTriage = false) {
     try {
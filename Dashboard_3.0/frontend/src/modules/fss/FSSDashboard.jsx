@@ -3,9 +3,14 @@ import React, { useEffect, useState } from "react";
 import DashboardLayout from "../../components/DashboardLayout.jsx";
 import Card from "../../components/Card.jsx";
 import Button from "../../components/Button.jsx";
+import { useRealtime } from "../../context/RealtimeProvider.jsx";
 import { API_BASE } from "../../config"; // unchanged
 
+// Live balances come from the bank API (not the change feed), so keep a slow fallback poll.
+const BALANCE_FALLBACK_POLL_MS = 5 * 60_000;
+
 export default function FSSDashboard() {
+  const rt = useRealtime();
   const [balances, setBalances] = useState(null);
   const [advice, setAdvice] = useState(null);     // can be object/string/array
   const [adviceRaw, setAdviceRaw] = useState(null); // raw payload for debugging
@@ -59,9 +64,10 @@ export default function FSSDashboard() {
     };
 
     fetchData();
-    const id = setInterval(fetchData, 60_000);
-    return () => clearInterval(id);
-  }, []);
+    const off = rt.on("fss", fetchData);
+    const id = setInterval(fetchData, BALANCE_FALLBACK_POLL_MS);
+    return () => { off(); clearInterval(id); };
+  }, [rt]);
 
   return (
     <DashboardLayout
@@ -0,0 +1,41 @@
+"""add feed_item_uid + unique index to the Starling transaction tables
+
+Revision ID: e9b653e3e252
+Revises: 478db40f2539
+Create Date: 2026-10-18 23:40:00
+
+Rows written before this column existed keep feed_item_uid NULL; the Starling
+ingestion adopts them (matching on day, amount, direction and counterparty) the
+first time their feed item comes through, instead of inserting a duplicate.
+IF NOT EXISTS because the ingestion DDL may already have added both.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9b653e3e252'
+down_revision: Union[str, Sequence[str], None] = '478db40f2539'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("transaction_efkaristo", "transaction_personal")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        if not inspector.has_table(table):
+            continue
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS feed_item_uid VARCHAR")
+        op.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_feed_item_uid_key ON {table} (feed_item_uid)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.execute(f"DROP INDEX IF EXISTS {table}_feed_item_uid_key")
+        op.execute(f"ALTER TABLE IF EXISTS {table} DROP COLUMN IF EXISTS feed_item_uid")
@@ -0,0 +1,268 @@
+# core_py/db/balances_pg.py
+# Account balance time series.
+#
+# helios.balance_history  append-only snapshots, range-partitioned by month on as_of
+#                         (partitions are created on demand before each insert)
+# helios.balances_latest  one row per account, upserted in the same transaction as
+#                         each insert, so live-balance reads are O(accounts)
+# helios.balances_daily   per account per local day (HELIOS_TZ): open/close/min/max and
+#                         sample count, re-derived for the days an insert touches
+#
+# On first use, if nothing has been recorded yet, rows from legacy.balances are imported,
+# re-keyed by account name onto the ids live Starling reads use (see _live_account_ids).
+# Once live snapshots exist, accounts only the legacy import knows about are dropped
+# from balances_latest so they aren't summed alongside the live ones.
+
+import datetime as dt
+import os
+from typing import Dict, Iterable, List, Mapping, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from core_py.db.session import db_session
+
+_TZ_NAME = os.getenv("HELIOS_TZ", "Europe/London")
+_TZ = ZoneInfo(_TZ_NAME)
+
+DDL = """
+CREATE SCHEMA IF NOT EXISTS helios;
+CREATE TABLE IF NOT EXISTS helios.balance_history (
+  account_id    TEXT NOT NULL,
+  account_name  TEXT,
+  currency      TEXT,
+  balance       NUMERIC NOT NULL,
+  as_of         TIMESTAMPTZ NOT NULL,
+  source        TEXT,
+  recorded_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (account_id, as_of)
+) PARTITION BY RANGE (as_of);
+CREATE TABLE IF NOT EXISTS helios.balances_latest (
+  account_id    TEXT PRIMARY KEY,
+  account_name  TEXT,
+  currency      TEXT,
+  balance       NUMERIC NOT NULL,
+  as_of         TIMESTAMPTZ NOT NULL,
+  updated_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE TABLE IF NOT EXISTS helios.balances_daily (
+  account_id     TEXT NOT NULL,
+  day            DATE NOT NULL,
+  open_balance   NUMERIC NOT NULL,
+  close_balance  NUMERIC NOT NULL,
+  min_balance    NUMERIC NOT NULL,
+  max_balance    NUMERIC NOT NULL,
+  samples        INT NOT NULL,
+  last_as_of     TIMESTAMPTZ NOT NULL,
+  PRIMARY KEY (account_id, day)
+);
+"""
+
+_DAILY_UPSERT = """
+    INSERT INTO helios.balances_daily
+      (account_id, day, open_balance, close_balance, min_balance, max_balance, samples, last_as_of)
+    SELECT account_id,
+           (as_of AT TIME ZONE :tz)::date,
+           (array_agg(balance ORDER BY as_of))[1],
+           (array_agg(balance ORDER BY as_of DESC))[1],
+           min(balance), max(balance), count(*), max(as_of)
+    FROM helios.balance_history
+    {where}
+    GROUP BY 1, 2
+    ON CONFLICT (account_id, day) DO UPDATE SET
+      open_balance=EXCLUDED.open_balance,
+      close_balance=EXCLUDED.close_balance,
+      min_balance=EXCLUDED.min_balance,
+      max_balance=EXCLUDED.max_balance,
+      samples=EXCLUDED.samples,
+      last_as_of=EXCLUDED.last_as_of
+"""
+
+_ddl_done = False
+_partitions: set = set()
+
+
+def _as_utc(ts) -> dt.datetime:
+    if isinstance(ts, str):
+        ts = dt.datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=dt.timezone.utc)
+    return ts.astimezone(dt.timezone.utc)
+
+
+def _ensure_partition(s, month: dt.date):
+    """Monthly partition holding `month` (first of month, UTC bounds)."""
+    month = month.replace(day=1)
+    if month in _partitions:
+        return
+    nxt = (month + dt.timedelta(days=32)).replace(day=1)
+    s.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS helios.balance_history_y{month.year}m{month.month:02d}
+        PARTITION OF helios.balance_history
+        FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{nxt.isoformat()} 00:00+00')
+    """))
+    _partitions.add(month)
+
+
+def _ensure(s):
+    global _ddl_done
+    if _ddl_done:
+        return
+    s.execute(text(DDL))
+    empty = s.execute(text("SELECT NOT EXISTS (SELECT 1 FROM helios.balances_latest)")).scalar()
+    if empty and s.execute(text("SELECT to_regclass('legacy.balances') IS NOT NULL")).scalar():
+        _import_legacy(s)
+    _ddl_done = True
+
+
+def _live_account_ids() -> Dict[str, str]:
+    """lower(account name) -> the account_id live reads record under (Starling account_uid, else the name)."""
+    out = {}
+    for name, env in (("efkaristo", "EFK_ACCOUNT_UID"), ("personal", "PERS_ACCOUNT_UID")):
+        out[name] = os.getenv(env) or name
+    return out
+
+
+def _import_legacy(s):
+    months = s.execute(text("""
+        SELECT DISTINCT date_trunc('month', as_of AT TIME ZONE 'UTC')::date
+        FROM legacy.balances WHERE as_of IS NOT NULL
+    """)).scalars().all()
+    for m in months:
+        _ensure_partition(s, m)
+    live = _live_account_ids()
+    s.execute(text("""
+        INSERT INTO helios.balance_history (account_id, account_name, currency, balance, as_of, source)
+        SELECT coalesce(m.live_id, b.account_id), b.account_name, NULL, b.balance, b.as_of, 'legacy'
+        FROM legacy.balances b
+        LEFT JOIN unnest(CAST(:names AS TEXT[]), CAST(:ids AS TEXT[])) AS m(name, live_id)
+          ON lower(btrim(b.account_name)) = m.name
+        WHERE b.account_id IS NOT NULL AND b.balance IS NOT NULL AND b.as_of IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """), {"names": list(live), "ids": list(live.values())})
+    rebuild_derived(s)
+
+
+def rebuild_derived(s):
+    """Recompute balances_latest and balances_daily from the full history."""
+    s.execute(text("DELETE FROM helios.balances_latest"))
+    s.execute(text("""
+        INSERT INTO helios.balances_latest (account_id, account_name, currency, balance, as_of)
+        SELECT DISTINCT ON (account_id) account_id, account_name, currency, balance, as_of
+        FROM helios.balance_history
+        ORDER BY account_id, as_of DESC
+    """))
+    s.execute(text("DELETE FROM helios.balances_daily"))
+    s.execute(text(_DAILY_UPSERT.format(where="")), {"tz": _TZ_NAME})
+
+
+def record_balances(rows: Iterable[Mapping]) -> int:
+    """
+    Append snapshots and keep balances_latest / balances_daily in step (one transaction).
+    rows: dicts with account_id, balance, as_of and optional account_name, currency, source.
+    Re-recording the same (account_id, as_of) is a no-op.
+    """
+    clean = []
+    for r in rows:
+        if r.get("account_id") is None or r.get("balance") is None or r.get("as_of") is None:
+            continue
+        clean.append({
+            "account_id": str(r["account_id"]),
+            "account_name": r.get("account_name"),
+            "currency": r.get("currency"),
+            "balance": r["balance"],
+            "as_of": _as_utc(r["as_of"]),
+            "source": r.get("source"),
+        })
+    if not clean:
+        return 0
+    clean.sort(key=lambda r: r["as_of"])
+
+    try:
+        _record(clean)
+    except Exception:
+        # partitions/DDL created in a rolled-back transaction must be re-checked next time
+        _forget_ddl()
+        raise
+    return len(clean)
+
+
+def _forget_ddl():
+    global _ddl_done
+    _ddl_done = False
+    _partitions.clear()
+
+
+def _record(clean: List[Dict]):
+    with db_session() as s:
+        _ensure(s)
+        for m in {r["as_of"].date().replace(day=1) for r in clean}:
+            _ensure_partition(s, m)
+        s.execute(text("""
+            INSERT INTO helios.balance_history (account_id, account_name, currency, balance, as_of, source)
+            VALUES (:account_id, :account_name, :currency, :balance, :as_of, :source)
+            ON CONFLICT (account_id, as_of) DO NOTHING
+        """), clean)
+        # out-of-order snapshots never overwrite a newer latest row
+        s.execute(text("""
+            INSERT INTO helios.balances_latest (account_id, account_name, currency, balance, as_of, updated_at)
+            VALUES (:account_id, :account_name, :currency, :balance, :as_of, now())
+            ON CONFLICT (account_id) DO UPDATE SET
+              account_name=coalesce(EXCLUDED.account_name, helios.balances_latest.account_name),
+              currency=coalesce(EXCLUDED.currency, helios.balances_latest.currency),
+              balance=EXCLUDED.balance,
+              as_of=EXCLUDED.as_of,
+              updated_at=now()
+            WHERE helios.balances_latest.as_of <= EXCLUDED.as_of
+        """), clean)
+        if any(r["source"] != "legacy" for r in clean):
+            # live data exists: accounts with nothing but imported history are stale
+            s.execute(text("""
+                DELETE FROM helios.balances_latest l
+                WHERE NOT EXISTS (SELECT 1 FROM helios.balance_history h
+                                  WHERE h.account_id = l.account_id AND h.source IS DISTINCT FROM 'legacy')
+            """))
+        days = {(r["account_id"], r["as_of"].astimezone(_TZ).date()) for r in clean}
+        for account_id, day in days:
+            lo = dt.datetime.combine(day, dt.time(0, 0), tzinfo=_TZ)
+            hi = dt.datetime.combine(day + dt.timedelta(days=1), dt.time(0, 0), tzinfo=_TZ)
+            s.execute(text(_DAILY_UPSERT.format(
+                where="WHERE account_id = :a AND as_of >= :lo AND as_of < :hi"
+            )), {"tz": _TZ_NAME, "a": account_id, "lo": lo, "hi": hi})
+        s.commit()
+
+
+def latest_balances() -> List[Dict]:
+    with db_session() as s:
+        _ensure(s)
+        rows = s.execute(text("""
+            SELECT account_id, COALESCE(account_name, account_id) AS account_name, currency, balance, as_of
+            FROM helios.balances_latest
+            ORDER BY account_id
+        """)).mappings().all()
+        return [dict(r) for r in rows]
+
+
+def daily_history(account_ids: Optional[List[str]] = None,
+                  start: Optional[dt.date] = None, end: Optional[dt.date] = None) -> List[Dict]:
+    """Daily rollup rows ordered by (account_id, day); start/end are inclusive local dates."""
+    clauses, params = [], {}
+    if account_ids:
+        clauses.append("account_id = ANY(:ids)")
+        params["ids"] = list(account_ids)
+    if start:
+        clauses.append("day >= :start")
+        params["start"] = start
+    if end:
+        clauses.append("day <= :end")
+        params["end"] = end
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    with db_session() as s:
+        _ensure(s)
+        rows = s.execute(text(f"""
+            SELECT account_id, day, open_balance, close_balance, min_balance, max_balance, samples, last_as_of
+            FROM helios.balances_daily
+            {where}
+            ORDER BY account_id, day
+        """), params).mappings().all()
+        return [dict(r) for r in rows]
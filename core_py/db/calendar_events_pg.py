@@ -0,0 +1,343 @@
+# core_py/db/calendar_events_pg.py
+# Local copy of Google Calendar events (kept current by core_py/integrations/calendar_sync.py).
+#
+# helios.calendar_events     one row per (calendar_id, event_id); the raw event body as JSONB
+#                            plus start/end as timestamptz for range reads
+# helios.calendar_sync_state per calendar: syncToken, synced window, push channel
+# helios.schedule_timeline   Helios blocks only (start/end, type, title, task ids from
+#                            extendedProperties.private), maintained in the same
+#                            transaction as each sync so range reads need no JSON work
+#
+# MemoryEventStore has the same interface and keeps everything in process; it is
+# used when HELIOS_CALENDAR_STORE=memory (tests / running without Postgres).
+
+import datetime as dt
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from core_py.db.session import db_session
+
+DDL = """
+CREATE SCHEMA IF NOT EXISTS helios;
+CREATE TABLE IF NOT EXISTS helios.calendar_events (
+  calendar_id  TEXT NOT NULL,
+  event_id     TEXT NOT NULL,
+  status       TEXT,
+  start_ts     TIMESTAMPTZ,
+  end_ts       TIMESTAMPTZ,
+  all_day      BOOLEAN NOT NULL DEFAULT FALSE,
+  transparent  BOOLEAN NOT NULL DEFAULT FALSE,
+  updated      TEXT,
+  body         JSONB NOT NULL,
+  synced_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS calendar_events_range_idx
+  ON helios.calendar_events (calendar_id, start_ts, end_ts);
+CREATE TABLE IF NOT EXISTS helios.schedule_timeline (
+  calendar_id  TEXT NOT NULL,
+  event_id     TEXT NOT NULL,
+  start_ts     TIMESTAMPTZ NOT NULL,
+  end_ts       TIMESTAMPTZ NOT NULL,
+  block_type   TEXT,
+  title        TEXT,
+  task_ids     TEXT[] NOT NULL DEFAULT '{}',
+  html_link    TEXT,
+  refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS schedule_timeline_range_idx
+  ON helios.schedule_timeline (start_ts, calendar_id, event_id);
+CREATE TABLE IF NOT EXISTS helios.calendar_sync_state (
+  calendar_id        TEXT PRIMARY KEY,
+  sync_token         TEXT,
+  window_min         TIMESTAMPTZ,
+  window_max         TIMESTAMPTZ,
+  last_full_sync     TIMESTAMPTZ,
+  last_sync          TIMESTAMPTZ,
+  dirty              BOOLEAN NOT NULL DEFAULT FALSE,
+  channel_id         TEXT,
+  channel_token      TEXT,
+  resource_id        TEXT,
+  channel_expiration TIMESTAMPTZ
+);
+"""
+
+# calendar_events row -> schedule_timeline row (Helios blocks only)
+_TIMELINE_SELECT = """
+    SELECT calendar_id, event_id, start_ts, end_ts,
+           nullif(body->'extendedProperties'->'private'->>'helios_block_type', ''),
+           btrim(regexp_replace(coalesce(body->>'summary', ''), '^\\[BLOCK\\]', '')),
+           coalesce(string_to_array(nullif(body->'extendedProperties'->'private'->>'helios_task_ids', ''), ','), '{}'),
+           body->>'htmlLink'
+    FROM helios.calendar_events
+    WHERE start_ts IS NOT NULL AND end_ts IS NOT NULL
+      AND coalesce(status, '') <> 'cancelled'
+      AND (body->'extendedProperties'->'private'->>'helios_generated' = 'true'
+           OR body->'extendedProperties'->'private'->>'helios_block' = 'true'
+           OR coalesce(body->>'summary', '') LIKE '[BLOCK]%')
+"""
+
+_TIMELINE_INSERT = """
+    INSERT INTO helios.schedule_timeline
+      (calendar_id, event_id, start_ts, end_ts, block_type, title, task_ids, html_link)
+"""
+
+STATE_COLUMNS = (
+    "sync_token", "window_min", "window_max", "last_full_sync", "last_sync", "dirty",
+    "channel_id", "channel_token", "resource_id", "channel_expiration",
+)
+
+_TZ = ZoneInfo(os.getenv("HELIOS_TZ", "Europe/London"))
+
+
+def _parse_when(when: Optional[dict]) -> tuple:
+    """Google {dateTime}|{date} -> (aware datetime, all_day). All-day dates are local midnight (HELIOS_TZ)."""
+    when = when or {}
+    if when.get("dateTime"):
+        d = dt.datetime.fromisoformat(when["dateTime"].replace("Z", "+00:00"))
+        return (d if d.tzinfo else d.replace(tzinfo=dt.timezone.utc)), False
+    if when.get("date"):
+        return dt.datetime.combine(dt.date.fromisoformat(when["date"]), dt.time(0, 0), tzinfo=_TZ), True
+    return None, False
+
+
+def is_block(ev: dict) -> bool:
+    priv = (ev.get("extendedProperties") or {}).get("private") or {}
+    return (priv.get("helios_generated") == "true" or priv.get("helios_block") == "true"
+            or (ev.get("summary") or "").startswith("[BLOCK]"))
+
+
+def timeline_row(calendar_id: str, ev: dict) -> Optional[dict]:
+    r = event_row(calendar_id, ev)
+    if not is_block(ev) or not r["start_ts"] or not r["end_ts"] or r["status"] == "cancelled":
+        return None
+    priv = (ev.get("extendedProperties") or {}).get("private") or {}
+    return {
+        "calendar_id": calendar_id,
+        "event_id": ev["id"],
+        "start_ts": r["start_ts"],
+        "end_ts": r["end_ts"],
+        "block_type": priv.get("helios_block_type") or None,
+        "title": (ev.get("summary") or "").replace("[BLOCK]", "", 1).strip(),
+        "task_ids": [x for x in (priv.get("helios_task_ids") or "").split(",") if x],
+        "html_link": ev.get("htmlLink"),
+    }
+
+
+def event_row(calendar_id: str, ev: dict) -> dict:
+    start, all_day = _parse_when(ev.get("start"))
+    end, _ = _parse_when(ev.get("end"))
+    return {
+        "calendar_id": calendar_id,
+        "event_id": ev["id"],
+        "status": ev.get("status"),
+        "start_ts": start,
+        "end_ts": end,
+        "all_day": all_day,
+        "transparent": ev.get("transparency") == "transparent",
+        "updated": ev.get("updated"),
+        "body": ev,
+    }
+
+
+class PgEventStore:
+    _ddl_done = False
+
+    def _ensure(self, s):
+        if not PgEventStore._ddl_done:
+            s.execute(text(DDL))
+            # backfill a new timeline table from events synced before it existed
+            s.execute(text(_TIMELINE_INSERT + _TIMELINE_SELECT + """
+                  AND NOT EXISTS (SELECT 1 FROM helios.schedule_timeline)
+                ON CONFLICT DO NOTHING
+            """))
+            PgEventStore._ddl_done = True
+
+    def apply_changes(self, calendar_id: str, upserts: List[dict], deleted_ids: Iterable[str],
+                      state: dict, replace_all: bool = False):
+        """One transaction: events + sync state, so a syncToken is never saved without its changes."""
+        rows = [event_row(calendar_id, ev) for ev in upserts]
+        deleted = list(deleted_ids)
+        with db_session() as s:
+            self._ensure(s)
+            if replace_all:
+                s.execute(text("DELETE FROM helios.calendar_events WHERE calendar_id = :c"), {"c": calendar_id})
+            if deleted:
+                s.execute(text("""
+                    DELETE FROM helios.calendar_events
+                    WHERE calendar_id = :c AND event_id = ANY(:ids)
+                """), {"c": calendar_id, "ids": deleted})
+            if rows:
+                s.execute(text("""
+                    INSERT INTO helios.calendar_events
+                      (calendar_id, event_id, status, start_ts, end_ts, all_day, transparent, updated, body, synced_at)
+                    VALUES (:calendar_id, :event_id, :status, :start_ts, :end_ts, :all_day, :transparent, :updated,
+                            CAST(:body AS JSONB), now())
+                    ON CONFLICT (calendar_id, event_id) DO UPDATE SET
+                      status=EXCLUDED.status,
+                      start_ts=EXCLUDED.start_ts,
+                      end_ts=EXCLUDED.end_ts,
+                      all_day=EXCLUDED.all_day,
+                      transparent=EXCLUDED.transparent,
+                      updated=EXCLUDED.updated,
+                      body=EXCLUDED.body,
+                      synced_at=now()
+                """), [{**r, "body": json.dumps(r["body"])} for r in rows])  # executemany
+            self._refresh_timeline(s, calendar_id, None if replace_all else [r["event_id"] for r in rows] + deleted)
+            self._save_state(s, calendar_id, state)
+
+    def _refresh_timeline(self, s, calendar_id: str, event_ids: Optional[List[str]]):
+        """Re-derive timeline rows for the touched events (all of the calendar's when event_ids is None)."""
+        if event_ids is not None and not event_ids:
+            return
+        scope = "" if event_ids is None else " AND event_id = ANY(:ids)"
+        params = {"c": calendar_id, "ids": event_ids}
+        s.execute(text("DELETE FROM helios.schedule_timeline WHERE calendar_id = :c" + scope), params)
+        s.execute(text(_TIMELINE_INSERT + _TIMELINE_SELECT + " AND calendar_id = :c" + scope), params)
+
+    def _save_state(self, s, calendar_id: str, state: dict):
+        cols = [c for c in STATE_COLUMNS if c in state]
+        if not cols:
+            return
+        s.execute(text(f"""
+            INSERT INTO helios.calendar_sync_state (calendar_id, {", ".join(cols)})
+            VALUES (:calendar_id, {", ".join(":" + c for c in cols)})
+            ON CONFLICT (calendar_id) DO UPDATE SET {", ".join(f"{c}=EXCLUDED.{c}" for c in cols)}
+        """), {"calendar_id": calendar_id, **{c: state[c] for c in cols}})
+
+    def update_state(self, calendar_id: str, **state):
+        with db_session() as s:
+            self._ensure(s)
+            self._save_state(s, calendar_id, state)
+
+    def get_states(self, calendar_ids: List[str]) -> Dict[str, dict]:
+        with db_session() as s:
+            self._ensure(s)
+            rows = s.execute(text("""
+                SELECT * FROM helios.calendar_sync_state WHERE calendar_id = ANY(:ids)
+            """), {"ids": list(calendar_ids)}).mappings().all()
+        return {r["calendar_id"]: dict(r) for r in rows}
+
+    def state_for_channel(self, channel_id: str) -> Optional[dict]:
+        with db_session() as s:
+            self._ensure(s)
+            row = s.execute(text("""
+                SELECT * FROM helios.calendar_sync_state WHERE channel_id = :ch
+            """), {"ch": channel_id}).mappings().first()
+        return dict(row) if row else None
+
+    def events_between(self, calendar_ids: List[str], time_min: dt.datetime, time_max: dt.datetime) -> List[dict]:
+        """Event bodies overlapping [time_min, time_max), start order, tagged with _helios_calendar_id."""
+        with db_session() as s:
+            self._ensure(s)
+            rows = s.execute(text("""
+                SELECT calendar_id, body
+                FROM helios.calendar_events
+                WHERE calendar_id = ANY(:ids)
+                  AND start_ts < :tmax AND end_ts > :tmin
+                  AND coalesce(status, '') <> 'cancelled'
+                ORDER BY start_ts, event_id
+            """), {"ids": list(calendar_ids), "tmin": time_min, "tmax": time_max}).all()
+        return [{**r.body, "_helios_calendar_id": r.calendar_id} for r in rows]
+
+    def timeline(self, calendar_ids: List[str], time_min: dt.datetime, time_max: dt.datetime,
+                 after: Optional[tuple] = None, limit: int = 500) -> List[dict]:
+        """Helios blocks overlapping the window in (start, calendar, event) order; `after` = last key of the previous page."""
+        cond, params = "", {"ids": list(calendar_ids), "tmin": time_min, "tmax": time_max, "lim": limit}
+        if after:
+            cond = " AND (start_ts, calendar_id, event_id) > (:a_start, :a_cal, :a_ev)"
+            params.update(a_start=after[0], a_cal=after[1], a_ev=after[2])
+        with db_session() as s:
+            self._ensure(s)
+            rows = s.execute(text(f"""
+                SELECT calendar_id, event_id, start_ts, end_ts, block_type, title, task_ids, html_link
+                FROM helios.schedule_timeline
+                WHERE calendar_id = ANY(:ids) AND start_ts < :tmax AND end_ts > :tmin{cond}
+                ORDER BY start_ts, calendar_id, event_id
+                LIMIT :lim
+            """), params).mappings().all()
+        return [dict(r) for r in rows]
+
+    def timeline_task_ids(self, calendar_ids: List[str], time_min: dt.datetime, time_max: dt.datetime) -> set:
+        with db_session() as s:
+            self._ensure(s)
+            rows = s.execute(text("""
+                SELECT DISTINCT unnest(task_ids)
+                FROM helios.schedule_timeline
+                WHERE calendar_id = ANY(:ids) AND start_ts < :tmax AND end_ts > :tmin
+            """), {"ids": list(calendar_ids), "tmin": time_min, "tmax": time_max}).scalars().all()
+        return set(rows)
+
+
+class MemoryEventStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: Dict[str, Dict[str, dict]] = {}
+        self._states: Dict[str, dict] = {}
+
+    def apply_changes(self, calendar_id, upserts, deleted_ids, state, replace_all=False):
+        with self._lock:
+            evs = {} if replace_all else dict(self._events.get(calendar_id, {}))
+            for eid in deleted_ids:
+                evs.pop(eid, None)
+            for ev in upserts:
+                evs[ev["id"]] = event_row(calendar_id, ev)
+            self._events[calendar_id] = evs
+            self._states.setdefault(calendar_id, {"calendar_id": calendar_id}).update(
+                {k: v for k, v in state.items() if k in STATE_COLUMNS})
+
+    def update_state(self, calendar_id, **state):
+        with self._lock:
+            self._states.setdefault(calendar_id, {"calendar_id": calendar_id}).update(
+                {k: v for k, v in state.items() if k in STATE_COLUMNS})
+
+    def get_states(self, calendar_ids):
+        with self._lock:
+            return {c: dict(self._states[c]) for c in calendar_ids if c in self._states}
+
+    def state_for_channel(self, channel_id):
+        with self._lock:
+            return next((dict(st) for st in self._states.values() if st.get("channel_id") == channel_id), None)
+
+    def events_between(self, calendar_ids, time_min, time_max):
+        with self._lock:
+            rows = [r for c in calendar_ids for r in self._events.get(c, {}).values()
+                    if r["start_ts"] and r["end_ts"] and r["start_ts"] < time_max and r["end_ts"] > time_min
+                    and r["status"] != "cancelled"]
+        rows.sort(key=lambda r: (r["start_ts"], r["event_id"]))
+        return [{**r["body"], "_helios_calendar_id": r["calendar_id"]} for r in rows]
+
+    def _timeline_rows(self, calendar_ids, time_min, time_max):
+        with self._lock:
+            bodies = [(c, r["body"]) for c in calendar_ids for r in self._events.get(c, {}).values()]
+        rows = [t for t in (timeline_row(c, b) for c, b in bodies) if t]
+        rows = [t for t in rows if t["start_ts"] < time_max and t["end_ts"] > time_min]
+        rows.sort(key=lambda t: (t["start_ts"], t["calendar_id"], t["event_id"]))
+        return rows
+
+    def timeline(self, calendar_ids, time_min, time_max, after=None, limit=500):
+        rows = self._timeline_rows(calendar_ids, time_min, time_max)
+        if after:
+            rows = [t for t in rows if (t["start_ts"], t["calendar_id"], t["event_id"]) > tuple(after)]
+        return rows[:limit]
+
+    def timeline_task_ids(self, calendar_ids, time_min, time_max):
+        return {tid for t in self._timeline_rows(calendar_ids, time_min, time_max) for tid in t["task_ids"]}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_event_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MemoryEventStore() if os.getenv("HELIOS_CALENDAR_STORE", "pg").lower() == "memory" else PgEventStore()
+        return _store
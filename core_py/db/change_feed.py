@@ -0,0 +1,164 @@
+# core_py/db/change_feed.py
+# Postgres LISTEN/NOTIFY change feed → websocket topics.
+#
+# Triggers on the tables the dashboards poll call helios.notify_change(), which
+# pg_notify()s a small JSON payload on the 'helios_changes' channel. The backend
+# keeps one dedicated connection LISTENing and turns each batch of notifications
+# into one message per topic (tasks / fss) on the realtime hub.
+
+import asyncio
+import json
+import logging
+import select
+from typing import Callable, Dict, List
+
+from sqlalchemy import text
+
+from core_py.db.session import engine
+
+logger = logging.getLogger("helios.change_feed")
+
+CHANNEL = "helios_changes"
+
+# table -> (topic, trigger level, key column). Statement-level for tables that are
+# rewritten in bulk (triaged_tasks is DELETE + reinsert on every triage run, and
+# balances_latest is rebuilt wholesale after a legacy import).
+WATCHED_TABLES: Dict[str, tuple] = {
+    "public.email_tasks":    ("tasks", "ROW", "id"),
+    "public.task_meta":      ("tasks", "ROW", "task_id"),
+    "helios.task_meta":      ("tasks", "ROW", "task_id"),
+    "helios.triaged_tasks":  ("tasks", "STATEMENT", None),
+    "legacy.fss_summary":    ("fss", "ROW", "id"),
+    "public.fss_summary":    ("fss", "ROW", "id"),
+    "helios.fss_projection":  ("fss", "ROW", "summary_id"),
+    "helios.balances_latest": ("fss", "STATEMENT", None),
+}
+
+MAX_IDS_PER_MESSAGE = 100
+
+NOTIFY_FN_DDL = """
+CREATE SCHEMA IF NOT EXISTS helios;
+CREATE OR REPLACE FUNCTION helios.notify_change() RETURNS trigger AS $$
+DECLARE
+  row_id TEXT;
+BEGIN
+  IF TG_LEVEL = 'ROW' THEN
+    IF TG_OP = 'DELETE' THEN
+      row_id := to_jsonb(OLD) ->> TG_ARGV[0];
+    ELSE
+      row_id := to_jsonb(NEW) ->> TG_ARGV[0];
+    END IF;
+  END IF;
+  PERFORM pg_notify('helios_changes', json_build_object(
+    'table', TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME,
+    'op', TG_OP,
+    'id', row_id
+  )::text);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def _trigger_ddl(table: str, level: str, key_col) -> str:
+    args = f"'{key_col}'" if key_col else ""
+    return f"""
+DO $$ BEGIN
+  IF to_regclass('{table}') IS NOT NULL THEN
+    DROP TRIGGER IF EXISTS helios_notify_change ON {table};
+    CREATE TRIGGER helios_notify_change
+      AFTER INSERT OR UPDATE OR DELETE ON {table}
+      FOR EACH {level} EXECUTE FUNCTION helios.notify_change({args});
+  END IF;
+END $$;
+"""
+
+
+def is_supported() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def ensure_change_triggers():
+    """Install/refresh the notify function and triggers. Tables that don't exist yet are skipped."""
+    with engine.begin() as conn:
+        conn.execute(text(NOTIFY_FN_DDL))
+        for table, (_, level, key_col) in WATCHED_TABLES.items():
+            conn.execute(text(_trigger_ddl(table, level, key_col)))
+
+
+def _group_by_topic(payloads: List[dict]) -> Dict[str, dict]:
+    """Collapse a batch of row notifications into one message per topic."""
+    out: Dict[str, dict] = {}
+    for p in payloads:
+        table = p.get("table") or ""
+        topic = (WATCHED_TABLES.get(table) or (None,))[0]
+        if not topic:
+            continue
+        msg = out.setdefault(topic, {"type": "changed", "tables": {}})
+        entry = msg["tables"].setdefault(table, {"ops": [], "ids": [], "truncated": False})
+        if p.get("op") and p["op"] not in entry["ops"]:
+            entry["ops"].append(p["op"])
+        rid = p.get("id")
+        if rid is not None and rid not in entry["ids"]:
+            if len(entry["ids"]) < MAX_IDS_PER_MESSAGE:
+                entry["ids"].append(rid)
+            else:
+                entry["truncated"] = True
+    return out
+
+
+def _wait_for_notifies(pg_conn, timeout: float) -> List[dict]:
+    """Block (in a worker thread) until notifications arrive or timeout elapses."""
+    if select.select([pg_conn], [], [], timeout) == ([], [], []):
+        return []
+    pg_conn.poll()
+    out: List[dict] = []
+    while pg_conn.notifies:
+        n = pg_conn.notifies.pop(0)
+        try:
+            out.append(json.loads(n.payload))
+        except ValueError:
+            logger.warning({"change_feed": "bad_payload", "payload": n.payload[:200]})
+    return out
+
+
+def _open_listen_connection():
+    raw = engine.raw_connection()
+    raw.detach()  # long-lived; keep it out of the pool
+    pg_conn = raw.dbapi_connection
+    pg_conn.autocommit = True
+    with pg_conn.cursor() as cur:
+        cur.execute(f"LISTEN {CHANNEL};")
+    return pg_conn
+
+
+async def run_change_feed(publish: Callable[[str, dict], object], poll_timeout: float = 2.0):
+    """
+    LISTEN loop. Reconnects with backoff; exits only when cancelled.
+    Uses select() in a worker thread so it also works on the Windows proactor loop.
+    """
+    backoff = 1.0
+    while True:
+        pg_conn = None
+        try:
+            pg_conn = await asyncio.to_thread(_open_listen_connection)
+            logger.info({"change_feed": "listening", "channel": CHANNEL})
+            backoff = 1.0
+            while True:
+                payloads = await asyncio.to_thread(_wait_for_notifies, pg_conn, poll_timeout)
+                if not payloads:
+                    continue
+                for topic, msg in _group_by_topic(payloads).items():
+                    publish(topic, msg)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning({"change_feed": "disconnected", "error": str(e), "retry_s": backoff})
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+        finally:
+            if pg_conn is not None:
+                try:
+                    pg_conn.close()
+                except Exception:
+                    pass
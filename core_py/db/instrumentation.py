@@ -0,0 +1,45 @@
+# core_py/db/instrumentation.py
+# SQLAlchemy cursor hooks → per-statement latency + per-request DB time/query count
+# (+ statement fingerprints for core_py/db/query_audit.py).
+# Listens on the Engine class, so it covers every engine in the process
+# (core_py.db.session and the ad-hoc engines from core_py.db.database).
+
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core_py.db import query_audit
+from core_py.services import metrics
+
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("helios_query_t0", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("helios_query_t0")
+    if not stack:
+        return
+    metrics.record_db(perf_counter() - stack.pop())
+    query_audit.record(statement)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None:
+        stack = conn.info.get("helios_query_t0")
+        if stack:
+            metrics.record_db(perf_counter() - stack.pop())
+
+
+def install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
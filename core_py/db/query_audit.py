@@ -0,0 +1,118 @@
+# core_py/db/query_audit.py
+# Per-request query budget + N+1 detection.
+#
+# When enabled (HELIOS_QUERY_AUDIT=1, on by default in ENV=dev) every statement is
+# fingerprinted (literals/params stripped, whitespace collapsed) and counted on the
+# current RequestStats. At the end of the request check() logs a warning when the
+# route exceeds its query budget or repeats one statement shape too often.
+#
+# Budgets: HELIOS_QUERY_BUDGET (default for all routes) and
+#          HELIOS_QUERY_BUDGETS="/api/tasks/from-email=6;/api/advice/latest=2"
+
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from core_py.services import metrics
+
+logger = logging.getLogger("helios.query_audit")
+
+ENABLED = os.getenv(
+    "HELIOS_QUERY_AUDIT", "1" if os.getenv("ENV", "dev").lower() == "dev" else "0"
+).lower() in ("1", "true", "yes")
+DEFAULT_BUDGET = int(os.getenv("HELIOS_QUERY_BUDGET", "25"))
+REPEAT_WARN = int(os.getenv("HELIOS_QUERY_REPEAT_WARN", "3"))
+
+# Known hot routes; env overrides win
+ROUTE_BUDGETS: Dict[str, int] = {
+    "/api/tasks/from-email": 6,
+    "/api/advice/latest": 2,
+    "/api/clients/{client_id}/emails": 3,
+}
+
+_STR_RE = re.compile(r"'(?:[^']|'')*'")
+_NUM_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\([^)]+\)s|%s|:\w+|\$\d+|\?")
+_IN_RE = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+QUERY_BUDGET_EXCEEDED = metrics.REGISTRY.register(metrics.Counter(
+    "helios_query_budget_exceeded_total", "Requests over their per-route query budget.", ("route",)))
+QUERY_REPEATS = metrics.REGISTRY.register(metrics.Counter(
+    "helios_query_repeat_warnings_total", "Requests repeating one statement shape (likely N+1).", ("route",)))
+
+
+def _load_env_budgets():
+    raw = os.getenv("HELIOS_QUERY_BUDGETS") or ""
+    for part in raw.replace(",", ";").split(";"):
+        if "=" not in part:
+            continue
+        route, _, n = part.rpartition("=")
+        try:
+            ROUTE_BUDGETS[route.strip()] = int(n)
+        except ValueError:
+            continue
+
+
+_load_env_budgets()
+
+
+def fingerprint(statement: str) -> str:
+    s = _STR_RE.sub("?", statement or "")
+    s = _PARAM_RE.sub("?", s)
+    s = _NUM_RE.sub("?", s)
+    s = _IN_RE.sub("IN (?)", s)
+    return _WS_RE.sub(" ", s).strip()
+
+
+def record(statement: str):
+    if not ENABLED:
+        return
+    stats = metrics.current_request()
+    if stats is not None:
+        fp = fingerprint(statement)
+        stats.statements[fp] = stats.statements.get(fp, 0) + 1
+
+
+def budget_for(route: str) -> int:
+    return ROUTE_BUDGETS.get(route, DEFAULT_BUDGET)
+
+
+def top_repeats(stats: metrics.RequestStats, n: int = 3) -> List[Tuple[str, int]]:
+    reps = [(fp, c) for fp, c in stats.statements.items() if c > 1]
+    reps.sort(key=lambda x: x[1], reverse=True)
+    return reps[:n]
+
+
+def check(stats: metrics.RequestStats, rid: Optional[str] = None):
+    """Log (and count) budget overruns and repeated statement shapes for this request."""
+    if not ENABLED:
+        return
+    budget = budget_for(stats.route)
+    repeats = [(fp, c) for fp, c in top_repeats(stats) if c >= REPEAT_WARN]
+    over = stats.db_queries > budget
+    if not over and not repeats:
+        return
+    if over:
+        QUERY_BUDGET_EXCEEDED.inc(route=stats.route)
+    if repeats:
+        QUERY_REPEATS.inc(route=stats.route)
+    logger.warning({
+        "query_audit": "budget_exceeded" if over else "repeated_statements",
+        "rid": rid,
+        "route": stats.route,
+        "queries": stats.db_queries,
+        "budget": budget,
+        "repeats": [{"count": c, "fingerprint": fp[:240]} for fp, c in (repeats or top_repeats(stats))],
+    })
+
+
+def response_headers(stats: metrics.RequestStats) -> Dict[str, str]:
+    reps = top_repeats(stats, 1)
+    return {
+        "X-DB-Queries": str(stats.db_queries),
+        "X-DB-Time-ms": str(int(stats.db_seconds * 1000)),
+        "X-DB-Query-Budget": str(budget_for(stats.route)),
+        "X-DB-Max-Repeats": str(reps[0][1] if reps else (1 if stats.db_queries else 0)),
+    }
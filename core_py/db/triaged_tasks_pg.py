@@ -42,3 +42,26 @@ def top_triaged_tasks(limit: int = 3):
             LIMIT :lim
         """), {"lim": limit}).mappings().all()
         return [dict(r) for r in rows]
+
+def triaged_tasks_by_ids(ids):
+    """{id: task row} for the given task ids (unknown ids are simply absent)."""
+    ids = [str(i) for i in ids if i]
+    if not ids:
+        return {}
+    with db_session() as s:
+        rows = s.execute(text("""
+            SELECT id, name, due_date, priority, score, status
+            FROM helios.triaged_tasks
+            WHERE id = ANY(:ids)
+        """), {"ids": ids}).mappings().all()
+        return {r["id"]: dict(r) for r in rows}
+
+def triaged_task_ids_excluding(ids):
+    """Triaged task ids (score order) that are not in `ids`."""
+    with db_session() as s:
+        rows = s.execute(text("""
+            SELECT id FROM helios.triaged_tasks
+            WHERE NOT (id = ANY(:ids))
+            ORDER BY score DESC, due_date ASC
+        """), {"ids": [str(i) for i in ids]}).scalars().all()
+        return list(rows)
@@ -0,0 +1,281 @@
+# core_py/integrations/calendar_sync.py
+"""
+Keeps the local event store (core_py/db/calendar_events_pg.py) in step with Google Calendar.
+
+- First read of a calendar: full events.list over [now - PAST_DAYS, now + FUTURE_DAYS]
+  (singleEvents), saving the nextSyncToken.
+- After that: events.list(syncToken=...) returns only what changed (cancelled -> delete).
+  410 Gone means the token expired -> full resync.
+- Stale calendars are synced concurrently (thread pool) when the caller's service is
+  thread-safe (GoogleClientProvider services are; see google_client.py).
+- A calendar is re-synced on read when its last sync is older than SYNC_MAX_AGE_S,
+  or WATCHED_MAX_AGE_S while a push channel (events.watch) is live; a push
+  notification marks it dirty so the next read syncs straight away.
+
+Reads (events()) are then a single indexed range query on the store.
+
+fetch_events_concurrently() is the live (no store) path: every calendar listed in
+parallel, all pages followed, with per-calendar timing.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import os
+import secrets
+import threading
+import time
+import typing as t
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from core_py.db.calendar_events_pg import get_event_store
+
+logger = logging.getLogger("helios.calendar_sync")
+
+SYNC_MAX_AGE_S = int(os.getenv("HELIOS_CAL_SYNC_MAX_AGE_S", "60"))
+WATCHED_MAX_AGE_S = int(os.getenv("HELIOS_CAL_WATCHED_MAX_AGE_S", "900"))
+PAST_DAYS = int(os.getenv("HELIOS_CAL_SYNC_PAST_DAYS", "30"))
+FUTURE_DAYS = int(os.getenv("HELIOS_CAL_SYNC_FUTURE_DAYS", "180"))
+CHANNEL_TTL_S = int(os.getenv("HELIOS_CAL_CHANNEL_TTL_S", str(7 * 24 * 3600)))
+PAGE_SIZE = 2500
+MAX_WORKERS = int(os.getenv("HELIOS_CAL_FETCH_WORKERS", "8"))
+
+
+def _now() -> dt.datetime:
+    return dt.datetime.now(dt.timezone.utc)
+
+
+def _rfc3339(d: dt.datetime) -> str:
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=dt.timezone.utc)
+    return d.astimezone(dt.timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _http_status(e: Exception) -> int | None:
+    return getattr(getattr(e, "resp", None), "status", None)
+
+
+class CalendarSync:
+    def __init__(self, store=None):
+        self.store = store or get_event_store()
+        self._locks: dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+        self._services: dict[str, t.Callable] = {}   # last service getter per calendar (push-triggered syncs)
+        self.stats = {"full": 0, "incremental": 0, "pages": 0, "reads": 0}
+        self._stats_lock = threading.Lock()
+
+    def _bump(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def _lock(self, calendar_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks[calendar_id]
+
+    # ---- Google -> store ----
+
+    def _list_all(self, service, calendar_id: str, **params) -> tuple[list[dict], str | None]:
+        items: list[dict] = []
+        page_token = None
+        while True:
+            res = service.events().list(
+                calendarId=calendar_id, singleEvents=True, maxResults=PAGE_SIZE, pageToken=page_token, **params,
+            ).execute()
+            self._bump("pages")
+            items.extend(res.get("items", []))
+            page_token = res.get("nextPageToken")
+            if not page_token:
+                return items, res.get("nextSyncToken")
+
+    def full_sync(self, service, calendar_id: str, time_min: dt.datetime | None = None,
+                  time_max: dt.datetime | None = None) -> dict:
+        now = _now()
+        w_min = min(time_min or now, now - dt.timedelta(days=PAST_DAYS))
+        w_max = max(time_max or now, now + dt.timedelta(days=FUTURE_DAYS))
+        items, token = self._list_all(service, calendar_id, timeMin=_rfc3339(w_min), timeMax=_rfc3339(w_max))
+        live = [e for e in items if e.get("id") and e.get("status") != "cancelled"]
+        self.store.apply_changes(calendar_id, live, [], {
+            "sync_token": token, "window_min": w_min, "window_max": w_max,
+            "last_full_sync": now, "last_sync": now, "dirty": False,
+        }, replace_all=True)
+        self._bump("full")
+        return {"calendar_id": calendar_id, "mode": "full", "events": len(live)}
+
+    def incremental_sync(self, service, calendar_id: str, sync_token: str) -> dict:
+        now = _now()
+        try:
+            items, token = self._list_all(service, calendar_id, syncToken=sync_token)
+        except Exception as e:
+            if _http_status(e) == 410:
+                logger.info({"calendar_sync": "token_expired", "calendar_id": calendar_id})
+                return self.full_sync(service, calendar_id)
+            raise
+        upserts = [e for e in items if e.get("id") and e.get("status") != "cancelled"]
+        deleted = [e["id"] for e in items if e.get("id") and e.get("status") == "cancelled"]
+        self.store.apply_changes(calendar_id, upserts, deleted, {
+            "sync_token": token or sync_token, "last_sync": now, "dirty": False,
+        })
+        self._bump("incremental")
+        return {"calendar_id": calendar_id, "mode": "incremental", "changed": len(upserts), "deleted": len(deleted)}
+
+    # ---- freshness ----
+
+    def _needs(self, st: dict | None, time_min, time_max, now: dt.datetime) -> str | None:
+        if not st or not st.get("sync_token"):
+            return "full"
+        if (time_min and st.get("window_min") and time_min < st["window_min"]) or \
+           (time_max and st.get("window_max") and time_max > st["window_max"]):
+            return "full"
+        if st.get("dirty") or not st.get("last_sync"):
+            return "incremental"
+        watched = st.get("channel_expiration") and st["channel_expiration"] > now
+        max_age = WATCHED_MAX_AGE_S if watched else SYNC_MAX_AGE_S
+        if (now - st["last_sync"]).total_seconds() >= max_age:
+            return "incremental"
+        return None
+
+    def _sync_one(self, service, cal_id: str, time_min, time_max) -> dict | None:
+        with self._lock(cal_id):
+            st = self.store.get_states([cal_id]).get(cal_id)  # another thread may have just synced it
+            mode = self._needs(st, time_min, time_max, _now())
+            if not mode:
+                return None
+            t0 = time.perf_counter()
+            try:
+                if mode == "full":
+                    out = self.full_sync(service, cal_id, time_min, time_max)
+                else:
+                    out = self.incremental_sync(service, cal_id, st["sync_token"])
+            except Exception as e:
+                if mode == "full":
+                    raise
+                # serve what we have; the next read retries
+                logger.warning({"calendar_sync": "incremental_failed", "calendar_id": cal_id, "error": str(e)})
+                out = {"calendar_id": cal_id, "mode": mode, "error": str(e)}
+            out["ms"] = int((time.perf_counter() - t0) * 1000)
+            return out
+
+    def ensure_fresh(self, service_fn: t.Callable, calendar_ids: list[str],
+                     time_min: dt.datetime | None = None, time_max: dt.datetime | None = None,
+                     concurrent: bool = False) -> list[dict]:
+        """
+        Sync whichever calendars are stale (or don't cover the window); service_fn is only
+        called if needed. concurrent=True syncs them in parallel (thread-safe services only).
+        """
+        states = self.store.get_states(calendar_ids)
+        now = _now()
+        for cal_id in calendar_ids:
+            self._services[cal_id] = service_fn
+        stale = [c for c in calendar_ids if self._needs(states.get(c), time_min, time_max, now)]
+        if not stale:
+            return []
+        service = service_fn()
+        if concurrent and len(stale) > 1:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(stale))) as ex:
+                results = list(ex.map(lambda c: self._sync_one(service, c, time_min, time_max), stale))
+        else:
+            results = [self._sync_one(service, c, time_min, time_max) for c in stale]
+        return [r for r in results if r]
+
+    def events(self, service_fn: t.Callable, calendar_ids: list[str],
+               time_min: dt.datetime, time_max: dt.datetime, concurrent: bool = False,
+               sync_log: list | None = None) -> list[dict]:
+        """Raw Google event bodies overlapping the window, from the store (synced first if stale)."""
+        done = self.ensure_fresh(service_fn, calendar_ids, time_min, time_max, concurrent=concurrent)
+        if sync_log is not None:
+            sync_log.extend(done)
+        self._bump("reads")
+        return self.store.events_between(calendar_ids, time_min, time_max)
+
+    # ---- push channels ----
+
+    def watch(self, service, calendar_id: str, address: str, ttl_s: int = CHANNEL_TTL_S) -> dict:
+        """Open an events.watch channel to `address` (public HTTPS) and remember it on the sync state."""
+        channel_id = str(uuid.uuid4())
+        token = secrets.token_urlsafe(24)
+        res = service.events().watch(calendarId=calendar_id, body={
+            "id": channel_id, "type": "web_hook", "address": address, "token": token,
+            "params": {"ttl": str(int(ttl_s))},
+        }).execute()
+        exp_ms = res.get("expiration")
+        expiration = dt.datetime.fromtimestamp(int(exp_ms) / 1000, dt.timezone.utc) if exp_ms else None
+        self.store.update_state(calendar_id, channel_id=channel_id, channel_token=token,
+                                resource_id=res.get("resourceId"), channel_expiration=expiration)
+        return {"calendar_id": calendar_id, "channel_id": channel_id, "resource_id": res.get("resourceId"),
+                "expiration": expiration.isoformat() if expiration else None}
+
+    def handle_notification(self, channel_id: str, channel_token: str | None, resource_state: str) -> str | None:
+        """Mark the channel's calendar dirty; returns its calendar id (None for unknown/forged channels)."""
+        st = self.store.state_for_channel(channel_id)
+        if not st or (st.get("channel_token") and st["channel_token"] != channel_token):
+            return None
+        if resource_state != "sync":
+            self.store.update_state(st["calendar_id"], dirty=True)
+        return st["calendar_id"]
+
+    def sync_now(self, calendar_id: str) -> dict | None:
+        """Background sync after a push, using the service getter that last read this calendar."""
+        service_fn = self._services.get(calendar_id)
+        if not service_fn:
+            return None
+        done = self.ensure_fresh(service_fn, [calendar_id])
+        return done[0] if done else None
+
+
+def fetch_events_concurrently(service, calendar_ids: list[str], time_min: dt.datetime, time_max: dt.datetime,
+                              max_workers: int = MAX_WORKERS, **params) -> tuple[list[dict], dict[str, dict]]:
+    """
+    Live events.list for every calendar in parallel, following nextPageToken.
+    Returns (events tagged with _helios_calendar_id, {calendar_id: {events, pages, ms[, error]}}).
+    A calendar that fails is reported in the stats; if all fail the first error is raised.
+    """
+    def _one(cal_id: str):
+        t0 = time.perf_counter()
+        items: list[dict] = []
+        pages = 0
+        page_token = None
+        while True:
+            res = service.events().list(
+                calendarId=cal_id, timeMin=_rfc3339(time_min), timeMax=_rfc3339(time_max),
+                singleEvents=True, orderBy="startTime", maxResults=PAGE_SIZE, pageToken=page_token, **params,
+            ).execute()
+            pages += 1
+            items.extend(res.get("items", []))
+            page_token = res.get("nextPageToken")
+            if not page_token:
+                break
+        for e in items:
+            e["_helios_calendar_id"] = cal_id
+        return items, {"events": len(items), "pages": pages, "ms": int((time.perf_counter() - t0) * 1000)}
+
+    events: list[dict] = []
+    stats: dict[str, dict] = {}
+    errors: list[Exception] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calendar_ids)))) as ex:
+        futs = {cal_id: ex.submit(_one, cal_id) for cal_id in calendar_ids}
+    for cal_id, fut in futs.items():  # calendar order, each calendar in start order
+        try:
+            items, st = fut.result()
+        except Exception as e:
+            errors.append(e)
+            stats[cal_id] = {"events": 0, "error": str(e)}
+            continue
+        events.extend(items)
+        stats[cal_id] = st
+    if errors and len(errors) == len(calendar_ids):
+        raise errors[0]
+    return events, stats
+
+
+_sync: CalendarSync | None = None
+_sync_lock = threading.Lock()
+
+
+def get_calendar_sync() -> CalendarSync:
+    global _sync
+    with _sync_lock:
+        if _sync is None:
+            _sync = CalendarSync()
+        return _sync
@@ -167,6 +167,7 @@ class ClickUpClient:
         list_ids: list[str] | None = None,
         include_closed: bool = False,
         page_limit: int = 100,
+        assignees: list[str] | None = None,
     ) -> list[dict]:
         url = f"{self.API_BASE}/team/{self.team_id}/task"
         params: dict[str, t.Any] = {
@@ -183,8 +184,10 @@ class ClickUpClient:
         if space_ids:
             for i, sid in enumerate(space_ids):
                 params[f"space_ids[{i}]"] = sid
-        if self.me_uid:
-            params["assignees[]"] = [self.me_uid]
+        if assignees is None and self.me_uid:
+            assignees = [self.me_uid]
+        if assignees:
+            params["assignees[]"] = list(assignees)
         if not include_closed:
             params["statuses[]"] = ["to do", "in progress", "review"]
 
@@ -243,12 +246,14 @@ class ClickUpClient:
           - skip Email list if CLICKUP_EMAIL_LIST_ID is set
           - if CLICKUP_ME_UID is set, keep only tasks assigned to me; else include all
         """
-        include_personal = (os.getenv("CLICKUP_INCLUDE_PERSONAL", "0").lower() in ("1", "true", "yes"))
         me_uid = (os.getenv("CLICKUP_ME_UID") or os.getenv("CLICKUP_USER_ID") or "").strip()
+        items = self.list_team_tasks(include_closed=False)
+        return self._schedulable(items, me_uid)
+
+    def _schedulable(self, items: list[dict], me_uid: str | None) -> list[dict]:
+        include_personal = (os.getenv("CLICKUP_INCLUDE_PERSONAL", "0").lower() in ("1", "true", "yes"))
         email_list_id = str(self.email_list_id) if self.email_list_id else None
         personal_space_id = str(self.personal_space_id) if self.personal_space_id else None
-
-        items = self.list_team_tasks(include_closed=False)
         out: list[dict] = []
 
         for tk in items:
@@ -279,8 +284,19 @@ class ClickUpClient:
         Recognized tags (lowercase): client, systems, marketing, admin, personal
         Returns keys the scheduler expects, including 'personal'.
         """
-        all_tasks = self.refresh_triaged_view_source()
+        return self.group_tasks(self.refresh_triaged_view_source())
+
+    def fetch_tasks_grouped_by_assignee(self, assignee_ids: list[str]) -> dict[str, dict[str, list[dict]]]:
+        """
+        One team-task listing for several assignees (multi-user planning), split per
+        assignee and grouped like fetch_tasks_grouped. Shared tasks appear for each assignee.
+        """
+        uids = [str(u).strip() for u in assignee_ids if str(u).strip()]
+        items = self.list_team_tasks(include_closed=False, assignees=uids)
+        return {uid: self.group_tasks(self._schedulable(items, uid)) for uid in uids}
 
+    def group_tasks(self, all_tasks: list[dict]) -> dict[str, list[dict]]:
+        """Bucket flattened tasks for the scheduler (see fetch_tasks_grouped)."""
         grouped: dict[str, list[dict]] = {
             "client_deep_work": [],
             "systems_development": [],
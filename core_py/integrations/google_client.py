@@ -0,0 +1,154 @@
+# core_py/integrations/google_client.py
+"""
+Process-wide Google API client provider.
+
+- Credentials are read from the token file once and kept in memory (reloaded only
+  if the file's mtime changes, e.g. after the OAuth callback rewrites it).
+- Tokens are refreshed proactively, REFRESH_MARGIN_S before expiry, under a lock,
+  and written back atomically (temp file + os.replace).
+- One discovery service object per (api, version, scopes) is reused for the life of
+  the process. httplib2.Http isn't thread-safe, so each request executes on a
+  thread-local AuthorizedHttp (FastAPI runs sync routes in a thread pool).
+"""
+from __future__ import annotations
+
+import datetime as dt
+import os
+import tempfile
+import threading
+import typing as t
+
+REFRESH_MARGIN_S = int(os.getenv("HELIOS_GOOGLE_REFRESH_MARGIN_S", "300"))
+CALENDAR_SCOPES = ("https://www.googleapis.com/auth/calendar",)
+
+
+class GoogleAuthError(RuntimeError):
+    def __init__(self, message: str, status_code: int = 403):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _write_atomic(path: str, data: str) -> None:
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".token-", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class GoogleClientProvider:
+    def __init__(self, token_file: str, refresh_margin_s: int = REFRESH_MARGIN_S):
+        self.token_file = token_file
+        self.refresh_margin_s = refresh_margin_s
+        self._lock = threading.RLock()
+        self._creds: dict[tuple, t.Any] = {}
+        self._mtime: float | None = None
+        self._services: dict[tuple, t.Any] = {}
+        self._local = threading.local()
+
+    # ---- credentials ----
+
+    def _check_file(self) -> None:
+        if not os.path.exists(self.token_file):
+            raise GoogleAuthError("No token found. Please authenticate first.", status_code=401)
+        mtime = os.path.getmtime(self.token_file)
+        if mtime != self._mtime:
+            # token rewritten outside this provider: drop everything built on the old one
+            self._creds.clear()
+            self._services.clear()
+            self._local = threading.local()
+            self._mtime = mtime
+
+    def _expiring(self, creds) -> bool:
+        if not creds.expiry:
+            return not creds.valid
+        expiry = creds.expiry.replace(tzinfo=dt.timezone.utc) if creds.expiry.tzinfo is None else creds.expiry
+        left = (expiry - dt.datetime.now(dt.timezone.utc)).total_seconds()
+        return left < self.refresh_margin_s
+
+    def credentials(self, scopes: t.Sequence[str] = CALENDAR_SCOPES):
+        from google.oauth2.credentials import Credentials
+        key = tuple(sorted(scopes))
+        with self._lock:
+            self._check_file()
+            creds = self._creds.get(key)
+            if creds is None:
+                creds = Credentials.from_authorized_user_file(self.token_file, list(key))
+                self._creds[key] = creds
+            if self._expiring(creds):
+                self._refresh(creds)
+            return creds
+
+    def _refresh(self, creds) -> None:
+        from google.auth.transport.requests import Request as GoogleRequest
+        if not creds.refresh_token:
+            raise GoogleAuthError("Invalid or expired credentials.")
+        try:
+            creds.refresh(GoogleRequest())
+        except Exception as e:
+            raise GoogleAuthError(f"Token refresh failed: {e}") from e
+        self.save(creds)
+
+    def save(self, creds) -> None:
+        """Write credentials to the token file atomically and keep the cache in step."""
+        with self._lock:
+            _write_atomic(self.token_file, creds.to_json())
+            self._mtime = os.path.getmtime(self.token_file)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._creds.clear()
+            self._services.clear()
+            self._local = threading.local()
+            self._mtime = None
+
+    # ---- services ----
+
+    def _http(self, creds):
+        import google_auth_httplib2
+        import httplib2
+        cache = self._local.__dict__.setdefault("http", {})
+        http = cache.get(id(creds))
+        if http is None:
+            http = cache[id(creds)] = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=30))
+        return http
+
+    def service(self, api: str = "calendar", version: str = "v3", scopes: t.Sequence[str] = CALENDAR_SCOPES):
+        from googleapiclient.discovery import build
+        from googleapiclient.http import HttpRequest
+        creds = self.credentials(scopes)  # proactive refresh happens here, once per call
+        key = (api, version, tuple(sorted(scopes)))
+        with self._lock:
+            svc = self._services.get(key)
+            if svc is None:
+                provider = self
+
+                def _request_builder(_http, *args, **kwargs):
+                    return HttpRequest(provider._http(creds), *args, **kwargs)
+
+                svc = build(api, version, credentials=creds, requestBuilder=_request_builder,
+                            cache_discovery=False)
+                self._services[key] = svc
+            return svc
+
+
+_providers: dict[str, GoogleClientProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_google_provider(token_file: str) -> GoogleClientProvider:
+    path = os.path.abspath(token_file)
+    with _providers_lock:
+        p = _providers.get(path)
+        if p is None:
+            p = _providers[path] = GoogleClientProvider(path)
+        return p
@@ -8,10 +8,11 @@ from time import perf_counter
 from typing import Optional
 from sqlalchemy import text 
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Match
 
 # Load environment variables from .env if present
 load_dotenv()
@@ -20,6 +21,8 @@ load_dotenv()
 # Config / Logging
 # -----------------------------------------------------------------------------
 DEV_MODE = os.getenv("ENV", "dev").lower() == "dev"
+CDC_ENABLED = os.getenv("HELIOS_CDC", "1").lower() in ("1", "true", "yes")
+SCHEDULER_WARM = bool(os.getenv("FIXED_CALENDAR_ID")) and os.getenv("HELIOS_SCHEDULER_WARM", "1").lower() in ("1", "true", "yes")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 ALLOW_ORIGINS_ENV = os.getenv("ALLOW_ORIGINS")  # comma-separated
 DEFAULT_DEV_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"]
@@ -49,10 +52,21 @@ from core_py.routes import reclaim_routes
 from core_py.routes import triage_routes
 from core_py.routes.contacts import router as contacts_router
 from core_py.routes import contacts_admin
+from core_py.routes.contacts_admin import require_admin
+from core_py.routes import profiling_admin
 from core_py.routes.schedule_routes import router as schedule_router
+from core_py.routes.block_scheduler_routes import router as block_scheduler_router
 from core_py.routes.email_tasks import router as email_tasks_router
 from core_py.db.session import get_session, db_session
 from core_py.routes.email_tasks_read import router as email_tasks_read_router
+from core_py.services.realtime import RealtimeHub, parse_topics
+from core_py.db import change_feed
+from core_py.db import instrumentation as db_instrumentation
+from core_py.db import query_audit
+from core_py.services import metrics
+from core_py.services import profiling
+from core_py.scheduler.service import get_service as get_scheduler_service
+from core_py.modules.fss.starling import client as starling_client
 # -----------------------------------------------------------------------------
 # FastAPI app
 # -----------------------------------------------------------------------------
@@ -74,6 +88,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# -----------------------------------------------------------------------------
+# Instrumentation (DB cursor hooks + outbound HTTP timing per upstream)
+# -----------------------------------------------------------------------------
+db_instrumentation.install()
+metrics.instrument_http()
+
+def _route_label(scope) -> str:
+    # Route template (e.g. /api/clients/{client_id}) keeps metric label cardinality bounded
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
 # -----------------------------------------------------------------------------
 # Structured logging middleware
 # -----------------------------------------------------------------------------
@@ -82,11 +110,17 @@ async def _request_logging(request: Request, call_next):
     rid = str(uuid.uuid4())
     start = perf_counter()
     status = 500
+    route = _route_label(request.scope)
+    token = metrics.begin_request(route)
+    stats = metrics.current_request()
+    metrics.HTTP_IN_FLIGHT.inc(route=route)
     try:
         response = await call_next(request)
         status = response.status_code
         try:
             response.headers["X-Request-ID"] = rid
+            if DEV_MODE and query_audit.ENABLED:
+                response.headers.update(query_audit.response_headers(stats))
         except Exception:
             pass
         return response
@@ -94,10 +128,65 @@ async def _request_logging(request: Request, call_next):
         logger.exception({"rid": rid, "path": str(request.url.path)})
         raise
     finally:
+        dur = perf_counter() - start
+        metrics.HTTP_IN_FLIGHT.dec(route=route)
+        metrics.observe_request(stats, request.method, status, dur)
+        metrics.end_request(token)
+        query_audit.check(stats, rid)
+        logger.info({
+            "rid": rid,
+            "path": str(request.url.path),
+            "status": status,
+            "dur_ms": int(dur * 1000),
+            "db_ms": int(stats.db_seconds * 1000),
+            "db_q": stats.db_queries,
+            "upstream_ms": {k: int(v * 1000) for k, v in stats.upstream_seconds.items()},
+        })
+
+# -----------------------------------------------------------------------------
+# On-demand profiling
+#   X-Helios-Profile: 1 + X-Admin-Key  -> always profiled and stored
+#   HELIOS_PROFILE_SAMPLE_RATE=0.01    -> 1% sampled, stored if >= HELIOS_PROFILE_MIN_MS
+# -----------------------------------------------------------------------------
+def _profile_requested(request: Request) -> bool:
+    if request.headers.get("x-helios-profile", "").lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        return require_admin(request.headers.get("x-admin-key"))
+    except HTTPException:
+        return False
+
+@app.middleware("http")
+async def _profiling(request: Request, call_next):
+    forced = _profile_requested(request)
+    if not forced and not profiling.should_sample():
+        return await call_next(request)
+    sampler = profiling.try_start()
+    if sampler is None:  # another profile is in progress
+        return await call_next(request)
+
+    start = perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        samples = profiling.finish(sampler)
         dur_ms = int((perf_counter() - start) * 1000)
-        logger.info(
-            {"rid": rid, "path": str(request.url.path), "status": status, "dur_ms": dur_ms}
-        )
+
+    if forced or dur_ms >= profiling.MIN_MS:
+        meta = {
+            "rid": response.headers.get("X-Request-ID"),
+            "method": request.method,
+            "path": str(request.url.path),
+            "route": _route_label(request.scope),
+            "status": response.status_code,
+            "dur_ms": dur_ms,
+            "trigger": "header" if forced else "sampled",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        pid = await asyncio.to_thread(profiling.save_profile, samples, meta)
+        if pid:
+            response.headers["X-Helios-Profile-Id"] = pid
+    return response
 
 # -----------------------------------------------------------------------------
 # Global exception envelope
@@ -125,7 +214,9 @@ app.include_router(reclaim_routes.router)
 app.include_router(triage_routes.router, prefix="/api/triage")
 app.include_router(contacts_router, prefix="/api")
 app.include_router(contacts_admin.router)
+app.include_router(profiling_admin.router)
 app.include_router(schedule_router, prefix="/api")
+app.include_router(block_scheduler_router, prefix="/api")
 app.include_router(email_tasks_router)
 app.include_router(email_tasks_read_router)
 
@@ -149,6 +240,10 @@ def exit_app():
 def healthz():
     return {"ok": True, "service": "Helios Backend v8.0"}
 
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/readyz")
 def readyz():
     try:
@@ -162,60 +257,101 @@ def readyz():
 # -----------------------------------------------------------------------------
 # Realtime: WebSocket + Metronome
 # -----------------------------------------------------------------------------
-_clients: set[WebSocket] = set()
-_seq = 0
 MAX_WS_CLIENTS = 200
+_hub = RealtimeHub(MAX_WS_CLIENTS)
 _metronome_task: Optional[asyncio.Task] = None
+_change_feed_task: Optional[asyncio.Task] = None
 
 async def _broadcast(stream: str, data: dict):
-    global _seq
-    _seq += 1
-    msg = json.dumps({
-        "stream": stream,
-        "seq": _seq,
-        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-        "data": data
-    })
-    dead = []
-    for ws in list(_clients):
-        try:
-            await ws.send_text(msg)
-        except Exception:
-            dead.append(ws)
-    for d in dead:
-        _clients.discard(d)
+    # Encoded once and queued per subscriber; never awaits a client socket.
+    _hub.publish(stream, data)
 
 @app.websocket("/ws")
 async def ws_main(ws: WebSocket):
+    """
+    Clients pick topics with ?topics=ticks,tasks (default: all) and can change them
+    later by sending {"subscribe": [...]} / {"unsubscribe": [...]}.
+    """
     await ws.accept()
-    if len(_clients) >= MAX_WS_CLIENTS:
+    if _hub.is_full():
         await ws.close(code=1001)
         return
-    _clients.add(ws)
+    _hub.register(ws, parse_topics(ws.query_params.get("topics")))
     try:
         while True:
-            await asyncio.sleep(3600)
+            raw = await ws.receive_text()
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                continue
+            if not isinstance(msg, dict):
+                continue
+            if msg.get("subscribe"):
+                _hub.subscribe(ws, msg["subscribe"])
+            if msg.get("unsubscribe"):
+                _hub.unsubscribe(ws, msg["unsubscribe"])
     except WebSocketDisconnect:
         pass
     finally:
-        _clients.discard(ws)
+        await _hub.unregister(ws)
+
+@app.get("/api/realtime/stats")
+def realtime_stats():
+    return _hub.stats()
+
+def _realtime_metric_lines():
+    s = _hub.stats()
+    return [
+        "# TYPE helios_ws_clients gauge",
+        f"helios_ws_clients {s['clients']}",
+        "# TYPE helios_ws_queue_depth gauge",
+        f"helios_ws_queue_depth {s['queue_depth_total']}",
+        "# TYPE helios_ws_queue_depth_max gauge",
+        f"helios_ws_queue_depth_max {s['queue_depth_max']}",
+        "# TYPE helios_ws_dropped_total counter",
+        f"helios_ws_dropped_total {s['dropped_total']}",
+        "# TYPE helios_ws_coalesced_total counter",
+        f"helios_ws_coalesced_total {s['coalesced_total']}",
+        "# TYPE helios_ws_evicted_total counter",
+        f"helios_ws_evicted_total {s['evicted_total']}",
+    ]
+
+metrics.REGISTRY.add_collector(_realtime_metric_lines)
 
 async def _metronome():
     while True:
         await asyncio.sleep(30)
         await _broadcast("ticks", {"type": "tick"})
 
+async def _start_change_feed():
+    """Install NOTIFY triggers and start the LISTEN loop (Postgres only)."""
+    global _change_feed_task
+    if not CDC_ENABLED or not change_feed.is_supported():
+        logger.info({"change_feed": "disabled"})
+        return
+    try:
+        await asyncio.to_thread(change_feed.ensure_change_triggers)
+    except Exception as e:
+        logger.warning({"change_feed": "trigger_install_failed", "error": str(e)})
+    _change_feed_task = asyncio.create_task(change_feed.run_change_feed(_hub.publish))
+
 @app.on_event("startup")
 async def _on_startup():
     global _metronome_task
     _metronome_task = asyncio.create_task(_metronome())
+    await _start_change_feed()
+    if SCHEDULER_WARM:
+        # Google/ClickUp clients + config ready before the first /api/schedule/plan
+        asyncio.get_running_loop().run_in_executor(None, get_scheduler_service().warm)
 
 @app.on_event("shutdown")
 async def _on_shutdown():
-    global _metronome_task
-    if _metronome_task and not _metronome_task.done():
-        _metronome_task.cancel()
-        try:
-            await _metronome_task
-        except asyncio.CancelledError:
-            pass
+    for task in (_metronome_task, _change_feed_task):
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    await _hub.close_all()
+    await starling_client.aclose()
@@ -75,6 +75,7 @@ class TransactionEfkaristo(Base):
     counterparty = Column(String, nullable=True)
     source = Column(String, nullable=True)
     status = Column(String(20), nullable=True)
+    feed_item_uid = Column(String, unique=True, nullable=True)  # Starling feedItemUid
 
 
 class TransactionPersonal(Base):
@@ -87,6 +88,7 @@ class TransactionPersonal(Base):
     counterparty = Column(String, nullable=True)
     source = Column(String, nullable=True)
     status = Column(String(20), nullable=True)
+    feed_item_uid = Column(String, unique=True, nullable=True)  # Starling feedItemUid
 
 
 class Balance(Base):
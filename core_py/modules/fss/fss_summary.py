@@ -1,52 +1,123 @@
 # core_py/modules/fss/fss_summary.py
 
-from datetime import datetime
-from sqlalchemy import func
-from core_py.db.database import get_session
-from core_py.models import TransactionEfkaristo, TransactionPersonal, Balance, FssSummary
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import func, text
+from core_py.db.session import db_session
+from core_py.models import Balance, FssSummary
+from core_py.modules.fss.projection import compute_projection
 
-def calculate_fss_summary():
+log = logging.getLogger("helios.fss")
+
+# The watermark below is when the last summary ran, not a transaction date, and
+# feeds deliver items dated days before they arrive: incremental runs also
+# recompute this many weeks before the watermark week.
+RECOMPUTE_WEEKS = int(os.getenv("HELIOS_FSS_RECOMPUTE_WEEKS", "1"))
+
+# Weekly rollup per ISO week (Monday start) and account (efkaristo / personal).
+# Incremental runs only recompute weeks from the one holding the last
+# fss_summary.created_at watermark onwards (less RECOMPUTE_WEEKS); the date indexes
+# keep that a range scan, so a run costs the same however many years of
+# transactions exist.
+DDL = """
+CREATE SCHEMA IF NOT EXISTS helios;
+CREATE TABLE IF NOT EXISTS helios.fss_weekly (
+  week_start   DATE NOT NULL,
+  account      TEXT NOT NULL,
+  iso_year     INT NOT NULL,
+  iso_week     INT NOT NULL,
+  tx_count     INT NOT NULL,
+  incoming     DOUBLE PRECISION NOT NULL,
+  outgoing     DOUBLE PRECISION NOT NULL,
+  net          DOUBLE PRECISION NOT NULL,
+  computed_at  TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+  PRIMARY KEY (week_start, account)
+);
+CREATE INDEX IF NOT EXISTS transaction_efkaristo_date_idx ON transaction_efkaristo (date);
+CREATE INDEX IF NOT EXISTS transaction_personal_date_idx ON transaction_personal (date);
+"""
+
+_TRANSACTIONS = """
+    SELECT date, amount, direction, 'efkaristo' AS account FROM transaction_efkaristo
+    UNION ALL
+    SELECT date, amount, direction, 'personal' AS account FROM transaction_personal
+"""
+
+
+def _week_start(d: datetime) -> datetime:
+    d = datetime(d.year, d.month, d.day)
+    return d - timedelta(days=d.weekday())
+
+
+def refresh_weekly(session, since: datetime | None = None) -> int:
+    """Recompute helios.fss_weekly for weeks starting at/after `since` (all weeks when None)."""
+    session.execute(text(DDL))
+    where = ""
+    params = {}
+    if since is not None:
+        where = "WHERE date >= :since"
+        params["since"] = _week_start(since)
+        session.execute(text("DELETE FROM helios.fss_weekly WHERE week_start >= :since"), params)
+    else:
+        session.execute(text("DELETE FROM helios.fss_weekly"))
+    result = session.execute(text(f"""
+        INSERT INTO helios.fss_weekly
+          (week_start, account, iso_year, iso_week, tx_count, incoming, outgoing, net, computed_at)
+        SELECT date_trunc('week', date)::date,
+               account,
+               extract(isoyear FROM date_trunc('week', date))::int,
+               extract(week FROM date_trunc('week', date))::int,
+               count(*),
+               coalesce(sum(amount) FILTER (WHERE direction = 'IN'), 0),
+               coalesce(sum(amount) FILTER (WHERE direction = 'OUT'), 0),
+               coalesce(sum(amount) FILTER (WHERE direction = 'IN'), 0)
+                 - coalesce(sum(amount) FILTER (WHERE direction = 'OUT'), 0),
+               now() AT TIME ZONE 'utc'
+        FROM ({_TRANSACTIONS}) t
+        {where}
+        GROUP BY 1, 2, 3, 4
+    """), params)
+    return result.rowcount
+
+
+def calculate_fss_summary(backfill: bool = False, since: datetime | None = None):
     """
-    Calculate weekly FSS summary from transactions and balances,
-    and insert a row into fss_summary (Postgres).
+    Calculate the FSS summary and insert a row into fss_summary (Postgres).
+
+    Weekly per-account aggregates are kept in helios.fss_weekly; only weeks from
+    RECOMPUTE_WEEKS before the last summary's created_at are recomputed
+    (backfill=True rebuilds every week; `since` widens the window for older
+    backdated imports). Totals are then summed from the rollup, not the raw rows.
+    The cash-flow projection for the new row is computed and cached straight after.
     """
 
     with db_session() as session:
-        # Fetch transactions
-        efkaristo_tx = session.query(
-            TransactionEfkaristo.date,
-            TransactionEfkaristo.amount,
-            TransactionEfkaristo.direction,
-            TransactionEfkaristo.counterparty,
-            TransactionEfkaristo.source,
-            TransactionEfkaristo.status
-        ).all()
-
-        personal_tx = session.query(
-            TransactionPersonal.date,
-            TransactionPersonal.amount,
-            TransactionPersonal.direction,
-            TransactionPersonal.counterparty,
-            TransactionPersonal.source,
-            TransactionPersonal.status
-        ).all()
+        watermark = None if backfill else session.query(func.max(FssSummary.created_at)).scalar()
+        if watermark is not None:
+            watermark = _week_start(watermark) - timedelta(weeks=RECOMPUTE_WEEKS)
+            if since is not None:
+                watermark = min(watermark, since)
+        refresh_weekly(session, since=watermark)
+
+        totals = session.execute(text("""
+            SELECT coalesce(sum(tx_count), 0) AS total_transactions,
+                   coalesce(sum(incoming), 0) AS total_incoming,
+                   coalesce(sum(outgoing), 0) AS total_outgoing
+            FROM helios.fss_weekly
+        """)).mappings().one()
 
         # Compute total balances
         total_balance = session.query(func.sum(Balance.balance)).scalar() or 0
 
-        # Prepare summary fields
-        total_transactions = len(efkaristo_tx) + len(personal_tx)
-        total_incoming = sum(
-            t.amount for t in efkaristo_tx + personal_tx if t.direction == "IN"
-        )
-        total_outgoing = sum(
-            t.amount for t in efkaristo_tx + personal_tx if t.direction == "OUT"
-        )
+        total_incoming = float(totals["total_incoming"])
+        total_outgoing = float(totals["total_outgoing"])
 
         # Insert into fss_summary
         summary_row = FssSummary(
             week_ending=datetime.utcnow().date(),
-            total_transactions=total_transactions,
+            total_transactions=int(totals["total_transactions"]),
             total_incoming=total_incoming,
             total_outgoing=total_outgoing,
             net_flow=total_incoming - total_outgoing,
@@ -56,5 +127,22 @@ def calculate_fss_summary():
 
         session.add(summary_row)
         session.commit()
+        session.refresh(summary_row)
+        session.expunge(summary_row)
+
+    try:
+        compute_projection(summary_row.id)
+    except Exception as e:
+        log.warning({"fss_projection": summary_row.id, "error": str(e)})
+
+    return summary_row
+
 
-        return summary_row
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compute the FSS summary (incremental by default)")
+    ap.add_argument("--backfill", action="store_true", help="Recompute every week of history")
+    ap.add_argument("--since", type=datetime.fromisoformat, default=None,
+                    help="Also recompute weeks from this date (YYYY-MM-DD), e.g. after a backdated import")
+    args = ap.parse_args()
+    row = calculate_fss_summary(backfill=args.backfill, since=args.since)
+    print(f"fss_summary #{row.id}: {row.total_transactions} tx, net {row.net_flow:.2f}")
@@ -0,0 +1,240 @@
+# core_py/modules/fss/projection.py
+"""
+Cash-flow projection for an FSS summary.
+
+- Recurring streams: transactions in the last LOOKBACK_DAYS grouped by
+  (direction, counterparty); a group is recurring when it has MIN_OCCURRENCES
+  and most of its gaps sit within tolerance of a known cadence (weekly,
+  fortnightly, four-weekly, monthly, quarterly). Streams whose last payment is
+  overdue by more than two cycles are treated as ended.
+- Everything else becomes a flat daily drift (mean non-recurring net per day).
+- The next HORIZON_DAYS are built as one daily flow array (np.add.at per stream),
+  cumulated onto today's balance; runway is the first day the series goes below zero.
+
+Results are cached in helios.fss_projection keyed by fss_summary.id, so reads are
+a single-row join; compute_projection() is cheap enough to run after every ingestion.
+"""
+
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import text
+
+from core_py.db.session import db_session
+
+log = logging.getLogger("helios.fss")
+
+LOOKBACK_DAYS = int(os.getenv("HELIOS_PROJECTION_LOOKBACK_DAYS", "180"))
+HORIZON_DAYS = int(os.getenv("HELIOS_PROJECTION_HORIZON_DAYS", "90"))
+MIN_OCCURRENCES = 3
+# (name, period in days, tolerance in days)
+CADENCES = (
+    ("weekly", 7, 1.5),
+    ("fortnightly", 14, 2.5),
+    ("four_weekly", 28, 2.5),
+    ("monthly", 30.44, 4.0),
+    ("quarterly", 91.3, 10.0),
+)
+REGULARITY = 0.6  # share of gaps that must fit the cadence
+
+DDL = """
+CREATE SCHEMA IF NOT EXISTS helios;
+CREATE TABLE IF NOT EXISTS helios.fss_projection (
+  summary_id          INT PRIMARY KEY,
+  computed_at         TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+  as_of               DATE NOT NULL,
+  opening_balance     DOUBLE PRECISION NOT NULL,
+  projected_cash_30d  DOUBLE PRECISION NOT NULL,
+  projected_cash_60d  DOUBLE PRECISION NOT NULL,
+  projected_cash_90d  DOUBLE PRECISION NOT NULL,
+  runway_days         INT,
+  daily_drift         DOUBLE PRECISION NOT NULL,
+  daily               JSONB NOT NULL,
+  recurring           JSONB NOT NULL
+);
+"""
+
+
+def _load_transactions(session, since: date):
+    rows = session.execute(text("""
+        SELECT date::date AS day,
+               CASE WHEN direction = 'IN' THEN amount ELSE -amount END AS signed,
+               direction,
+               lower(btrim(coalesce(counterparty, ''))) AS counterparty
+        FROM (
+            SELECT date, amount, direction, counterparty FROM transaction_efkaristo WHERE date >= :since
+            UNION ALL
+            SELECT date, amount, direction, counterparty FROM transaction_personal WHERE date >= :since
+        ) t
+        WHERE direction IN ('IN', 'OUT')
+    """), {"since": since}).all()
+    return rows
+
+
+def _opening_balance(session, summary_closing: Optional[float]) -> float:
+    """Latest per-account balances if recorded, else the summary's closing balance."""
+    try:
+        total = session.execute(text("SELECT sum(balance) FROM helios.balances_latest")).scalar()
+    except Exception:
+        session.rollback()
+        total = None
+    if total is not None:
+        return float(total)
+    return float(summary_closing or 0.0)
+
+
+def _cadence(gaps: np.ndarray):
+    """Best matching (name, period) for the gaps, or None if they aren't regular."""
+    best, best_rank = None, None
+    typical = float(np.median(gaps))
+    for name, period, tol in CADENCES:
+        fit = float(np.mean(np.abs(gaps - period) <= tol))
+        rank = (fit, -abs(typical - period))  # ties (e.g. 30-day gaps) go to the nearest period
+        if fit >= REGULARITY and (best_rank is None or rank > best_rank):
+            best, best_rank = (name, period, fit), rank
+    return best
+
+
+def detect_recurring(days: np.ndarray, signed: np.ndarray, keys: np.ndarray, today_ord: int):
+    """
+    days: day ordinals, signed: +in/-out amounts, keys: "DIR|counterparty" strings.
+    Returns (streams, recurring_mask).
+    """
+    streams = []
+    mask = np.zeros(len(days), dtype=bool)
+    if not len(days):
+        return streams, mask
+    order = np.lexsort((days, keys))
+    uniq, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    for key, start, n in zip(uniq, starts, counts):
+        if n < MIN_OCCURRENCES or key.endswith("|"):
+            continue
+        idx = order[start:start + n]
+        d = days[idx]
+        gaps = np.diff(d).astype(float)
+        gaps = gaps[gaps > 0]  # same-day splits count once
+        if len(gaps) < MIN_OCCURRENCES - 1:
+            continue
+        match = _cadence(gaps)
+        if match is None:
+            continue
+        name, period, fit = match
+        last = int(d[-1])
+        if today_ord - last > 2 * period + 7:
+            continue  # stopped
+        amount = float(np.median(signed[idx]))
+        direction, counterparty = key.split("|", 1)
+        streams.append({
+            "counterparty": counterparty,
+            "direction": direction,
+            "cadence": name,
+            "period_days": round(float(np.median(gaps)) if name != "monthly" else period, 2),
+            "amount": round(amount, 2),
+            "occurrences": int(n),
+            "last_date": date.fromordinal(last).isoformat(),
+            "regularity": round(fit, 2),
+        })
+        mask[idx] = True
+    return streams, mask
+
+
+def build_projection(rows, opening_balance: float, today: date, horizon: int = HORIZON_DAYS) -> dict:
+    today_ord = today.toordinal()
+    days = np.fromiter((r[0].toordinal() for r in rows), dtype=np.int64, count=len(rows))
+    signed = np.fromiter((r[1] for r in rows), dtype=float, count=len(rows))
+    keys = np.array([f"{r[2]}|{r[3]}" for r in rows], dtype=object)
+
+    streams, mask = detect_recurring(days, signed, keys, today_ord)
+
+    # Non-recurring activity as an average per calendar day of the lookback window
+    span = max(1, min(LOOKBACK_DAYS, today_ord - int(days.min()) + 1)) if len(days) else 1
+    drift = float(signed[~mask].sum()) / span if len(days) else 0.0
+
+    flows = np.full(horizon, drift, dtype=float)
+    for s in streams:
+        period = s["period_days"]
+        nxt = date.fromisoformat(s["last_date"]).toordinal() + period
+        while nxt <= today_ord:
+            nxt += period  # missed while overdue: next expected slot
+        offsets = np.arange(nxt - today_ord, horizon + 1, period).round().astype(int) - 1
+        offsets = offsets[(offsets >= 0) & (offsets < horizon)]
+        np.add.at(flows, offsets, s["amount"])
+
+    cash = opening_balance + np.cumsum(flows)
+    below = np.flatnonzero(cash < 0)
+    if len(below):
+        runway = int(below[0]) + 1
+    elif cash[-1] < opening_balance:
+        burn = (opening_balance - cash[-1]) / horizon
+        runway = horizon + int(cash[-1] / burn)
+    else:
+        runway = None  # not burning cash
+
+    def at(day: int) -> float:
+        return round(float(cash[min(day, horizon) - 1]), 2)
+
+    return {
+        "as_of": today,
+        "opening_balance": round(opening_balance, 2),
+        "projected_cash_30d": at(30),
+        "projected_cash_60d": at(60),
+        "projected_cash_90d": at(90),
+        "runway_days": runway,
+        "daily_drift": round(drift, 2),
+        "daily": [[(today + timedelta(days=i + 1)).isoformat(), round(float(v), 2)] for i, v in enumerate(cash)],
+        "recurring": streams,
+    }
+
+
+def compute_projection(summary_id: Optional[int] = None, force: bool = False) -> Optional[dict]:
+    """
+    Projection for `summary_id` (latest fss_summary when None), computed once and
+    cached in helios.fss_projection; force=True recomputes.
+    """
+    with db_session() as s:
+        s.execute(text(DDL))
+        s.commit()
+        summary = s.execute(text("""
+            SELECT id, closing_balance FROM fss_summary
+            WHERE (CAST(:sid AS INT) IS NULL OR id = :sid)
+            ORDER BY created_at DESC LIMIT 1
+        """), {"sid": summary_id}).mappings().first()
+        if summary is None:
+            return None
+        if not force:
+            cached = s.execute(text("SELECT * FROM helios.fss_projection WHERE summary_id = :sid"),
+                               {"sid": summary["id"]}).mappings().first()
+            if cached:
+                return dict(cached)
+
+        today = datetime.utcnow().date()
+        rows = _load_transactions(s, today - timedelta(days=LOOKBACK_DAYS))
+        proj = build_projection(rows, _opening_balance(s, summary["closing_balance"]), today)
+        s.execute(text("""
+            INSERT INTO helios.fss_projection
+              (summary_id, computed_at, as_of, opening_balance, projected_cash_30d, projected_cash_60d,
+               projected_cash_90d, runway_days, daily_drift, daily, recurring)
+            VALUES (:summary_id, now() AT TIME ZONE 'utc', :as_of, :opening_balance, :projected_cash_30d,
+                    :projected_cash_60d, :projected_cash_90d, :runway_days, :daily_drift,
+                    CAST(:daily AS JSONB), CAST(:recurring AS JSONB))
+            ON CONFLICT (summary_id) DO UPDATE SET
+              computed_at=EXCLUDED.computed_at,
+              as_of=EXCLUDED.as_of,
+              opening_balance=EXCLUDED.opening_balance,
+              projected_cash_30d=EXCLUDED.projected_cash_30d,
+              projected_cash_60d=EXCLUDED.projected_cash_60d,
+              projected_cash_90d=EXCLUDED.projected_cash_90d,
+              runway_days=EXCLUDED.runway_days,
+              daily_drift=EXCLUDED.daily_drift,
+              daily=EXCLUDED.daily,
+              recurring=EXCLUDED.recurring
+        """), {**proj, "summary_id": summary["id"],
+               "daily": json.dumps(proj["daily"]), "recurring": json.dumps(proj["recurring"])})
+        s.commit()
+        log.info({"fss_projection": summary["id"], "streams": len(proj["recurring"]),
+                  "runway_days": proj["runway_days"], "tx": len(rows)})
+        return {**proj, "summary_id": summary["id"]}
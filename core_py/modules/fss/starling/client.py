@@ -1,26 +1,161 @@
+import asyncio
+import hashlib
+import os
+import random
+from datetime import datetime, timezone
+
+import httpx
 import requests
+from cachetools import TTLCache
 
 BASE_URL = "https://api.starlingbank.com/api/v2"
 
+TIMEOUT_S = float(os.getenv("STARLING_TIMEOUT_S", "10"))
+MAX_RETRIES = int(os.getenv("STARLING_MAX_RETRIES", "3"))
+# Dashboard refreshes inside this window are served from memory
+CACHE_TTL_S = float(os.getenv("STARLING_CACHE_TTL_S", "30"))
+
+_cache: TTLCache = TTLCache(maxsize=64, ttl=CACHE_TTL_S)
+_inflight: dict = {}
+_client: httpx.AsyncClient | None = None
+_client_loop = None
+_session = requests.Session()
+
+
 def get_headers(token: str):
     return {"Authorization": f"Bearer {token}"}
 
-def get_accounts(token: str):
-    url = f"{BASE_URL}/accounts"
-    res = requests.get(url, headers=get_headers(token))
+
+# ---- sync (scripts) ----
+
+def _get(path: str, token: str):
+    res = _session.get(f"{BASE_URL}{path}", headers=get_headers(token), timeout=TIMEOUT_S)
     res.raise_for_status()
     return res.json()
 
+
+def get_accounts(token: str):
+    return _get("/accounts", token)
+
+
 def get_account_balance(account_uid: str, token: str):
-    url = f"{BASE_URL}/accounts/{account_uid}/balance"
-    res = requests.get(url, headers=get_headers(token))
-    res.raise_for_status()
-    return res.json()
+    return _get(f"/accounts/{account_uid}/balance", token)
+
 
 def get_spaces(account_uid: str, token: str, account_type: str):
     # Always use savings-goals for both account types
-    url = f"{BASE_URL}/account/{account_uid}/savings-goals"
-    res = requests.get(url, headers=get_headers(token))
-    res.raise_for_status()
-    return res.json()
+    return _get(f"/account/{account_uid}/savings-goals", token)
+
+
+# ---- async (routes) ----
+
+def _async_client() -> httpx.AsyncClient:
+    """One pooled client per event loop (a client can't be shared across loops)."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            timeout=httpx.Timeout(TIMEOUT_S, connect=5.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+            transport=httpx.AsyncHTTPTransport(retries=2),  # connect failures only
+        )
+        _client_loop = loop
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+async def _request(path: str, token: str, params: dict | None = None):
+    """GET with retry on 429/5xx and network errors (exponential backoff, honours Retry-After)."""
+    backoff = 0.5
+    for attempt in range(MAX_RETRIES + 1):
+        last = attempt >= MAX_RETRIES
+        try:
+            res = await _async_client().get(path, headers=get_headers(token), params=params)
+        except httpx.TransportError:
+            if last:
+                raise
+        else:
+            if res.status_code != 429 and res.status_code < 500 or last:
+                res.raise_for_status()
+                return res.json()
+            try:
+                backoff = max(backoff, float(res.headers.get("Retry-After", backoff)))
+            except ValueError:
+                pass
+        await asyncio.sleep(backoff + random.uniform(0, backoff / 4))
+        backoff *= 2
+
+
+async def _fetch(path: str, token: str):
+    data = await _request(path, token)
+    return data, datetime.now(timezone.utc)
+
+
+async def _cached_entry(path: str, token: str):
+    """(data, fetched_at); fetched_at is when Starling answered, so cache hits keep the original time."""
+    key = (path, hashlib.sha256((token or "").encode()).hexdigest()[:16])
+    if key in _cache:
+        return _cache[key]
+    # concurrent callers for the same resource share one upstream request
+    task = _inflight.get(key)
+    if task is None:
+        task = _inflight[key] = asyncio.ensure_future(_fetch(path, token))
+        task.add_done_callback(lambda _t: _inflight.pop(key, None))
+    entry = await task
+    _cache[key] = entry
+    return entry
+
+
+async def _cached(path: str, token: str):
+    return (await _cached_entry(path, token))[0]
+
+
+async def aget_account_balance(account_uid: str, token: str):
+    return await _cached(f"/accounts/{account_uid}/balance", token)
+
+
+async def aget_spaces(account_uid: str, token: str, account_type: str):
+    return await _cached(f"/account/{account_uid}/savings-goals", token)
+
+
+async def aget_balance_and_spaces(account_uid: str, token: str, account_type: str):
+    """(balance, spaces) for one account, both requests in flight together."""
+    return await asyncio.gather(
+        aget_account_balance(account_uid, token),
+        aget_spaces(account_uid, token, account_type),
+    )
+
+
+async def aget_balance_snapshot(account_uid: str, token: str, account_type: str):
+    """
+    (balance, spaces, fetched_at) for one account. fetched_at is when the balance came
+    from Starling: record history with it, so repeat reads served from the cache land
+    on the same (account, as_of) instead of adding stale points stamped "now".
+    """
+    (balance, fetched_at), spaces = await asyncio.gather(
+        _cached_entry(f"/accounts/{account_uid}/balance", token),
+        aget_spaces(account_uid, token, account_type),
+    )
+    return balance, spaces, fetched_at
+
+
+async def aget_accounts(token: str):
+    return await _cached("/accounts", token)
+
+
+async def aget_feed_changes(account_uid: str, category_uid: str, token: str, changes_since: str):
+    """Feed items in one category created or updated after `changes_since` (ISO-8601, uncached)."""
+    data = await _request(f"/feed/account/{account_uid}/category/{category_uid}", token,
+                          params={"changesSince": changes_since})
+    return data.get("feedItems", [])
+
 
+def clear_cache():
+    _cache.clear()
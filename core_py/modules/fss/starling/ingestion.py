@@ -0,0 +1,320 @@
+# core_py/modules/fss/starling/ingestion.py
+"""
+Starling feed -> transaction_efkaristo / transaction_personal (Postgres).
+
+Each run asks Starling only for feed items changed since the per-account,
+per-category watermark in helios.starling_feed_watermarks, fetching every
+category of every account concurrently. All items are COPYed into a temp
+staging table and merged on feed_item_uid in one transaction together with
+the new watermarks, so a failed run leaves nothing half-written and the next
+run simply picks up from the old watermarks.
+
+Rows from before feed_item_uid existed (NULL uid, see alembic e9b653e3e252) are
+adopted by the first staged item with the same day, amount, direction and
+counterparty, so the first runs don't insert a second copy of them.
+
+    python -m core_py.modules.fss.starling.ingestion [--since-days N] [--no-balances]
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from core_py.db.session import db_session
+from core_py.modules.fss.fss_summary import refresh_weekly
+from core_py.modules.fss.projection import compute_projection
+from core_py.modules.fss.starling import client
+
+load_dotenv()
+
+log = logging.getLogger("helios.starling")
+
+# First run (no watermark yet) looks back this far
+INITIAL_DAYS = int(os.getenv("STARLING_INITIAL_DAYS", "30"))
+# Re-read a little before the watermark; the merge on feed_item_uid makes overlap harmless
+OVERLAP = timedelta(minutes=int(os.getenv("STARLING_WATERMARK_OVERLAP_MIN", "10")))
+
+ACCOUNTS = [
+    {
+        "name": "Efkaristo",
+        "type": "business",
+        "token": os.getenv("EFK_STARLING_TOKEN"),
+        "account_uid": os.getenv("EFK_ACCOUNT_UID"),
+        "tx_table": "transaction_efkaristo",
+    },
+    {
+        "name": "Personal",
+        "type": "personal",
+        "token": os.getenv("PERS_STARLING_TOKEN"),
+        "account_uid": os.getenv("PERS_ACCOUNT_UID"),
+        "tx_table": "transaction_personal",
+    },
+]
+
+DDL = """
+CREATE SCHEMA IF NOT EXISTS helios;
+CREATE TABLE IF NOT EXISTS helios.starling_feed_watermarks (
+  account_uid    TEXT NOT NULL,
+  category_uid   TEXT NOT NULL,
+  category_name  TEXT,
+  changes_since  TIMESTAMPTZ NOT NULL,
+  items_seen     INT NOT NULL DEFAULT 0,
+  last_run       TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (account_uid, category_uid)
+);
+ALTER TABLE transaction_efkaristo ADD COLUMN IF NOT EXISTS feed_item_uid VARCHAR;
+ALTER TABLE transaction_personal ADD COLUMN IF NOT EXISTS feed_item_uid VARCHAR;
+CREATE UNIQUE INDEX IF NOT EXISTS transaction_efkaristo_feed_item_uid_key ON transaction_efkaristo (feed_item_uid);
+CREATE UNIQUE INDEX IF NOT EXISTS transaction_personal_feed_item_uid_key ON transaction_personal (feed_item_uid);
+"""
+
+STAGE_COLUMNS = ("tx_table", "feed_item_uid", "date", "amount", "direction", "counterparty", "source", "status")
+
+# Give legacy NULL-uid rows the uid of a matching staged item (pairwise: two identical
+# transactions on a day need two items) before merging on feed_item_uid
+_ADOPT = """
+    WITH legacy AS (
+        SELECT id, date::date AS day, round(amount::numeric, 2) AS amt, direction,
+               coalesce(counterparty, '') AS cp,
+               row_number() OVER (PARTITION BY date::date, round(amount::numeric, 2), direction,
+                                  coalesce(counterparty, '') ORDER BY id) AS n
+        FROM {table}
+        WHERE feed_item_uid IS NULL
+    ), staged AS (
+        SELECT feed_item_uid, date, date::date AS day, round(amount::numeric, 2) AS amt, direction,
+               coalesce(counterparty, '') AS cp,
+               row_number() OVER (PARTITION BY date::date, round(amount::numeric, 2), direction,
+                                  coalesce(counterparty, '') ORDER BY date, feed_item_uid) AS n
+        FROM (SELECT DISTINCT ON (feed_item_uid) * FROM starling_stage
+              WHERE tx_table = :table ORDER BY feed_item_uid) st
+        WHERE NOT EXISTS (SELECT 1 FROM {table} x WHERE x.feed_item_uid = st.feed_item_uid)
+    )
+    UPDATE {table} t SET feed_item_uid = staged.feed_item_uid, date = staged.date
+    FROM legacy JOIN staged USING (day, amt, direction, cp, n)
+    WHERE t.id = legacy.id
+"""
+
+# Items already stored only change status/amount (e.g. PENDING -> SETTLED); anything else is left alone
+_MERGE = """
+    INSERT INTO {table} (feed_item_uid, date, amount, direction, counterparty, source, status)
+    SELECT DISTINCT ON (feed_item_uid) feed_item_uid, date, amount, direction, counterparty, source, status
+    FROM starling_stage
+    WHERE tx_table = :table
+    ORDER BY feed_item_uid
+    ON CONFLICT (feed_item_uid) DO UPDATE SET
+      status=EXCLUDED.status,
+      amount=EXCLUDED.amount
+    WHERE ({table}.status, {table}.amount) IS DISTINCT FROM (EXCLUDED.status, EXCLUDED.amount)
+    RETURNING (xmax = 0) AS inserted, date
+"""
+
+
+def _iso(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _tx_time(item: dict):
+    raw = item.get("transactionTime")
+    if not raw:
+        return None
+    return datetime.fromisoformat(raw.replace("Z", "+00:00")).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def stage_row(tx_table: str, item: dict):
+    """feed item -> staging tuple (None for items that can't be stored)."""
+    when = _tx_time(item)
+    if not item.get("feedItemUid") or when is None or item.get("direction") not in ("IN", "OUT"):
+        return None
+    return (
+        tx_table,
+        item["feedItemUid"],
+        when,
+        (item.get("amount") or {}).get("minorUnits", 0) / 100,
+        item["direction"],
+        item.get("counterPartyName", ""),
+        item.get("source", ""),
+        item.get("status", ""),
+    )
+
+
+def load_watermarks() -> dict:
+    with db_session() as s:
+        s.execute(text(DDL))
+        s.commit()
+        rows = s.execute(text("""
+            SELECT account_uid, category_uid, changes_since FROM helios.starling_feed_watermarks
+        """)).all()
+    return {(r[0], r[1]): r[2] for r in rows}
+
+
+async def _categories(acct: dict) -> list:
+    """[(name, category_uid)]: the account's default category plus every space / savings goal."""
+    accounts = await client.aget_accounts(acct["token"])
+    listed = accounts.get("accounts", [])
+    main = next((a for a in listed if a.get("accountUid") == acct["account_uid"]), listed[0] if listed else {})
+    cats = [("PRIMARY", main.get("defaultCategory"))] if main.get("defaultCategory") else []
+    spaces = await client.aget_spaces(acct["account_uid"], acct["token"], acct["type"])
+    for sp in spaces.get("spaces") or spaces.get("savingsGoals") or spaces.get("savingsGoalList") or []:
+        uid = sp.get("categoryUid") or sp.get("savingsGoalUid")
+        if uid:
+            cats.append((sp.get("name") or sp.get("savingsGoalName") or "", uid))
+    return cats
+
+
+async def fetch_changes(watermarks: dict, since_days: int = INITIAL_DAYS) -> tuple:
+    """
+    Concurrently fetch changed feed items for every category of every account.
+    Returns (rows, marks, failures): staging tuples, the watermarks to save for the
+    categories that succeeded, and {"account/category": error} for those that didn't.
+    """
+    started = datetime.now(timezone.utc)
+    default_since = started - timedelta(days=since_days)
+    accts = [a for a in ACCOUNTS if a["token"] and a["account_uid"]]
+
+    cat_lists = await asyncio.gather(*(_categories(a) for a in accts), return_exceptions=True)
+    jobs, failures = [], {}
+    for acct, cats in zip(accts, cat_lists):
+        if isinstance(cats, BaseException):
+            failures[acct["name"]] = str(cats)
+            continue
+        for name, cat_uid in cats:
+            since = watermarks.get((acct["account_uid"], cat_uid))
+            since = since - OVERLAP if since else default_since
+            jobs.append((acct, name, cat_uid, since))
+
+    results = await asyncio.gather(
+        *(client.aget_feed_changes(a["account_uid"], cat, a["token"], _iso(since)) for a, _n, cat, since in jobs),
+        return_exceptions=True,
+    )
+
+    rows, marks = [], []
+    for (acct, name, cat_uid, _since), items in zip(jobs, results):
+        if isinstance(items, BaseException):
+            failures[f"{acct['name']}/{name}"] = str(items)
+            continue
+        staged = [r for r in (stage_row(acct["tx_table"], it) for it in items) if r]
+        rows.extend(staged)
+        marks.append({"account_uid": acct["account_uid"], "category_uid": cat_uid, "category_name": name,
+                      "changes_since": started, "items_seen": len(items)})
+    return rows, marks, failures
+
+
+def _copy_rows(dbapi_conn, rows: list):
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    for r in rows:
+        w.writerow([v.isoformat() if isinstance(v, datetime) else v for v in r])
+    buf.seek(0)
+    with dbapi_conn.cursor() as cur:
+        cur.copy_expert(f"COPY starling_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def write_changes(rows: list, marks: list) -> dict:
+    """Stage + merge + advance watermarks in a single transaction. Returns per-table counts."""
+    counts = {}
+    with db_session() as s:
+        s.execute(text(DDL))
+        s.execute(text("""
+            CREATE TEMP TABLE starling_stage (
+              tx_table TEXT, feed_item_uid TEXT, date TIMESTAMP, amount DOUBLE PRECISION,
+              direction TEXT, counterparty TEXT, source TEXT, status TEXT
+            ) ON COMMIT DROP
+        """))
+        if rows:
+            _copy_rows(s.connection().connection, rows)
+        for table in sorted({a["tx_table"] for a in ACCOUNTS}):
+            adopted = s.execute(text(_ADOPT.format(table=table)), {"table": table}).rowcount if rows else 0
+            res = s.execute(text(_MERGE.format(table=table)), {"table": table}).all()
+            counts[table] = {"inserted": sum(1 for r in res if r[0]), "updated": sum(1 for r in res if not r[0]),
+                             "adopted": adopted, "earliest": min((r[1] for r in res), default=None)}
+        if marks:
+            s.execute(text("""
+                INSERT INTO helios.starling_feed_watermarks
+                  (account_uid, category_uid, category_name, changes_since, items_seen, last_run)
+                VALUES (:account_uid, :category_uid, :category_name, :changes_since, :items_seen, now())
+                ON CONFLICT (account_uid, category_uid) DO UPDATE SET
+                  category_name=EXCLUDED.category_name,
+                  changes_since=EXCLUDED.changes_since,
+                  items_seen=EXCLUDED.items_seen,
+                  last_run=now()
+            """), marks)
+        s.commit()
+    return counts
+
+
+async def _record_balances():
+    from core_py.db.balances_pg import record_balances
+    from core_py.modules.fss.starling.transform import transform_starling_to_helios
+
+    accts = [a for a in ACCOUNTS if a["token"] and a["account_uid"]]
+    fetched = await asyncio.gather(
+        *(client.aget_balance_snapshot(a["account_uid"], a["token"], a["type"]) for a in accts),
+        return_exceptions=True,
+    )
+    snapshots = []
+    for acct, got in zip(accts, fetched):
+        if isinstance(got, BaseException):
+            print(f"⚠️ {acct['name']} balance failed: {got}")
+            continue
+        snap = transform_starling_to_helios(got[0], got[1], acct["name"])
+        snapshots.append({"account_id": acct["account_uid"], "account_name": acct["name"], "currency": "GBP",
+                          "balance": snap["combined_balance"], "as_of": got[2], "source": "starling"})
+    await asyncio.to_thread(record_balances, snapshots)
+
+
+def refresh_fss(since: datetime):
+    """
+    Bring the weekly rollup up to date from `since` and recompute the projection of
+    the latest fss_summary in place; summary rows themselves stay on their own
+    schedule (fss_summary CLI), so ingestion runs don't pile up summaries.
+    """
+    with db_session() as s:
+        refresh_weekly(s, since=since)
+        s.commit()
+    try:
+        compute_projection(force=True)
+    except Exception as e:
+        log.warning({"fss_projection": "refresh_failed", "error": str(e)})
+
+
+async def run(since_days: int = INITIAL_DAYS, balances: bool = True) -> dict:
+    try:
+        rows, marks, failures = await fetch_changes(load_watermarks(), since_days)
+        counts = await asyncio.to_thread(write_changes, rows, marks)
+        if balances:
+            await _record_balances()
+        earliest = [c["earliest"] for c in counts.values() if c["earliest"]]
+        if earliest:
+            # new or changed transactions: refresh the rollup from the earliest week
+            # touched (so backdated feed items are included) and the current projection
+            await asyncio.to_thread(refresh_fss, min(earliest))
+    finally:
+        await client.aclose()
+    log.info({"starling_ingestion": counts, "categories": len(marks), "failures": failures})
+    return {"counts": counts, "categories": len(marks), "failures": failures}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Ingest new Starling feed items into Postgres")
+    ap.add_argument("--since-days", type=int, default=INITIAL_DAYS,
+                    help="Look-back for categories without a watermark (default %(default)s)")
+    ap.add_argument("--no-balances", action="store_true", help="Skip recording balance snapshots")
+    args = ap.parse_args()
+    out = asyncio.run(run(args.since_days, balances=not args.no_balances))
+    for table, c in out["counts"].items():
+        print(f"✅ {table}: {c['inserted']} new, {c['updated']} updated, {c['adopted']} legacy rows matched")
+    for where, err in out["failures"].items():
+        print(f"⚠️ {where} failed: {err}")
+    print("🎉 Starling ingestion complete")
+    return 1 if out["failures"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
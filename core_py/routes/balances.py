@@ -1,12 +1,14 @@
 from fastapi import APIRouter
+import asyncio
 import os
-from core_py.modules.fss.starling.client import get_account_balance, get_spaces
+from core_py.db.balances_pg import record_balances
+from core_py.modules.fss.starling.client import aget_balance_snapshot
 from core_py.modules.fss.starling.transform import transform_starling_to_helios
 
 router = APIRouter()
 
 @router.get("/balances/current")
-def get_current_balances():
+async def get_current_balances():
     accounts = [
         {
             "name": "Efkaristo",
@@ -23,14 +25,36 @@ def get_current_balances():
     ]
 
     result = {}
+    snapshots = []
 
-    for acct in accounts:
+    # Balance + spaces for both accounts in flight together (one round trip)
+    fetched = await asyncio.gather(
+        *(aget_balance_snapshot(a["account_uid"], a["token"], a["type"]) for a in accounts),
+        return_exceptions=True,
+    )
+
+    for acct, got in zip(accounts, fetched):
         try:
-            balance = get_account_balance(acct["account_uid"], acct["token"])
-            spaces = get_spaces(acct["account_uid"], acct["token"], acct["type"])
+            if isinstance(got, BaseException):
+                raise got
+            balance, spaces, fetched_at = got
             snapshot = transform_starling_to_helios(balance, spaces, acct["name"])
             result[acct["name"].lower()] = snapshot
+            snapshots.append({
+                "account_id": acct["account_uid"] or acct["name"].lower(),
+                "account_name": acct["name"],
+                "currency": "GBP",
+                "balance": snapshot["combined_balance"],
+                "as_of": fetched_at,  # cached reads re-record the same point (a no-op)
+                "source": "starling",
+            })
         except Exception as e:
             result[acct["name"].lower()] = {"error": str(e)}
 
+    # Keep the balance history current; a DB problem shouldn't break the live read
+    try:
+        await asyncio.to_thread(record_balances, snapshots)
+    except Exception as e:
+        print(f"⚠️ record_balances failed: {e}")
+
     return result
@@ -0,0 +1,101 @@
+# core_py/routes/block_scheduler_routes.py
+from __future__ import annotations
+
+import datetime as dt
+from typing import Literal, Optional
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from pydantic import BaseModel, Field
+
+from core_py.integrations.calendar_sync import get_calendar_sync
+from core_py.scheduler.reflow import get_block_index, reflow_now
+from core_py.scheduler.service import get_service
+
+router = APIRouter()
+
+
+class PlanRequest(BaseModel):
+    start_date: Optional[dt.date] = None          # default: today
+    window_days: int = Field(14, ge=1, le=120)
+    solver: Literal["greedy", "ilp"] = "greedy"
+    incremental: bool = False                     # replan against the stored plan (greedy)
+    plan_key: str = "default"
+    refresh: bool = False                         # bypass cached ClickUp / free-busy snapshots
+
+
+class ApplyRequest(PlanRequest):
+    respect_existing: bool = False                # keep unkeyed/unmatched suggestion events
+    refresh: bool = True
+
+
+class ReflowRequest(BaseModel):
+    now: Optional[dt.datetime] = None             # default: current time (UTC)
+    min_chunk: int = Field(15, ge=1)              # skip when fewer minutes are left in the block
+    per_task_cap: int = Field(60, ge=0)           # max minutes pulled from any one task
+    dry_run: bool = False                         # report the reflow without writing
+
+
+def _public(out: dict) -> dict:
+    return {k: v for k, v in out.items() if not k.startswith("_")}
+
+
+@router.post("/schedule/plan")
+def plan_schedule(req: PlanRequest):
+    """
+    Dry-run: compute block suggestions for the window and return the Plan as JSON.
+    """
+    try:
+        out = get_service().plan(req.start_date, req.window_days, req.solver,
+                                 req.incremental, req.plan_key, req.refresh)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return _public(out)
+
+
+@router.post("/schedule/apply")
+def apply_schedule(req: ApplyRequest):
+    """
+    Plan, then reconcile the suggestions calendar (batched insert/patch/delete of changed blocks only).
+    """
+    try:
+        out = get_service().apply(req.start_date, req.window_days, req.solver, req.incremental,
+                                  req.plan_key, req.respect_existing, req.refresh)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return _public(out)
+
+
+@router.post("/schedule/reflow-now")
+def reflow_current_block(req: ReflowRequest):
+    """
+    Finished early: end the current Helios block now and refill the rest of it from the same bucket.
+    Served from the in-memory block index + cached ClickUp snapshot; one batched calendar write.
+    """
+    try:
+        return reflow_now(get_service(), now=req.now, min_chunk=req.min_chunk,
+                          per_task_cap=req.per_task_cap, dry_run=req.dry_run)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/schedule/reflow/notify")
+def suggestions_calendar_changed(request: Request, background: BackgroundTasks):
+    """
+    Google Calendar push-notification target (events.watch on the Suggestions calendar):
+    drop the block index so the next reflow reloads it. Only channels opened through
+    /api/calendar/watch are accepted, checked by channel id + X-Goog-Channel-Token.
+    """
+    sync = get_calendar_sync()
+    state = request.headers.get("X-Goog-Resource-State", "")
+    cal_id = sync.handle_notification(
+        request.headers.get("X-Goog-Channel-ID", ""),
+        request.headers.get("X-Goog-Channel-Token"),
+        state,
+    )
+    if not cal_id:
+        raise HTTPException(status_code=403, detail="Unknown channel or bad channel token")
+    if state != "sync":
+        background.add_task(sync.sync_now, cal_id)
+        if cal_id == get_service().suggestions_calendar_id:
+            get_block_index().invalidate()
+    return {"ok": True, "state": state}
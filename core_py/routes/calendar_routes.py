@@ -1,23 +1,25 @@
 # calendar_routes.py
 # Updated to add /calendar/today_normalized with link extraction AND client matches
 
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks, Request
 from fastapi.responses import RedirectResponse, JSONResponse
 from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request as GoogleRequest
-from googleapiclient.discovery import build
+import logging
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 import re
-from typing import List, Dict
-import requests  # used to call contacts lookup
+from typing import List, Dict, Optional
+from pydantic import BaseModel
+
+from core_py.integrations.calendar_sync import get_calendar_sync
+from core_py.integrations.google_client import GoogleAuthError, get_google_provider
+from core_py.services.client_matcher import get_client_matcher
 
 router = APIRouter()
+logger = logging.getLogger("helios.calendar")
 
 URL_RE = re.compile(r"(https?://[^\s)<>]+)")
-CONTACTS_LOOKUP_URL = "http://localhost:3333/api/contacts/lookup-by-attendees"
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CLIENT_SECRET_FILE = os.path.abspath(os.path.join(BASE_DIR, "..", "client_secret.json"))
@@ -26,6 +28,45 @@ SCOPES = ["https://www.googleapis.com/auth/calendar"]
 REDIRECT_URI = "http://localhost:3333/api/calendar/callback"
 
 
+def _calendar_service():
+    """(service, None) from the cached provider, or (None, JSONResponse) with the auth error."""
+    try:
+        return get_google_provider(TOKEN_FILE).service("calendar", "v3", SCOPES), None
+    except GoogleAuthError as e:
+        return None, JSONResponse({"error": str(e)}, status_code=e.status_code)
+
+
+def _project(ev: Dict, fields: List[str]) -> Dict:
+    out = {k: ev[k] for k in fields if k in ev}
+    if "attendees" in out:
+        out["attendees"] = [{k: a[k] for k in ("email", "responseStatus") if k in a} for a in out["attendees"]]
+    return out
+
+
+def _window_events(service, time_min: datetime, time_max: datetime, fields: List[str],
+                   calendar_id: str = "primary", limit: Optional[int] = None) -> List[Dict]:
+    """
+    Events overlapping the window from the local event store (kept current via syncToken);
+    live events.list if the store is unavailable.
+    """
+    try:
+        items = get_calendar_sync().events(lambda: service, [calendar_id], time_min, time_max)
+    except Exception as e:
+        logger.warning({"calendar_store": "read_failed", "error": str(e)})
+        items = service.events().list(
+            calendarId=calendar_id,
+            timeMin=time_min.isoformat(),
+            timeMax=time_max.isoformat(),
+            singleEvents=True,
+            orderBy="startTime",
+            maxResults=limit,
+            fields=f"items({','.join(fields)})",
+        ).execute().get("items", [])
+    if limit:
+        items = items[:limit]
+    return [_project(e, fields) for e in items]
+
+
 @router.get("/auth")
 def initiate_oauth():
     flow = Flow.from_client_secrets_file(
@@ -46,38 +87,21 @@ def oauth_callback(code: str):
     )
     flow.fetch_token(code=code)
     creds = flow.credentials
-    with open(TOKEN_FILE, "w") as token_file:
-        token_file.write(creds.to_json())
+    provider = get_google_provider(TOKEN_FILE)
+    provider.save(creds)
+    provider.invalidate()
     return JSONResponse({"message": "Authorization complete."})
 
 
 @router.get("/events")
 def list_calendar_events():
-    if not os.path.exists(TOKEN_FILE):
-        return JSONResponse({"error": "No token found. Please authenticate first."}, status_code=401)
-
-    creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(GoogleRequest())
-                with open(TOKEN_FILE, "w") as token_file:
-                    token_file.write(creds.to_json())
-            except Exception as e:
-                return JSONResponse({"error": f"Token refresh failed: {str(e)}"}, status_code=403)
-        else:
-            return JSONResponse({"error": "Invalid or expired credentials."}, status_code=403)
-
-    service = build("calendar", "v3", credentials=creds)
+    service, err = _calendar_service()
+    if err:
+        return err
     try:
-        events_result = service.events().list(
-            calendarId="primary",
-            maxResults=10,
-            singleEvents=True,
-            orderBy="startTime",
-            fields="items(id,summary,start,end,location,description)",
-        ).execute()
-        events = events_result.get("items", [])
+        now = datetime.now(pytz.utc)
+        events = _window_events(service, now, now + timedelta(days=90),
+                                ["id", "summary", "start", "end", "location", "description"], limit=10)
         return JSONResponse({"events": events})
     except Exception as e:
         return JSONResponse({"error": f"Failed to fetch events: {str(e)}"}, status_code=500)
@@ -118,61 +142,41 @@ def _origins(urls: List[str]) -> List[str]:
 
 @router.get("/today_normalized")
 def today_normalized():
-    if not os.path.exists(TOKEN_FILE):
-        return JSONResponse({"error": "No token found. Please authenticate first."}, status_code=401)
-
-    creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(GoogleRequest())
-                with open(TOKEN_FILE, "w") as token_file:
-                    token_file.write(creds.to_json())
-            except Exception as e:
-                return JSONResponse({"error": f"Token refresh failed: {e}"}, status_code=403)
-        else:
-            return JSONResponse({"error": "Invalid or expired credentials."}, status_code=403)
-
-    service = build("calendar", "v3", credentials=creds)
+    service, err = _calendar_service()
+    if err:
+        return err
     tz = pytz.timezone("Europe/London")
     now = datetime.now(tz)
-    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-    end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999).isoformat()
+    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999)
 
     try:
-        events_result = service.events().list(
-            calendarId="primary",
-            timeMin=start_of_day,
-            timeMax=end_of_day,
-            singleEvents=True,
-            orderBy="startTime",
-            fields=(
-                "items(id,summary,start,end,location,description,"
-                "attendees(email,responseStatus),recurringEventId,hangoutLink,updated)"
-            ),
-        ).execute()
+        items = _window_events(service, start_of_day, end_of_day, [
+            "id", "summary", "start", "end", "location", "description",
+            "attendees", "recurringEventId", "hangoutLink", "updated",
+        ])
     except Exception as e:
         return JSONResponse({"error": f"Failed to fetch today events: {e}"}, status_code=500)
 
-    items = events_result.get("items", [])
     out: List[Dict] = []
+    attendees_by_event = [
+        [a.get("email") for a in (e.get("attendees") or []) if a.get("email")] for e in items
+    ]
+
+    # Enrich with matched clients: every attendee of the day resolved in one pass
+    matcher = get_client_matcher()
+    try:
+        matches = matcher.match_many(em for ems in attendees_by_event for em in ems)
+    except Exception as e:
+        # fail-soft; we still return the events even if the contacts lookup fails
+        logger.warning({"client_match": "failed", "error": str(e)})
+        matches = {}
 
-    for e in items:
+    for e, attendees in zip(items, attendees_by_event):
         start = e.get("start", {})
         end = e.get("end", {})
         links = _extract_links(e.get("description") or "")
-        attendees = [a.get("email") for a in (e.get("attendees") or []) if a.get("email")]
-
-        # Optional: call contacts API to enrich with matched clients
-        matched_clients = []
-        if attendees:
-            try:
-                resp = requests.get(CONTACTS_LOOKUP_URL, params=[("emails", em) for em in attendees], timeout=3.5)
-                if resp.ok:
-                    matched_clients = resp.json().get("matches", [])
-            except Exception:
-                # fail-soft; we still return the event even if contacts lookup fails
-                matched_clients = []
+        matched_clients = matcher.clients_for(attendees, matches)
 
         out.append(
             {
@@ -197,37 +201,58 @@ def today_normalized():
 @router.get("/today")
 def calendar_today():
     try:
-        if not os.path.exists(TOKEN_FILE):
-            return JSONResponse({"error": "No token found. Please authenticate first."}, status_code=401)
-
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                try:
-                    creds.refresh(GoogleRequest())
-                    with open(TOKEN_FILE, "w") as token_file:
-                        token_file.write(creds.to_json())
-                except Exception as e:
-                    return JSONResponse({"error": f"Token refresh failed: {e}"}, status_code=403)
-            else:
-                return JSONResponse({"error": "Invalid or expired credentials."}, status_code=403)
-
-        service = build("calendar", "v3", credentials=creds)
+        service, err = _calendar_service()
+        if err:
+            return err
         tz = pytz.timezone("Europe/London")
         now = datetime.now(tz)
-        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-        end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999).isoformat()
+        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999)
 
-        events_result = service.events().list(
-            calendarId="primary",
-            timeMin=start_of_day,
-            timeMax=end_of_day,
-            singleEvents=True,
-            orderBy="startTime",
-            fields="items(id,summary,start,end,location,description)",
-        ).execute()
-
-        return JSONResponse({"events": events_result.get("items", [])})
+        events = _window_events(service, start_of_day, end_of_day,
+                                ["id", "summary", "start", "end", "location", "description"])
+        return JSONResponse({"events": events})
 
     except Exception as e:
         return JSONResponse({"error": f"Failed to fetch today events: {str(e)}"}, status_code=500)
+
+
+class WatchRequest(BaseModel):
+    calendar_ids: List[str] = ["primary"]
+    address: Optional[str] = None           # public HTTPS URL of /api/calendar/notifications
+    ttl_s: Optional[int] = None
+
+
+@router.post("/watch")
+def watch_calendars(req: WatchRequest):
+    """Open push channels so the event store is re-synced when Google reports a change."""
+    address = req.address or os.getenv("HELIOS_CALENDAR_WEBHOOK_URL")
+    if not address:
+        return JSONResponse({"error": "Set address or HELIOS_CALENDAR_WEBHOOK_URL."}, status_code=400)
+    service, err = _calendar_service()
+    if err:
+        return err
+    sync = get_calendar_sync()
+    channels = []
+    for cal_id in req.calendar_ids:
+        sync.ensure_fresh(lambda: service, [cal_id])  # a channel is only useful with a sync token to follow
+        kw = {"ttl_s": req.ttl_s} if req.ttl_s else {}
+        channels.append(sync.watch(service, cal_id, address, **kw))
+    return {"channels": channels}
+
+
+@router.post("/notifications")
+def calendar_notification(request: Request, background: BackgroundTasks):
+    """Google push-notification target: mark the calendar dirty and pull the changes in the background."""
+    sync = get_calendar_sync()
+    cal_id = sync.handle_notification(
+        request.headers.get("X-Goog-Channel-ID", ""),
+        request.headers.get("X-Goog-Channel-Token"),
+        request.headers.get("X-Goog-Resource-State", ""),
+    )
+    if cal_id and request.headers.get("X-Goog-Resource-State") != "sync":
+        background.add_task(sync.sync_now, cal_id)
+        if cal_id == os.getenv("FLEXIBLE_CALENDAR_ID"):
+            from core_py.scheduler.reflow import get_block_index
+            get_block_index().invalidate()
+    return {"ok": True}
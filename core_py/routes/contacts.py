@@ -2,13 +2,14 @@
 from typing import List, Optional
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, EmailStr
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from core_py.db.database import get_engine
 from core_py.models import Client, ClientEmail, ClientDomain
+from core_py.services.client_matcher import get_client_matcher
 
 router = APIRouter(tags=["contacts"])
 
@@ -72,6 +73,7 @@ def upsert_client(payload: ClientIn):
         else:
             c.name = payload.name
         s.commit()
+        get_client_matcher().invalidate()
         return ClientOut(id=c.id, name=c.name)
 
 
@@ -114,6 +116,7 @@ def add_client_email(client_id: str, payload: EmailIn):
         )
         s.merge(e)  # respects uq_client_email
         s.commit()
+        get_client_matcher().invalidate()
         e = s.get(ClientEmail, e.id)
         return EmailOut(id=e.id, client_id=e.client_id, email=e.email, created_at=e.created_at)
 
@@ -148,6 +151,7 @@ def add_client_domain(client_id: str, payload: DomainIn):
         )
         s.merge(d)  # respects uq_client_domain_wild
         s.commit()
+        get_client_matcher().invalidate()
         d = s.get(ClientDomain, d.id)
         return DomainOut(id=d.id, client_id=d.client_id, domain=d.domain, wildcard=d.wildcard)
 
@@ -163,3 +167,11 @@ def get_allowlist():
     emails = sorted({(e or "").strip().lower() for e in email_rows if e})
     domains = sorted({(d or "").strip().lower() for d in domain_rows if d})
     return AllowlistResponse(emails=emails, domains=domains)
+
+
+# Attendee emails -> matched clients (same matcher today_normalized uses in process)
+@router.get("/contacts/lookup-by-attendees")
+def lookup_by_attendees(emails: List[str] = Query(default=[])):
+    matcher = get_client_matcher()
+    matches = matcher.match_many(emails)
+    return {"matches": matcher.clients_for(emails, matches), "by_email": matches}
@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException, Depends, Header
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from core_py.db.session import engine, get_session
+from core_py.services.client_matcher import get_client_matcher
 
 router = APIRouter(prefix="/contacts-admin", tags=["contacts-admin"])
 
@@ -88,6 +89,7 @@ def add_client_email(
         ON CONFLICT (id) DO NOTHING
     """), {"id": f"{client_id}:{email}", "client_id": client_id, "email": email})
     db.commit()
+    get_client_matcher().invalidate()
     return {"ok": True, "client_id": client_id, "email": email}
 
 @router.post("/clients/{client_id}/add-domain")
@@ -107,4 +109,5 @@ def add_client_domain(
         ON CONFLICT (id) DO NOTHING
     """), {"id": f"{client_id}:{domain}:{int(wildcard)}", "client_id": client_id, "domain": domain, "wildcard": wildcard})
     db.commit()
+    get_client_matcher().invalidate()
     return {"ok": True, "client_id": client_id, "domain": domain, "wildcard": wildcard}
@@ -1,10 +1,11 @@
 # core_py/routes/fss_routes.py
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from sqlalchemy import text
 
+from core_py.db.balances_pg import daily_history, latest_balances
 from core_py.db.session import get_session, db_session
 
 router = APIRouter(prefix="/fss", tags=["fss"])
@@ -53,19 +54,28 @@ def _safe_query_one(sql: str, params: Dict[str, Any] | None = None) -> Optional[
         return None
 
 
-# --------------------------------------------------------------------------------------
-# Endpoints
-# --------------------------------------------------------------------------------------
-
-@router.get("/snapshot")
-def get_snapshot():
+def _latest_summary() -> Optional[Dict[str, Any]]:
     """
-    Returns a compact snapshot for the FSS (Financial Snapshot & Strategy) view.
-    Pulls latest summary + advice, and a quick totals breakdown from balances.
-    Tables are expected in the `legacy` schema (per your import).
+    Latest Postgres fss_summary joined to its cached projection (one row), falling
+    back to the imported legacy.fss_summary when nothing has been computed yet.
     """
-    # Latest summary
-    summary = _safe_query_one(
+    return _safe_query_one(
+        """
+        SELECT
+          s.id,
+          s.week_ending - interval '6 days' AS period_start,
+          s.week_ending AS period_end,
+          COALESCE(p.opening_balance, s.closing_balance) AS total_cash,
+          p.projected_cash_30d,
+          p.projected_cash_60d,
+          p.runway_days,
+          s.created_at
+        FROM fss_summary s
+        LEFT JOIN helios.fss_projection p ON p.summary_id = s.id
+        ORDER BY s.created_at DESC
+        LIMIT 1
+        """
+    ) or _safe_query_one(
         """
         SELECT
           id,
@@ -80,7 +90,30 @@ def get_snapshot():
         ORDER BY created_at DESC
         LIMIT 1
         """
-    ) or {}
+    )
+
+
+def _latest_balances() -> List[Dict[str, Any]]:
+    try:
+        return latest_balances()
+    except Exception as e:
+        print(f"⚠️ latest_balances failed: {e}")
+        return []
+
+
+# --------------------------------------------------------------------------------------
+# Endpoints
+# --------------------------------------------------------------------------------------
+
+@router.get("/snapshot")
+def get_snapshot():
+    """
+    Returns a compact snapshot for the FSS (Financial Snapshot & Strategy) view.
+    Pulls latest summary (with its cached projection) + advice, and a quick totals
+    breakdown from balances.
+    """
+    # Latest summary
+    summary = _latest_summary() or {}
 
     # Latest advice message (if present)
     advice = _safe_query_one(
@@ -97,18 +130,8 @@ def get_snapshot():
         """
     ) or {}
 
-    # Quick live total from balances (distinct-on by account)
-    balances = _safe_query_list(
-        """
-        SELECT DISTINCT ON (account_id)
-          account_id,
-          COALESCE(account_name, account_id) AS account_name,
-          balance,
-          as_of
-        FROM legacy.balances
-        ORDER BY account_id, as_of DESC
-        """
-    )
+    # Quick live total from balances (one row per account in helios.balances_latest)
+    balances = _latest_balances()
 
     total_live = sum([float(b.get("balance") or 0) for b in balances]) if balances else 0.0
 
@@ -135,47 +158,73 @@ def get_snapshot():
 @router.get("/live-balance")
 def get_live_balance():
     """
-    Returns latest balance per account (DISTINCT ON pattern) and a grand total.
+    Returns latest balance per account (helios.balances_latest) and a grand total.
     """
-    rows = _safe_query_list(
-        """
-        SELECT DISTINCT ON (account_id)
-          account_id,
-          COALESCE(account_name, account_id) AS account_name,
-          currency,
-          balance,
-          as_of
-        FROM legacy.balances
-        ORDER BY account_id, as_of DESC
-        """
-    )
+    rows = _latest_balances()
     for r in rows:
         r["as_of"] = _to_utc_iso(r.get("as_of"))
     total = sum([float(r.get("balance") or 0) for r in rows]) if rows else 0.0
     return {"accounts": rows, "total": total}
 
 
-@router.get("/summary/latest")
-def get_latest_summary():
+@router.get("/balances/history")
+def get_balance_history(
+    account_id: Optional[List[str]] = Query(None),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+):
     """
-    Returns the latest row from fss_summary plus any advice rows tied to it.
+    Daily balance series for charts (open/close/min/max per account per day).
     """
-    summary = _safe_query_one(
+    if start and end and end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    try:
+        rows = daily_history(account_id, start, end)
+    except Exception as e:
+        print(f"⚠️ daily_history failed: {e}")
+        rows = []
+    series: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        series.setdefault(r["account_id"], []).append({
+            "day": r["day"].isoformat(),
+            "open": float(r["open_balance"]),
+            "close": float(r["close_balance"]),
+            "min": float(r["min_balance"]),
+            "max": float(r["max_balance"]),
+            "samples": r["samples"],
+            "as_of": _to_utc_iso(r["last_as_of"]),
+        })
+    return {"series": series}
+
+
+@router.get("/projection")
+def get_projection():
+    """
+    Cached projection for the latest summary: daily cash series, recurring streams, runway.
+    """
+    row = _safe_query_one(
         """
-        SELECT
-          id,
-          period_start,
-          period_end,
-          total_cash,
-          projected_cash_30d,
-          projected_cash_60d,
-          runway_days,
-          created_at
-        FROM legacy.fss_summary
-        ORDER BY created_at DESC
+        SELECT p.*
+        FROM helios.fss_projection p
+        JOIN fss_summary s ON s.id = p.summary_id
+        ORDER BY s.created_at DESC
         LIMIT 1
         """
     )
+    if not row:
+        return {"projection": None}
+    row["as_of"] = row["as_of"].isoformat()
+    row["computed_at"] = _to_utc_iso(row.get("computed_at"))
+    return {"projection": row}
+
+
+@router.get("/summary/latest")
+def get_latest_summary():
+    """
+    Returns the latest summary plus the advice rows for the latest legacy summary
+    (advice is keyed to legacy.fss_summary ids, not to the Postgres fss_summary).
+    """
+    summary = _latest_summary()
     if not summary:
         return {"summary": None, "advice": []}
 
@@ -191,10 +240,11 @@ def get_latest_summary():
           message,
           created_at
         FROM legacy.fss_advice
-        WHERE summary_id = :sid
+        WHERE summary_id = (
+          SELECT id FROM legacy.fss_summary ORDER BY created_at DESC LIMIT 1
+        )
         ORDER BY created_at DESC
-        """,
-        {"sid": summary["id"]},
+        """
     )
     for a in advice:
         a["created_at"] = _to_utc_iso(a.get("created_at"))
@@ -0,0 +1,27 @@
+# core_py/routes/profiling_admin.py
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from core_py.routes.contacts_admin import require_admin
+from core_py.services import profiling
+
+router = APIRouter(prefix="/profiling-admin", tags=["profiling-admin"])
+
+
+@router.get("/profiles")
+def list_profiles(_: bool = Depends(require_admin)):
+    """
+    Stored request profiles, newest first (route, dur_ms, samples, trigger).
+    """
+    return {"profiles": profiling.list_profiles(), "dir": profiling.PROFILE_DIR}
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, _: bool = Depends(require_admin)):
+    """
+    Folded stacks (one 'frame;frame;frame count' per line) for speedscope / flamegraph.pl.
+    """
+    path = profiling.profile_path(profile_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
@@ -1,11 +1,22 @@
 # core_py/routes/schedule_routes.py
 from __future__ import annotations
 
-from fastapi import APIRouter, Query
-from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+import base64
+import hashlib
+import json
+import logging
 import os
+import time
+
+from core_py.integrations.calendar_sync import fetch_events_concurrently, get_calendar_sync
+from core_py.integrations.google_client import get_google_provider
+from core_py.db.calendar_events_pg import get_event_store
+from core_py.db.triaged_tasks_pg import triaged_task_ids_excluding, triaged_tasks_by_ids
 
 # ---------------- Env & TZ ----------------
 try:
@@ -29,6 +40,9 @@ def _iso(dt: datetime) -> str:
     return (dt if TZ is None else dt.astimezone(TZ)).isoformat()
 
 router = APIRouter()
+logger = logging.getLogger("helios.schedule")
+
+MAX_RANGE_DAYS = 62
 
 # ---------------- Helpers ----------------
 def _mock_payload() -> Dict[str, Any]:
@@ -93,6 +107,103 @@ def _collect_calendar_ids() -> List[str]:
         ids.append("primary")
     return ids
 
+def _build_from_google(token_path: Path, debug: bool = False) -> Dict[str, Any]:
+    """Today's blocks from the configured calendars (cached Google service via the provider)."""
+    service = get_google_provider(str(token_path)).service("calendar", "v3", _scopes_from_env())
+
+    cal_ids = _collect_calendar_ids()
+    now = _now()
+    # Midnight..midnight with buffer to avoid tz edge cases / cross-midnight events
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(hours=2)
+    end = start + timedelta(days=1, hours=4)
+
+    all_events: List[Dict[str, Any]] = []
+    per_cal_counts: Dict[str, int] = {cal_id: 0 for cal_id in cal_ids}
+    fetch: Dict[str, Any] = {"mode": "store", "by_calendar": {}}
+    t0 = time.perf_counter()
+
+    try:
+        # local event store (annotated with _helios_calendar_id); stale calendars re-synced in parallel
+        synced: List[Dict[str, Any]] = []
+        all_events = get_calendar_sync().events(lambda: service, cal_ids, start, end,
+                                                concurrent=True, sync_log=synced)
+        for e in all_events:
+            per_cal_counts[e["_helios_calendar_id"]] = per_cal_counts.get(e["_helios_calendar_id"], 0) + 1
+        fetch["by_calendar"] = {r["calendar_id"]: r for r in synced}
+    except Exception as e:
+        # live: all calendars at once, every page; latency = slowest calendar
+        all_events, fetch["by_calendar"] = fetch_events_concurrently(service, cal_ids, start, end)
+        fetch.update(mode="live", store_error=f"{type(e).__name__}: {e}")
+        per_cal_counts = {c: st.get("events", 0) for c, st in fetch["by_calendar"].items()}
+    fetch["total_ms"] = int((time.perf_counter() - t0) * 1000)
+
+    if debug:
+        sample = [
+            {
+                "calendar": e.get("_helios_calendar_id"),
+                "summary": e.get("summary"),
+                "start": e.get("start"),
+                "end": e.get("end"),
+                "ext_private": (e.get("extendedProperties") or {}).get("private", {}),
+            }
+            for e in all_events
+        ]
+        return {
+            "date": start.date().isoformat(),
+            "timezone": os.getenv("HELIOS_TZ", "Europe/London"),
+            "now": _iso(now),
+            "calendar_source": "google",
+            "calendars": cal_ids,
+            "events_found_total": len(all_events),
+            "events_found_by_calendar": per_cal_counts,
+            "fetch": fetch,
+            "sample": sample[:50],
+        }
+
+    accept_all = os.getenv("HELIOS_ACCEPT_ALL_EVENTS", "0") == "1"
+
+    blocks: List[Dict[str, Any]] = []
+    for ev in all_events:
+        summary: str = ev.get("summary", "") or ""
+        ext_private: Dict[str, Any] = (ev.get("extendedProperties") or {}).get("private") or {}
+
+        is_block = (
+            accept_all
+            or ext_private.get("helios_block") == "true"
+            or summary.startswith("[BLOCK]")
+        )
+        if not is_block:
+            continue
+
+        blocks.append({
+            "id": ev.get("id"),
+            "title": summary.replace("[BLOCK]", "").strip(),
+            "context": _context_from_title(summary),
+            "calendarEventId": ev.get("id"),
+            "calendarUrl": ev.get("htmlLink"),
+            "start": _event_time_iso(ev.get("start", {})),
+            "end": _event_time_iso(ev.get("end", {})),
+            "color": None,
+            "assignedTaskIds": [],
+            "notes": (ev.get("description") or "").strip(),
+            "extended": {
+                "helios_origin": "gcal",
+                "calendar_id": ev.get("_helios_calendar_id"),
+                **ext_private,
+            },
+        })
+
+    return {
+        "date": (now.replace(hour=0, minute=0, second=0, microsecond=0)).date().isoformat(),
+        "timezone": os.getenv("HELIOS_TZ", "Europe/London"),
+        "now": _iso(now),
+        "calendar_source": "google",
+        "blocks": blocks,
+        "tasks": [],
+        "unallocatedTaskIds": [],
+        "source_calendars": cal_ids,
+    }
+
 # ---------------- Route ----------------
 @router.get("/schedule/today")
 def schedule_today(
@@ -124,106 +235,119 @@ def schedule_today(
         return payload
 
     try:
-        from googleapiclient.discovery import build  # type: ignore
-        from google.oauth2.credentials import Credentials  # type: ignore
-
-        SCOPES = _scopes_from_env()
-        creds = Credentials.from_authorized_user_file(str(token_path), SCOPES)
-        service = build("calendar", "v3", credentials=creds)
-
-        cal_ids = _collect_calendar_ids()
-        now = _now()
-        # Midnight..midnight with buffer to avoid tz edge cases / cross-midnight events
-        start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(hours=2)
-        end = start + timedelta(days=1, hours=4)
-
-        all_events: List[Dict[str, Any]] = []
-        per_cal_counts: Dict[str, int] = {}
-
-        for cal_id in cal_ids:
-            resp = service.events().list(
-                calendarId=cal_id,
-                timeMin=_iso(start),
-                timeMax=_iso(end),
-                singleEvents=True,
-                orderBy="startTime",
-            ).execute()
-            events = resp.get("items", [])
-            per_cal_counts[cal_id] = len(events)
-
-            # annotate source calendar on each event
-            for e in events:
-                e["_helios_calendar_id"] = cal_id
-            all_events.extend(events)
-
-        if debug:
-            sample = [
-                {
-                    "calendar": e.get("_helios_calendar_id"),
-                    "summary": e.get("summary"),
-                    "start": e.get("start"),
-                    "end": e.get("end"),
-                    "ext_private": (e.get("extendedProperties") or {}).get("private", {}),
-                }
-                for e in all_events
-            ]
-            return {
-                "date": start.date().isoformat(),
-                "timezone": os.getenv("HELIOS_TZ", "Europe/London"),
-                "now": _iso(now),
-                "calendar_source": "google",
-                "calendars": cal_ids,
-                "events_found_total": len(all_events),
-                "events_found_by_calendar": per_cal_counts,
-                "sample": sample[:50],
-            }
-
-        accept_all = os.getenv("HELIOS_ACCEPT_ALL_EVENTS", "0") == "1"
-
-        blocks: List[Dict[str, Any]] = []
-        for ev in all_events:
-            summary: str = ev.get("summary", "") or ""
-            ext_private: Dict[str, Any] = (ev.get("extendedProperties") or {}).get("private") or {}
-
-            is_block = (
-                accept_all
-                or ext_private.get("helios_block") == "true"
-                or summary.startswith("[BLOCK]")
-            )
-            if not is_block:
-                continue
-
-            blocks.append({
-                "id": ev.get("id"),
-                "title": summary.replace("[BLOCK]", "").strip(),
-                "context": _context_from_title(summary),
-                "calendarEventId": ev.get("id"),
-                "calendarUrl": ev.get("htmlLink"),
-                "start": _event_time_iso(ev.get("start", {})),
-                "end": _event_time_iso(ev.get("end", {})),
-                "color": None,
-                "assignedTaskIds": [],
-                "notes": (ev.get("description") or "").strip(),
-                "extended": {
-                    "helios_origin": "gcal",
-                    "calendar_id": ev.get("_helios_calendar_id"),
-                    **ext_private,
-                },
-            })
-
-        return {
-            "date": (now.replace(hour=0, minute=0, second=0, microsecond=0)).date().isoformat(),
-            "timezone": os.getenv("HELIOS_TZ", "Europe/London"),
-            "now": _iso(now),
-            "calendar_source": "google",
-            "blocks": blocks,
-            "tasks": [],
-            "unallocatedTaskIds": [],
-            "source_calendars": cal_ids,
-        }
-
+        return _build_from_google(token_path, debug)
     except Exception as e:
         payload = _mock_payload()
         payload["calendar_source"] = "mock_fallback"
         payload["error"] = f"{type(e).__name__}: {e}"
         return payload
+
+
+# ---------------- Range view (precomputed timeline) ----------------
+def _encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row["start_ts"].isoformat(), row["calendar_id"], row["event_id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        start, cal_id, ev_id = json.loads(raw)
+        return datetime.fromisoformat(start), cal_id, ev_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _day_start(d: date) -> datetime:
+    return datetime.combine(d, datetime.min.time()).replace(tzinfo=TZ) if TZ else datetime.combine(d, datetime.min.time())
+
+
+def _sync_timeline(cal_ids: List[str], start: datetime, end: datetime) -> Optional[str]:
+    """Bring the event store (and so the timeline) up to date if Google is reachable; returns an error note or None."""
+    token_path = _first_existing_path("HELIOS_GCAL_TOKEN_FILE", "CALENDAR_TOKEN_PATH", "GOOGLE_TOKEN_PATH")
+    if not token_path:
+        return "no_token"
+    try:
+        provider = get_google_provider(str(token_path))
+        get_calendar_sync().ensure_fresh(lambda: provider.service("calendar", "v3", _scopes_from_env()),
+                                         cal_ids, start, end, concurrent=True)
+        return None
+    except Exception as e:
+        logger.warning({"schedule_range": "sync_failed", "error": str(e)})
+        return f"{type(e).__name__}: {e}"
+
+
+@router.get("/schedule")
+def schedule_range(
+    request: Request,
+    from_: date = Query(..., alias="from", description="First day (YYYY-MM-DD)"),
+    to: date = Query(..., description="Last day, inclusive (YYYY-MM-DD)"),
+    limit: int = Query(default=200, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+):
+    """
+    Helios blocks for a date range (week view) from helios.schedule_timeline, with each
+    block's task ids (extendedProperties.private.helios_task_ids) joined to triaged tasks.
+
+    Compact + paginated (next_cursor); ETag / If-None-Match -> 304 when nothing changed.
+    unallocatedTaskIds (triaged tasks in no block of the range) is on the first page only.
+    """
+    if to < from_:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (to - from_).days + 1 > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_RANGE_DAYS} days")
+
+    cal_ids = _collect_calendar_ids()
+    start, end = _day_start(from_), _day_start(to + timedelta(days=1))
+    sync_error = _sync_timeline(cal_ids, start, end)
+
+    store = get_event_store()
+    after = _decode_cursor(cursor) if cursor else None
+    rows = store.timeline(cal_ids, start, end, after=after, limit=limit + 1)
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    task_ids = list(dict.fromkeys(tid for r in rows for tid in r["task_ids"]))
+    try:
+        tasks = triaged_tasks_by_ids(task_ids)
+        unallocated = None if cursor else triaged_task_ids_excluding(store.timeline_task_ids(cal_ids, start, end))
+    except Exception as e:
+        logger.warning({"schedule_range": "tasks_failed", "error": str(e)})
+        tasks, unallocated = {}, None if cursor else []
+
+    payload: Dict[str, Any] = {
+        "from": from_.isoformat(),
+        "to": to.isoformat(),
+        "timezone": os.getenv("HELIOS_TZ", "Europe/London"),
+        "calendars": cal_ids,
+        "blocks": [
+            {
+                "id": r["event_id"],
+                "calendarId": r["calendar_id"],
+                "start": _iso(r["start_ts"]),
+                "end": _iso(r["end_ts"]),
+                "type": r["block_type"],
+                "title": r["title"],
+                "context": _context_from_title(r["title"] or ""),
+                "taskIds": r["task_ids"],
+                "calendarUrl": r["html_link"],
+            }
+            for r in rows
+        ],
+        "tasks": {
+            tid: {k: t[k] for k in ("name", "priority", "due_date", "status", "score")}
+            for tid, t in tasks.items()
+        },
+        "next_cursor": _encode_cursor(rows[-1]) if more else None,
+    }
+    if unallocated is not None:
+        payload["unallocatedTaskIds"] = unallocated
+    if sync_error:
+        payload["stale"] = sync_error
+
+    body = json.dumps(payload, separators=(",", ":"), default=str)
+    etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,98 @@
+"""
+Free/busy engine for the block scheduler.
+
+FreeTime keeps free time as a sorted list of disjoint, non-adjacent intervals
+(parallel start/end lists) so every operation can bisect instead of rebuilding:
+
+- subtract(start, end)       O(log n + k), k = free pieces touched by the busy span
+- subtract_many(busies)      merges the busy list once, then subtracts each span
+- first_gap(minutes, after) first free span of >= N minutes, optionally after an instant
+- reserve(start, end)        alias of subtract, used when a block is placed
+
+It only deals in datetimes, so it can be shared by plan_week (work + personal),
+the ILP candidate generator and anything else that needs "where is there room".
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Tuple
+
+Span = Tuple[dt.datetime, dt.datetime]
+
+
+def merge_spans(spans: Iterable[Span]) -> List[Span]:
+    """Sort and coalesce overlapping/touching spans; drops empty ones."""
+    out: List[Span] = []
+    for s, e in sorted((s, e) for s, e in spans if e > s):
+        if out and s <= out[-1][1]:
+            if e > out[-1][1]:
+                out[-1] = (out[-1][0], e)
+        else:
+            out.append((s, e))
+    return out
+
+
+class FreeTime:
+    def __init__(self, windows: Iterable[Span] = ()):
+        merged = merge_spans(windows)
+        self._starts: List[dt.datetime] = [s for s, _ in merged]
+        self._ends: List[dt.datetime] = [e for _, e in merged]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def spans(self) -> List[Span]:
+        return list(zip(self._starts, self._ends))
+
+    def total_minutes(self) -> int:
+        return int(sum((e - s).total_seconds() for s, e in zip(self._starts, self._ends)) // 60)
+
+    # ---- mutation ----
+
+    def subtract(self, start: dt.datetime, end: dt.datetime) -> "FreeTime":
+        if end <= start or not self._starts:
+            return self
+        # First piece that ends after `start`, last piece that starts before `end`
+        lo = bisect_right(self._ends, start)
+        hi = bisect_left(self._starts, end)
+        if lo >= hi:
+            return self
+        keep_s: List[dt.datetime] = []
+        keep_e: List[dt.datetime] = []
+        if self._starts[lo] < start:
+            keep_s.append(self._starts[lo]); keep_e.append(start)
+        if self._ends[hi - 1] > end:
+            keep_s.append(end); keep_e.append(self._ends[hi - 1])
+        self._starts[lo:hi] = keep_s
+        self._ends[lo:hi] = keep_e
+        return self
+
+    def subtract_many(self, busies: Iterable[Span]) -> "FreeTime":
+        for s, e in merge_spans(busies):
+            self.subtract(s, e)
+        return self
+
+    reserve = subtract
+
+    # ---- queries ----
+
+    def first_gap(self, minutes: int, after: Optional[dt.datetime] = None) -> Optional[Span]:
+        """
+        Earliest (start, end) free span of at least `minutes`; plan_day walks work
+        time with it, reserving each placed block. `after` skips free time before
+        that instant.
+        """
+        need = dt.timedelta(minutes=minutes)
+        i = bisect_right(self._ends, after) if after is not None else 0
+        for j in range(i, len(self._starts)):
+            s, e = self._starts[j], self._ends[j]
+            if after is not None and s < after:
+                s = after
+            if e - s >= need:
+                return s, e
+        return None
@@ -17,6 +17,8 @@ from __future__ import annotations
 import argparse
 import dataclasses
 import datetime as dt
+import hashlib
+import heapq
 import json
 import os
 from dataclasses import dataclass
@@ -28,6 +30,7 @@ load_dotenv()
 
 # Use the centralized ClickUp client that returns plain dicts
 from core_py.integrations.clickup_client import ClickUpClient as RealClickUpClient
+from core_py.scheduler.free_busy import FreeTime, merge_spans
 
 try:
     import yaml  # type: ignore
@@ -93,7 +96,7 @@ class SchedulerConfig:
         BlockType.ADMIN_PROCESSING:    BlockRule(30, 60, ["late_afternoon","gaps"]),
         BlockType.PERSONAL:            BlockRule(30, 90, ["personal_window"]),
     })
-    hard: HardRules = HardRules()
+    hard: HardRules = dataclasses.field(default_factory=HardRules)
     personal_windows: PersonalWindows = dataclasses.field(default_factory=PersonalWindows)
 
 @dataclass
@@ -275,18 +278,8 @@ def clamp(day: dt.date, start: dt.time, end: dt.time) -> Interval:
     return Interval(as_utc(dt.datetime.combine(day, start)), as_utc(dt.datetime.combine(day, end)))
 
 def subtract_busy(free: Interval, busies: List[Interval]) -> List[Interval]:
-    pieces = [free]
-    for b in sorted(busies, key=lambda x: x.start):
-        nxt: List[Interval] = []
-        for p in pieces:
-            if b.end <= p.start or b.start >= p.end:
-                nxt.append(p); continue
-            if b.start > p.start:
-                nxt.append(Interval(p.start, b.start))
-            if b.end < p.end:
-                nxt.append(Interval(b.end, p.end))
-        pieces = [x for x in nxt if x.end > x.start]
-    return pieces
+    ft = FreeTime([(free.start, free.end)]).subtract_many((b.start, b.end) for b in busies)
+    return [Interval(s, e) for s, e in ft.spans()]
 
 def bucket_for_time(t: dt.time) -> str:
     if t < dt.time(11, 0): return "morning" if t < dt.time(10, 30) else "mid_morning"
@@ -304,14 +297,84 @@ def in_personal_window(cfg: SchedulerConfig, day: dt.date, iv: Interval) -> bool
             return True
     return False
 
+def day_free_time(cfg: SchedulerConfig, day: dt.date, fixed_events) -> Tuple[FreeTime, FreeTime]:
+    """(work, personal) free time for a day: core hours on weekdays and personal windows, minus fixed events."""
+    fixed = merge_spans((ev["start"], ev["end"]) for ev in fixed_events)
+    work = FreeTime()
+    if day.weekday() < 5:  # 0=Mon .. 4=Fri
+        core = clamp(day, cfg.core_start, cfg.core_end)
+        work = FreeTime([(core.start, core.end)]).subtract_many(fixed)
+    spans = cfg.personal_windows.by_weekday.get(day.weekday(), [])
+    personal = FreeTime(
+        (w.start, w.end) for w in (clamp(day, s, e) for s, e in spans)
+    ).subtract_many(fixed)
+    return work, personal
+
 # =========================
 # Scheduling core
 # =========================
 
+_DT_MAX_UTC = dt.datetime.max.replace(tzinfo=dt.timezone.utc)
+
+class TaskQueue:
+    """Open tasks of one bucket in (priority, due) order, backed by a heap.
+
+    take(minutes) hands out task minutes from the front; a task is popped (O(log n))
+    once its remaining_minutes reaches zero, so exhausted tasks are never rescanned.
+    Ties keep the input order, like the stable sort it replaces.
+    """
+    def __init__(self, tasks: List[Task]):
+        self._heap = [
+            (t.priority or 99, t.due or _DT_MAX_UTC, i, t)
+            for i, t in enumerate(tasks) if t.remaining_minutes > 0
+        ]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def peek(self) -> Optional[Task]:
+        return self._heap[0][3] if self._heap else None
+
+    def snapshot(self, minutes: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(id, remaining_minutes) of open tasks in take() order — for plan-cache hashing.
+
+        With `minutes`, only the prefix a take() of that many minutes could touch.
+        """
+        out: List[Tuple[str, int]] = []
+        left = minutes
+        for e in sorted(self._heap, key=lambda e: e[:3]):
+            if left is not None and left <= 0:
+                break
+            out.append((e[3].id, e[3].remaining_minutes))
+            if left is not None:
+                left -= e[3].remaining_minutes
+        return out
+
+    def take(self, minutes: int) -> List[Tuple[Task, int]]:
+        """Consume up to `minutes` of work; returns [(task, minutes_used)] in order."""
+        out: List[Tuple[Task, int]] = []
+        while minutes > 0 and self._heap:
+            tsk = self._heap[0][3]
+            use = min(minutes, tsk.remaining_minutes)
+            tsk.remaining_minutes -= use
+            minutes -= use
+            out.append((tsk, use))
+            if tsk.remaining_minutes <= 0:
+                heapq.heappop(self._heap)
+        return out
+
 @dataclass
 class Demand:
     minutes_by_block: Dict[BlockType, int]
     tasks_by_block: Dict[BlockType, List[Task]]
+    queues: Dict[BlockType, TaskQueue] = dataclasses.field(default_factory=dict)
+
+    def queue(self, bt: BlockType) -> TaskQueue:
+        q = self.queues.get(bt)
+        if q is None:
+            q = self.queues[bt] = TaskQueue(self.tasks_by_block.get(bt, []))
+        return q
 
 def _to_dt_utc_from_ms(ms: int | None) -> Optional[dt.datetime]:
     if not ms: return None
@@ -351,7 +414,8 @@ def _adapt_grouped_for_scheduler(grouped_plain: dict) -> Dict[BlockType, List[Ta
 
 def compute_demand(tasks_grouped: Dict[BlockType, List[Task]]) -> Demand:
     out = {bt: sum(max(0, t.remaining_minutes) for t in lst) for bt, lst in tasks_grouped.items()}
-    return Demand(minutes_by_block=out, tasks_by_block=tasks_grouped)
+    queues = {bt: TaskQueue(lst) for bt, lst in tasks_grouped.items()}
+    return Demand(minutes_by_block=out, tasks_by_block=tasks_grouped, queues=queues)
 
 @dataclass
 class PlanDay:
@@ -369,191 +433,182 @@ def plan_week(
     cfg: SchedulerConfig,
     fixed_events_fetcher,
     clickup_grouped_tasks: Dict[BlockType, List[Task]],
+    solver: str = "greedy",
 ) -> Plan:
     """Compute a plan of blocks across a window starting at start_date.
     - Work buckets (client/systems/marketing/admin) are placed in core hours on weekdays.
     - PERSONAL is placed only within configured personal windows (any day).
     - Weekly weights are scaled to the requested window length.
+    - solver="ilp" optimizes the whole window at once (see ilp_solver; falls back to greedy).
     """
-    import math
+    if solver == "ilp":
+        from core_py.scheduler.ilp_solver import plan_week_ilp
+        return plan_week_ilp(start_date, num_days, cfg, fixed_events_fetcher, clickup_grouped_tasks)
 
     demand = compute_demand(clickup_grouped_tasks)
-
-    # Scale weekly weights to the planning window length (e.g., 14d ≈ 2x)
-    scale = max(1.0, float(num_days) / 7.0)
-    scaled_weekly: Dict[BlockType, int] = {
-        bt: int(math.ceil(cfg.weekly_weights.get(bt, 0) * scale)) for bt in BlockType
-    }
-
-    days: List[PlanDay] = []
+    scaled_weekly = scaled_weekly_targets(cfg, num_days)
     scheduled_counts: Dict[BlockType, int] = {bt: 0 for bt in BlockType}
-    dtmax_utc = dt.datetime.max.replace(tzinfo=dt.timezone.utc)
 
+    days: List[PlanDay] = []
     for i in range(num_days):
         day = start_date + dt.timedelta(days=i)
+        days.append(plan_day(day, cfg, demand, scheduled_counts, scaled_weekly, fixed_events_fetcher(day)))
 
-        # Build fixed events once per day
-        fixed = [Interval(ev["start"], ev["end"]) for ev in fixed_events_fetcher(day)]
-
-        # Weekdays: place work in core; weekends: skip work buckets
-        work_free: List[Interval] = []
-        if day.weekday() < 5:  # 0=Mon .. 4=Fri
-            core = clamp(day, cfg.core_start, cfg.core_end)
-            work_free = subtract_busy(core, fixed)
-            work_free.sort(key=lambda x: x.start)
-
-        day_blocks: List[Event] = []
-        cap_today: Dict[BlockType, int] = {bt: 0 for bt in BlockType}
-
-        def can_place(bt: BlockType, interval: Interval, minutes: int) -> bool:
-            # caps
-            cap = cfg.hard.cap_blocks_per_day.get(bt, 99)
-            if cap_today[bt] >= cap:
-                return False
-            # systems min contiguous
-            if bt == BlockType.SYSTEMS_DEVELOPMENT and minutes < cfg.hard.min_contiguous_minutes_for_systems:
-                return False
-            # placement buckets
-            bucket = bucket_for_time(interval.start.time())
-            rule = cfg.rules[bt]
-            if bt == BlockType.PERSONAL:
-                # must be inside an explicit personal window
-                return "personal_window" in rule.placements and in_personal_window(cfg, day, interval)
-            # otherwise honor placement list, allow "gaps" as wildcard
-            return (bucket in rule.placements) or ("gaps" in rule.placements)
-
-        def allocate(bt: BlockType, iv: Interval, minutes: int) -> Tuple[Optional[Event], Optional[Interval]]:
-            tasks = sorted(
-                demand.tasks_by_block.get(bt, []),
-                key=lambda t: (t.priority or 99, t.due or dtmax_utc),
-            )
-            if not tasks:
-                return None, iv
-
-            take_iv, rest_iv = iv.split(minutes)
-
-            # Accumulate unique task IDs and titles, decrement remaining_minutes
-            task_ids: List[str] = []
-            task_titles: List[str] = []
-            remaining = take_iv.minutes()
-            seen: set[str] = set()
-
-            for tsk in tasks:
-                if remaining <= 0:
-                    break
-                if tsk.remaining_minutes <= 0:
-                    continue
+    return Plan(days)
 
-                use = min(remaining, tsk.remaining_minutes)
-                tsk.remaining_minutes -= use
-                remaining -= use
-
-                if tsk.id not in seen:
-                    task_ids.append(tsk.id)
-                    task_titles.append(tsk.title)
-                    seen.add(tsk.id)
-
-            if not task_ids:
-                return None, iv
-
-            ev = Event(
-                start=take_iv.start,
-                end=take_iv.end,
-                summary=summary_for(bt, take_iv, task_titles),
-                description=description_for(bt, task_ids, task_titles),
-                block_type=bt,
-                task_ids=task_ids,
-                task_titles=task_titles,
-            )
-            cap_today[bt] += 1
-            scheduled_counts[bt] += 1
-            demand.minutes_by_block[bt] = max(0, demand.minutes_by_block[bt] - take_iv.minutes())
-            return ev, rest_iv
-
-        def prefer_list_for_bucket(bucket: str) -> List[BlockType]:
-            if bucket in ("morning","mid_morning"):
-                return [BlockType.CLIENT_DEEP_WORK, BlockType.SYSTEMS_DEVELOPMENT, BlockType.ADMIN_PROCESSING]
-            if bucket in ("early_afternoon","afternoon"):
-                return [BlockType.MARKETING_CREATIVE, BlockType.CLIENT_DEEP_WORK, BlockType.ADMIN_PROCESSING]
-            return [BlockType.ADMIN_PROCESSING, BlockType.CLIENT_DEEP_WORK]
-
-        # 1) Place work blocks (weekdays, in core)
-        for iv in list(work_free):
-            cursor = iv
-            while cursor and cursor.minutes() >= 30:
-                bucket = bucket_for_time(cursor.start.time())
-                prefs = prefer_list_for_bucket(bucket)
-                placed = False
-
-                for bt in prefs:
-                    weekly_target = scaled_weekly.get(bt, 999)
-                    if scheduled_counts.get(bt, 0) >= weekly_target:
-                        continue
-                    rule = cfg.rules[bt]
-                    candidate = min(rule.duration_max, cursor.minutes())
-                    candidate = max(candidate, rule.duration_min)
-                    candidate = min(candidate, cursor.minutes())
-                    if candidate < rule.duration_min:
-                        continue
-                    if demand.minutes_by_block.get(bt, 0) <= 0:
-                        continue
-                    if not can_place(bt, cursor, candidate):
-                        continue
+def scaled_weekly_targets(cfg: SchedulerConfig, num_days: int) -> Dict[BlockType, int]:
+    """Scale weekly weights to the planning window length (e.g., 14d ≈ 2x)."""
+    import math
+    scale = max(1.0, float(num_days) / 7.0)
+    return {bt: int(math.ceil(cfg.weekly_weights.get(bt, 0) * scale)) for bt in BlockType}
 
-                    ev, rest = allocate(bt, cursor, candidate)
-                    if ev:
-                        day_blocks.append(ev)
-                        cursor = rest
-                        placed = True
-                        break
-
-                if not placed:
-                    # Gap filler: ADMIN if there is demand
-                    if cursor.minutes() >= 30 and demand.minutes_by_block.get(BlockType.ADMIN_PROCESSING, 0) > 0:
-                        bt = BlockType.ADMIN_PROCESSING
-                        rule = cfg.rules[bt]
-                        mins = min(rule.duration_max, max(rule.duration_min, cursor.minutes()))
-                        mins = min(mins, cursor.minutes())
-                        if can_place(bt, cursor, mins):
-                            ev, rest = allocate(bt, cursor, mins)
-                            if ev:
-                                day_blocks.append(ev)
-                                cursor = rest
-                                continue
-                    break  # no placement made; stop consuming this interval
-
-        # 2) PERSONAL inside configured windows (any day), subtracting fixed events
-        p_spans = cfg.personal_windows.by_weekday.get(day.weekday(), [])
-        if p_spans and demand.minutes_by_block.get(BlockType.PERSONAL, 0) > 0:
-            personal_free: List[Interval] = []
-            for s, e in p_spans:
-                base = clamp(day, s, e)
-                personal_free += subtract_busy(base, fixed)
-            personal_free.sort(key=lambda x: x.start)
-
-            for iv in list(personal_free):
-                cursor = iv
-                while cursor and cursor.minutes() >= cfg.rules[BlockType.PERSONAL].duration_min:
-                    bt = BlockType.PERSONAL
-                    weekly_target = scaled_weekly.get(bt, 999)
-                    if scheduled_counts.get(bt, 0) >= weekly_target:
-                        break
-                    rule = cfg.rules[bt]
-                    mins = min(rule.duration_max, max(rule.duration_min, cursor.minutes()))
-                    mins = min(mins, cursor.minutes())
-                    if demand.minutes_by_block.get(bt, 0) <= 0:
-                        break
-                    if not can_place(bt, cursor, mins):
-                        break
-                    ev, rest = allocate(bt, cursor, mins)
-                    if not ev:
-                        break
-                    day_blocks.append(ev)
-                    cursor = rest
+def plan_day(
+    day: dt.date,
+    cfg: SchedulerConfig,
+    demand: Demand,
+    scheduled_counts: Dict[BlockType, int],
+    scaled_weekly: Dict[BlockType, int],
+    fixed_events,
+) -> PlanDay:
+    """Greedy placement for one day; consumes `demand` and bumps `scheduled_counts` in place."""
+    # Weekdays place work in core, weekends skip work buckets
+    work_free, personal_free = day_free_time(cfg, day, fixed_events)
+
+    day_blocks: List[Event] = []
+    cap_today: Dict[BlockType, int] = {bt: 0 for bt in BlockType}
+
+    def can_place(bt: BlockType, interval: Interval, minutes: int) -> bool:
+        # caps
+        cap = cfg.hard.cap_blocks_per_day.get(bt, 99)
+        if cap_today[bt] >= cap:
+            return False
+        # systems min contiguous
+        if bt == BlockType.SYSTEMS_DEVELOPMENT and minutes < cfg.hard.min_contiguous_minutes_for_systems:
+            return False
+        # placement buckets
+        bucket = bucket_for_time(interval.start.time())
+        rule = cfg.rules[bt]
+        if bt == BlockType.PERSONAL:
+            # must be inside an explicit personal window
+            return "personal_window" in rule.placements and in_personal_window(cfg, day, interval)
+        # otherwise honor placement list, allow "gaps" as wildcard
+        return (bucket in rule.placements) or ("gaps" in rule.placements)
+
+    def allocate(bt: BlockType, iv: Interval, minutes: int) -> Tuple[Optional[Event], Optional[Interval]]:
+        queue = demand.queue(bt)
+        if not queue:
+            return None, iv
+
+        take_iv, rest_iv = iv.split(minutes)
+
+        # Accumulate unique task IDs and titles; the queue decrements remaining_minutes
+        task_ids: List[str] = []
+        task_titles: List[str] = []
+        seen: set[str] = set()
+
+        for tsk, _used in queue.take(take_iv.minutes()):
+            if tsk.id not in seen:
+                task_ids.append(tsk.id)
+                task_titles.append(tsk.title)
+                seen.add(tsk.id)
+
+        if not task_ids:
+            return None, iv
+
+        ev = Event(
+            start=take_iv.start,
+            end=take_iv.end,
+            summary=summary_for(bt, take_iv, task_titles),
+            description=description_for(bt, task_ids, task_titles),
+            block_type=bt,
+            task_ids=task_ids,
+            task_titles=task_titles,
+        )
+        cap_today[bt] += 1
+        scheduled_counts[bt] += 1
+        demand.minutes_by_block[bt] = max(0, demand.minutes_by_block[bt] - take_iv.minutes())
+        return ev, rest_iv
+
+    def prefer_list_for_bucket(bucket: str) -> List[BlockType]:
+        if bucket in ("morning","mid_morning"):
+            return [BlockType.CLIENT_DEEP_WORK, BlockType.SYSTEMS_DEVELOPMENT, BlockType.ADMIN_PROCESSING]
+        if bucket in ("early_afternoon","afternoon"):
+            return [BlockType.MARKETING_CREATIVE, BlockType.CLIENT_DEEP_WORK, BlockType.ADMIN_PROCESSING]
+        return [BlockType.ADMIN_PROCESSING, BlockType.CLIENT_DEEP_WORK]
+
+    # 1) Place work blocks (weekdays, in core): always fill the first free gap of >= 30m.
+    # Placed blocks are reserved out of work_free, so the next first_gap() starts right
+    # after them; a gap nothing fits in is skipped as a whole via `after`.
+    after: Optional[dt.datetime] = None
+    while True:
+        gap = work_free.first_gap(30, after=after)
+        if gap is None:
+            break
+        cursor = Interval(*gap)
+        bucket = bucket_for_time(cursor.start.time())
+        prefs = prefer_list_for_bucket(bucket)
+        placed = False
+
+        for bt in prefs:
+            weekly_target = scaled_weekly.get(bt, 999)
+            if scheduled_counts.get(bt, 0) >= weekly_target:
+                continue
+            rule = cfg.rules[bt]
+            candidate = min(rule.duration_max, cursor.minutes())
+            candidate = max(candidate, rule.duration_min)
+            candidate = min(candidate, cursor.minutes())
+            if candidate < rule.duration_min:
+                continue
+            if demand.minutes_by_block.get(bt, 0) <= 0:
+                continue
+            if not can_place(bt, cursor, candidate):
+                continue
 
-        days.append(PlanDay(day, day_blocks, cap_today))
+            ev, _rest = allocate(bt, cursor, candidate)
+            if ev:
+                day_blocks.append(ev)
+                work_free.reserve(ev.start, ev.end)
+                placed = True
+                break
 
-    return Plan(days)
+        if not placed and demand.minutes_by_block.get(BlockType.ADMIN_PROCESSING, 0) > 0:
+            # Gap filler: ADMIN if there is demand
+            bt = BlockType.ADMIN_PROCESSING
+            rule = cfg.rules[bt]
+            mins = min(rule.duration_max, max(rule.duration_min, cursor.minutes()))
+            mins = min(mins, cursor.minutes())
+            if can_place(bt, cursor, mins):
+                ev, _rest = allocate(bt, cursor, mins)
+                if ev:
+                    day_blocks.append(ev)
+                    work_free.reserve(ev.start, ev.end)
+                    placed = True
+
+        if not placed:
+            after = cursor.end  # no placement made; skip the rest of this gap
+
+    # 2) PERSONAL inside configured windows (any day), subtracting fixed events
+    p_spans = cfg.personal_windows.by_weekday.get(day.weekday(), [])
+    if p_spans and demand.minutes_by_block.get(BlockType.PERSONAL, 0) > 0:
+        bt = BlockType.PERSONAL
+        rule = cfg.rules[bt]
+        while scheduled_counts.get(bt, 0) < scaled_weekly.get(bt, 999):
+            if demand.minutes_by_block.get(bt, 0) <= 0:
+                break
+            gap = personal_free.first_gap(rule.duration_min)
+            if gap is None:
+                break
+            cursor = Interval(*gap)
+            mins = min(rule.duration_max, cursor.minutes())
+            if not can_place(bt, cursor, mins):
+                break
+            ev, _ = allocate(bt, cursor, mins)
+            if not ev:
+                break
+            day_blocks.append(ev)
+            personal_free.reserve(ev.start, ev.end)
+
+    return PlanDay(day, day_blocks, cap_today)
 
 
 # =========================
@@ -607,6 +662,21 @@ def to_gcal_event(ev: Event) -> dict:
         }},
     }
 
+def idempotency_key(ev: Event) -> str:
+    return f"{ev.block_type.value}:{ev.start.isoformat()}"
+
+def content_hash(body: dict) -> str:
+    """Hash of the fields we write, so reconcile can skip unchanged events."""
+    priv = (body.get("extendedProperties") or {}).get("private") or {}
+    keyed = {
+        "summary": body.get("summary"),
+        "description": body.get("description"),
+        "start": (body.get("start") or {}).get("dateTime"),
+        "end": (body.get("end") or {}).get("dateTime"),
+        "private": {k: v for k, v in priv.items() if k != "helios_hash"},
+    }
+    return hashlib.sha1(json.dumps(keyed, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
 # =========================
 # CLI glue
 # =========================
@@ -618,9 +688,21 @@ def main():
     ap.add_argument("--apply", action="store_true", help="Write to calendar; otherwise dry-run")
     ap.add_argument("--count-only", action="store_true", help="Print per-day block counts")
     ap.add_argument("--respect-existing-suggestions", action="store_true")
+    ap.add_argument("--reconcile", action="store_true",
+                    help="With --apply: diff against existing suggestions and batch only the needed insert/patch/delete calls")
     ap.add_argument("--start-date", type=str, default=None, help="YYYY-MM-DD; default=today")
-    ap.add_argument("--fixed-calendar-id", type=str, required=False)
+    ap.add_argument("--fixed-calendar-id", type=str, required=False, help="One or more ids, comma-separated")
+    ap.add_argument("--fixed-source", choices=["events", "freebusy", "store"], default="events",
+                    help="Prefetch fixed busy time via one paged events list per calendar (default; every listed "
+                         "event blocks time, as before), one freebusy.query, or the local event store "
+                         "(helios.calendar_events, incremental syncToken sync). freebusy and store ignore events "
+                         "marked 'free' (transparent)")
     ap.add_argument("--suggestions-calendar-id", type=str, required=False)
+    ap.add_argument("--solver", choices=["greedy", "ilp"], default="greedy",
+                    help="ilp = whole-window optimization (needs scipy; falls back to greedy)")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Greedy replan against the stored plan (helios.scheduler_plan_days); only changed days are recomputed")
+    ap.add_argument("--plan-key", type=str, default="default", help="Stored plan to replan against (--incremental)")
     args = ap.parse_args()
 
     fixed_id = args.fixed_calendar_id or FIXED_CALENDAR_ID
@@ -633,20 +715,13 @@ def main():
     # ---- Calendar integration ----
     cal = CalendarClient(fixed_id, sugg_id)
 
+    start = dt.date.fromisoformat(args.start_date) if args.start_date else dt.date.today()
+
+    # Whole window prefetched once (all fixed calendars), then served per day from an index
+    fixed_by_day = cal.fixed_busy_by_day(start, args.window_days, source=args.fixed_source)
+
     def fixed_events_fetcher(day: dt.date) -> List[Dict[str, dt.datetime]]:
-        time_min = as_utc(dt.datetime.combine(day, dt.time(0, 0)))
-        time_max = as_utc(dt.datetime.combine(day, dt.time(23, 59)))
-        raw = cal.list_events(cal.fixed_id, time_min, time_max)
-        out: List[Dict[str, dt.datetime]] = []
-        for e in raw:
-            try:
-                s = e["start"]; en = e["end"]
-                if isinstance(s, str):  s = dt.datetime.fromisoformat(s.replace("Z","+00:00"))
-                if isinstance(en, str): en = dt.datetime.fromisoformat(en.replace("Z","+00:00"))
-                out.append({"start": as_utc(s), "end": as_utc(en)})
-            except Exception:
-                continue
-        return out
+        return fixed_by_day.get(day, [])
 
     # ---- ClickUp integration ----
     cu = RealClickUpClient()
@@ -654,8 +729,15 @@ def main():
     tasks_grouped = _adapt_grouped_for_scheduler(grouped_plain)
 
     # ---- Plan & render/apply ----
-    start = dt.date.fromisoformat(args.start_date) if args.start_date else dt.date.today()
-    plan = plan_week(start, args.window_days, cfg, fixed_events_fetcher, tasks_grouped)
+    if args.incremental:
+        from core_py.scheduler.plan_store import replan
+        # The stored plan mirrors the calendar, so only an applied run updates it
+        plan, diff = replan(start, args.window_days, cfg, fixed_events_fetcher, tasks_grouped,
+                            plan_key=args.plan_key, save=args.apply and not args.count_only)
+        print(json.dumps({k: (len(v) if k in ("added", "changed", "removed") else v) for k, v in diff.items()}))
+        args.reconcile = True  # only write what changed
+    else:
+        plan = plan_week(start, args.window_days, cfg, fixed_events_fetcher, tasks_grouped, solver=args.solver)
 
     if args.count_only:
         per_day = []
@@ -675,6 +757,16 @@ def main():
                 print(f"- {ev.start.time()}–{ev.end.time()} :: {ev.summary}")
         return
 
+    window_min = as_utc(dt.datetime.combine(start, dt.time(0,0)))
+    window_max = as_utc(dt.datetime.combine(start + dt.timedelta(days=args.window_days), dt.time(23,59)))
+
+    if args.reconcile:
+        desired = {idempotency_key(ev): to_gcal_event(ev) for d in plan.days for ev in d.blocks}
+        stats = cal.reconcile_suggestions(window_min, window_max, desired,
+                                          delete_unmatched=not args.respect_existing_suggestions)
+        print(json.dumps(stats))
+        return
+
     if not args.respect_existing_suggestions:
         cal.clear_suggestions(
             as_utc(dt.datetime.combine(start, dt.time(0,0))),
@@ -683,7 +775,7 @@ def main():
 
     for d in plan.days:
         for ev in d.blocks:
-            cal.upsert_event(cal.suggestions_id, to_gcal_event(ev), idempotency_key=f"{ev.block_type.value}:{ev.start.isoformat()}")
+            cal.upsert_event(cal.suggestions_id, to_gcal_event(ev), idempotency_key=idempotency_key(ev))
 
     print("Applied suggestions to calendar.")
 
@@ -691,18 +783,34 @@ def main():
 # Google Calendar Client
 # =========================
 
+def index_busy_by_day(busy: List[Tuple[dt.datetime, dt.datetime]]) -> Dict[dt.date, List[Dict[str, dt.datetime]]]:
+    """Merge busy spans and file each under every (UTC) day it touches."""
+    out: Dict[dt.date, List[Dict[str, dt.datetime]]] = {}
+    for s, e in merge_spans((as_utc(s), as_utc(e)) for s, e in busy):
+        day = s.astimezone(dt.timezone.utc).date()
+        last = (e - dt.timedelta(microseconds=1)).astimezone(dt.timezone.utc).date()
+        while day <= last:
+            out.setdefault(day, []).append({"start": s, "end": e})
+            day += dt.timedelta(days=1)
+    return out
+
 class CalendarClient:
+    BATCH_MAX = 50         # Calendar API limit per batch request
+    FREEBUSY_MAX_ITEMS = 50
+    FREEBUSY_MAX_DAYS = 60  # keep each freebusy.query well inside the API's range limit
+
     def __init__(self, fixed_calendar_id: str, suggestions_calendar_id: str):
         self.fixed_id = fixed_calendar_id
+        self.fixed_ids = [c.strip() for c in (fixed_calendar_id or "").split(",") if c.strip()]
         self.suggestions_id = suggestions_calendar_id
-        self._svc = None
 
     def _service(self):
-        if self._svc is not None:
-            return self._svc
-        from google.oauth2.credentials import Credentials
-        from googleapiclient.discovery import build
-        from google.auth.transport.requests import Request as GoogleRequest
+        """
+        Calendar service from the process-wide GoogleClientProvider: credentials are
+        refreshed ahead of expiry and saved atomically, and each thread executes on its
+        own http (httplib2 isn't thread-safe; the API service plans from a thread pool).
+        """
+        from core_py.integrations.google_client import get_google_provider
         token_candidates = [
             os.environ.get("HELIOS_GCAL_TOKEN_FILE") or "",
             os.path.join(os.path.dirname(__file__), "..", "helios_token_rw.json"),
@@ -712,15 +820,7 @@ class CalendarClient:
         token_file = next((p for p in token_candidates if p and os.path.exists(p)), None)
         if not token_file:
             raise RuntimeError("Google token not found; set HELIOS_GCAL_TOKEN_FILE or place helios_token_rw.json nearby")
-        scopes = ["https://www.googleapis.com/auth/calendar"]
-        creds = Credentials.from_authorized_user_file(token_file, scopes)
-        if not creds.valid:
-            if creds.expired and creds.refresh_token:
-                creds.refresh(GoogleRequest()); open(token_file, "w").write(creds.to_json())
-            else:
-                raise RuntimeError("Invalid/expired Google credentials; refresh token required")
-        self._svc = build("calendar", "v3", credentials=creds)
-        return self._svc
+        return get_google_provider(token_file).service("calendar", "v3", ["https://www.googleapis.com/auth/calendar"])
 
     def list_events(self, calendar_id, time_min, time_max):
         import datetime as _dt
@@ -754,6 +854,83 @@ class CalendarClient:
             norm.append(e)
         return norm
 
+    def fixed_busy_by_day(self, start_day: dt.date, num_days: int, source: str = "events") -> Dict[dt.date, List[Dict[str, dt.datetime]]]:
+        """Busy time across all fixed calendars for the window, indexed by day."""
+        time_min = as_utc(dt.datetime.combine(start_day, dt.time(0, 0)))
+        time_max = as_utc(dt.datetime.combine(start_day + dt.timedelta(days=num_days), dt.time(0, 0)))
+        by_cal = self.busy_by_calendar(self.fixed_ids, time_min, time_max, source=source)
+        return index_busy_by_day([span for spans in by_cal.values() for span in spans])
+
+    def busy_by_calendar(self, calendar_ids: List[str], time_min, time_max, source: str = "events") -> Dict[str, List[Tuple[dt.datetime, dt.datetime]]]:
+        """
+        Busy spans per calendar. source: "events" (paged events list; every event blocks, the
+        original per-day behaviour), "freebusy" (one freebusy.query), "store" (local event
+        store, synced via syncToken). freebusy and store skip transparent ("free") events;
+        calendars freebusy can't read fall back to the events list with the same rule, and an
+        unavailable store falls back to freebusy.
+        """
+        by_cal: Dict[str, List[Tuple[dt.datetime, dt.datetime]]] = {c: [] for c in calendar_ids}
+        list_ids = list(calendar_ids)
+        if source == "store":
+            try:
+                return self._busy_from_store(calendar_ids, time_min, time_max)
+            except Exception:
+                source = "freebusy"
+        skip_transparent = source != "events"
+        if source == "freebusy":
+            fb, list_ids = self.freebusy(calendar_ids, time_min, time_max)
+            by_cal.update(fb)
+        for cal_id in list_ids:
+            by_cal[cal_id] = []
+            for e in self.list_events(cal_id, time_min, time_max):
+                if skip_transparent and e.get("transparency") == "transparent":
+                    continue
+                s, en = e.get("start"), e.get("end")
+                if isinstance(s, dt.datetime) and isinstance(en, dt.datetime):
+                    by_cal[cal_id].append((as_utc(s), as_utc(en)))
+        return by_cal
+
+    def _busy_from_store(self, calendar_ids: List[str], time_min, time_max) -> Dict[str, List[Tuple[dt.datetime, dt.datetime]]]:
+        from core_py.db.calendar_events_pg import event_row
+        from core_py.integrations.calendar_sync import get_calendar_sync
+        by_cal: Dict[str, List[Tuple[dt.datetime, dt.datetime]]] = {c: [] for c in calendar_ids}
+        for e in get_calendar_sync().events(self._service, calendar_ids, as_utc(time_min), as_utc(time_max)):
+            row = event_row(e["_helios_calendar_id"], e)
+            if row["transparent"] or not row["start_ts"] or not row["end_ts"]:
+                continue
+            by_cal[row["calendar_id"]].append((row["start_ts"].astimezone(dt.timezone.utc), row["end_ts"].astimezone(dt.timezone.utc)))
+        return by_cal
+
+    def freebusy(self, calendar_ids: List[str], time_min, time_max) -> Tuple[Dict[str, List[Tuple[dt.datetime, dt.datetime]]], List[str]]:
+        """One freebusy.query per 50 calendars / 60 days; returns ({calendar id: busy spans}, calendar ids that errored)."""
+        svc = self._service()
+        def _rfc3339(d: dt.datetime) -> str:
+            return as_utc(d).isoformat().replace("+00:00", "Z")
+        busy: Dict[str, List[Tuple[dt.datetime, dt.datetime]]] = {}
+        failed: set[str] = set()
+        chunk_start = time_min
+        while chunk_start < time_max:
+            chunk_end = min(time_max, chunk_start + dt.timedelta(days=self.FREEBUSY_MAX_DAYS))
+            for i in range(0, len(calendar_ids), self.FREEBUSY_MAX_ITEMS):
+                ids = calendar_ids[i:i + self.FREEBUSY_MAX_ITEMS]
+                res = svc.freebusy().query(body={
+                    "timeMin": _rfc3339(chunk_start), "timeMax": _rfc3339(chunk_end),
+                    "items": [{"id": c} for c in ids],
+                }).execute()
+                for cal_id, data in (res.get("calendars") or {}).items():
+                    if data.get("errors"):
+                        failed.add(cal_id)
+                        continue
+                    for b in data.get("busy", []):
+                        busy.setdefault(cal_id, []).append((
+                            dt.datetime.fromisoformat(b["start"].replace("Z", "+00:00")),
+                            dt.datetime.fromisoformat(b["end"].replace("Z", "+00:00")),
+                        ))
+            chunk_start = chunk_end
+        for cal_id in failed:
+            busy.pop(cal_id, None)
+        return busy, sorted(failed)
+
     def upsert_event(self, calendar_id, event, idempotency_key=None):
         svc = self._service()
         body = dict(event)
@@ -772,5 +949,60 @@ class CalendarClient:
             except Exception:
                 pass
 
+    def reconcile_suggestions(self, time_min, time_max, desired: Dict[str, dict], delete_unmatched: bool = True) -> Dict[str, int]:
+        """
+        Make the suggestions calendar match `desired` ({helios_idem: event body}) in the window:
+        one paged list, then batched inserts (new keys), patches (content hash changed)
+        and deletes (stale keys / duplicates / unkeyed events when delete_unmatched).
+        """
+        svc = self._service()
+        existing = self.list_events(self.suggestions_id, time_min, time_max)
+
+        stats = {"listed": len(existing), "inserted": 0, "patched": 0, "deleted": 0, "unchanged": 0, "errors": 0}
+        ops: List[Tuple[str, object]] = []
+        seen: set[str] = set()
+        for e in existing:
+            ev_id = e.get("id")
+            if not ev_id:
+                continue
+            priv = (e.get("extendedProperties") or {}).get("private") or {}
+            key = priv.get("helios_idem")
+            if key in desired and key not in seen:
+                seen.add(key)
+                body = self._with_keys(desired[key], key)
+                if priv.get("helios_hash") == body["extendedProperties"]["private"]["helios_hash"]:
+                    stats["unchanged"] += 1
+                else:
+                    ops.append(("patched", svc.events().patch(calendarId=self.suggestions_id, eventId=ev_id, body=body)))
+            elif delete_unmatched or key in seen:
+                ops.append(("deleted", svc.events().delete(calendarId=self.suggestions_id, eventId=ev_id)))
+        for key, ev in desired.items():
+            if key not in seen:
+                ops.append(("inserted", svc.events().insert(calendarId=self.suggestions_id, body=self._with_keys(ev, key))))
+
+        def _callback(request_id, response, exception):
+            kind = request_id.split(":", 1)[0]
+            if exception is not None:
+                stats["errors"] += 1
+            else:
+                stats[kind] += 1
+
+        stats["batches"] = 0
+        for i in range(0, len(ops), self.BATCH_MAX):
+            batch = svc.new_batch_http_request(callback=_callback)
+            for n, (kind, req) in enumerate(ops[i:i + self.BATCH_MAX]):
+                batch.add(req, request_id=f"{kind}:{i + n}")
+            batch.execute()
+            stats["batches"] += 1
+        return stats
+
+    @staticmethod
+    def _with_keys(event: dict, key: str) -> dict:
+        body = json.loads(json.dumps(event))
+        priv = body.setdefault("extendedProperties", {}).setdefault("private", {})
+        priv["helios_idem"] = key
+        priv["helios_hash"] = content_hash(body)
+        return body
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,307 @@
+"""
+ILP planning mode for the block scheduler (`--solver=ilp`).
+
+Same inputs and output (Plan) as plan_week, but blocks are chosen jointly over
+the whole window instead of greedily slot by slot:
+
+  x[c]      binary  — candidate block c (day, type, start on a GRID_MIN grid, duration)
+  w[b,k,d]  >= 0    — minutes of task group k (bucket b) worked on day d
+
+  maximize   Σ value(k, d) · w[b,k,d]  −  ε · Σ minutes(c) · x[c]
+  subject to blocks on the same day don't overlap
+             cap_blocks_per_day and the (window-scaled) weekly weights as block caps
+             Σ_k w[b,k,d] ≤ Σ minutes of b-blocks on day d
+             Σ_d w[b,k,d] ≤ remaining minutes of group k
+
+value() rewards priority and doing work on/before the due date, and slightly
+prefers earlier days. Candidates already respect duration bands, placement
+buckets, personal windows and min_contiguous_minutes_for_systems.
+
+Solved locally with scipy.optimize.milp (HiGHS) under a time budget; if scipy is
+missing, the budget expires without a feasible solution, or anything else goes
+wrong, it falls back to the greedy plan_week. A non-optimal (time-limited)
+solution is only kept when it plans at least as many minutes as greedy.
+"""
+
+from __future__ import annotations
+
+import copy
+import datetime as dt
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core_py.scheduler import helios_block_scheduler as hbs
+from core_py.scheduler.helios_block_scheduler import (
+    BlockType, Event, Interval, Plan, PlanDay, SchedulerConfig, Task,
+)
+
+try:
+    import numpy as np
+    from scipy.optimize import Bounds, LinearConstraint, milp  # type: ignore
+    from scipy.sparse import coo_matrix  # type: ignore
+except Exception as _e:  # pinned in requirements.txt; without it --solver ilp degrades to greedy
+    milp = None
+    _MILP_IMPORT_ERROR = str(_e)
+else:
+    _MILP_IMPORT_ERROR = None
+
+logger = logging.getLogger("helios.scheduler")
+
+TIME_BUDGET_S = float(os.getenv("HELIOS_ILP_TIME_BUDGET_S", "10"))
+GRID_MIN = int(os.getenv("HELIOS_ILP_GRID_MIN", "30"))
+MAX_TASK_GROUPS = int(os.getenv("HELIOS_ILP_MAX_TASK_GROUPS", "30"))  # per bucket; the tail is pooled
+
+PRIORITY_VALUE = {1: 8.0, 2: 4.0, 3: 2.0, 4: 1.0}
+DUE_BONUS = 2.0          # multiplier for minutes worked on/before the due date
+DAY_DECAY = 0.01         # per day; prefer earlier work when otherwise equal
+BLOCK_MINUTE_COST = 1e-3 # discourages blocks that aren't backed by task minutes
+
+
+class _Candidate:
+    __slots__ = ("day_idx", "bt", "start", "end", "minutes")
+
+    def __init__(self, day_idx: int, bt: BlockType, start: dt.datetime, minutes: int):
+        self.day_idx = day_idx
+        self.bt = bt
+        self.start = start
+        self.end = start + dt.timedelta(minutes=minutes)
+        self.minutes = minutes
+
+
+def _durations(lo: int, hi: int) -> List[int]:
+    out = list(range(lo, hi + 1, GRID_MIN))
+    if out[-1] != hi:
+        out.append(hi)
+    return out
+
+
+def _candidates_for_day(cfg: SchedulerConfig, day_idx: int, day: dt.date, work_free, personal_free) -> List[_Candidate]:
+    out: List[_Candidate] = []
+    for bt in BlockType:
+        rule = cfg.rules[bt]
+        if rule.duration_max < rule.duration_min or rule.duration_max <= 0:
+            continue
+        free = personal_free if bt == BlockType.PERSONAL else work_free
+        if bt == BlockType.PERSONAL and "personal_window" not in rule.placements:
+            continue
+        lengths = [m for m in _durations(rule.duration_min, rule.duration_max)
+                   if not (bt == BlockType.SYSTEMS_DEVELOPMENT and m < cfg.hard.min_contiguous_minutes_for_systems)]
+        for s, e in free.spans():
+            t = s
+            while t + dt.timedelta(minutes=rule.duration_min) <= e:
+                for m in lengths:
+                    iv = Interval(t, t + dt.timedelta(minutes=m))
+                    if iv.end > e:
+                        break
+                    if bt == BlockType.PERSONAL:
+                        ok = hbs.in_personal_window(cfg, day, iv)
+                    else:
+                        ok = hbs.bucket_for_time(t.time()) in rule.placements or "gaps" in rule.placements
+                    if ok:
+                        out.append(_Candidate(day_idx, bt, t, m))
+                t += dt.timedelta(minutes=GRID_MIN)
+    return out
+
+
+def _task_groups(tasks: List[Task]) -> List[List[Task]]:
+    open_tasks = [t for t in tasks if t.remaining_minutes > 0]
+    open_tasks.sort(key=lambda t: (t.priority or 99, t.due or dt.datetime.max.replace(tzinfo=dt.timezone.utc)))
+    groups = [[t] for t in open_tasks[:MAX_TASK_GROUPS]]
+    if len(open_tasks) > MAX_TASK_GROUPS:
+        groups.append(open_tasks[MAX_TASK_GROUPS:])
+    return groups
+
+
+def _value(group: List[Task], day: dt.date, day_idx: int) -> float:
+    head = group[0]
+    v = PRIORITY_VALUE.get(head.priority or 0, 1.0) if len(group) == 1 else 1.0
+    if len(group) == 1 and head.due is not None and day <= head.due.date():
+        v *= DUE_BONUS
+    return v * (1.0 - DAY_DECAY * day_idx)
+
+
+def plan_week_ilp(
+    start_date: dt.date,
+    num_days: int,
+    cfg: SchedulerConfig,
+    fixed_events_fetcher,
+    clickup_grouped_tasks: Dict[BlockType, List[Task]],
+    time_budget_s: Optional[float] = None,
+) -> Plan:
+    # Fetch fixed events once; the greedy fallback reuses them
+    fixed_by_day: Dict[dt.date, list] = {}
+
+    def cached_fetcher(day: dt.date):
+        if day not in fixed_by_day:
+            fixed_by_day[day] = list(fixed_events_fetcher(day))
+        return fixed_by_day[day]
+
+    if milp is None:
+        logger.warning({"scheduler": "ilp_unavailable", "reason": "scipy not importable; using greedy",
+                        "error": _MILP_IMPORT_ERROR})
+        return hbs.plan_week(start_date, num_days, cfg, cached_fetcher, clickup_grouped_tasks)
+
+    t0 = time.perf_counter()
+    plan, optimal = None, False
+    try:
+        plan, optimal = _solve(start_date, num_days, cfg, cached_fetcher, clickup_grouped_tasks,
+                               TIME_BUDGET_S if time_budget_s is None else time_budget_s)
+    except Exception as e:
+        logger.warning({"scheduler": "ilp_failed", "error": str(e)})
+    if plan is None:
+        logger.warning({"scheduler": "ilp_fallback", "elapsed_s": round(time.perf_counter() - t0, 3)})
+        return hbs.plan_week(start_date, num_days, cfg, cached_fetcher, clickup_grouped_tasks)
+    if not optimal:
+        greedy = hbs.plan_week(start_date, num_days, cfg, cached_fetcher, copy.deepcopy(clickup_grouped_tasks))
+        if _planned_minutes(greedy) > _planned_minutes(plan):
+            logger.warning({"scheduler": "ilp_fallback", "reason": "time budget hit; greedy plan is better",
+                            "elapsed_s": round(time.perf_counter() - t0, 3)})
+            return greedy
+    return plan
+
+
+def _planned_minutes(plan: Plan) -> int:
+    return sum(int((ev.end - ev.start).total_seconds() // 60) for d in plan.days for ev in d.blocks)
+
+
+def _solve(start_date, num_days, cfg, fetcher, grouped, budget_s) -> Tuple[Optional[Plan], bool]:
+    import math
+
+    days = [start_date + dt.timedelta(days=i) for i in range(num_days)]
+    cands: List[_Candidate] = []
+    for i, day in enumerate(days):
+        work_free, personal_free = hbs.day_free_time(cfg, day, fetcher(day))
+        cands += _candidates_for_day(cfg, i, day, work_free, personal_free)
+    if not cands:
+        return Plan([PlanDay(d, [], {bt: 0 for bt in BlockType}) for d in days]), True
+
+    groups = {bt: _task_groups(grouped.get(bt, [])) for bt in BlockType}
+    days_with = {bt: sorted({c.day_idx for c in cands if c.bt == bt}) for bt in BlockType}
+
+    # Column layout: x (blocks) first, then w (task minutes)
+    n_x = len(cands)
+    w_index: Dict[Tuple[BlockType, int, int], int] = {}
+    for bt in BlockType:
+        for k in range(len(groups[bt])):
+            for d in days_with[bt]:
+                w_index[(bt, k, d)] = n_x + len(w_index)
+    n = n_x + len(w_index)
+
+    c = np.zeros(n)
+    for j, cand in enumerate(cands):
+        c[j] = BLOCK_MINUTE_COST * cand.minutes
+    for (bt, k, d), j in w_index.items():
+        c[j] = -_value(groups[bt][k], days[d], d)
+
+    rows, cols, vals, ub = [], [], [], []
+
+    def add_row(entries, upper):
+        r = len(ub)
+        for col, v in entries:
+            rows.append(r); cols.append(col); vals.append(v)
+        ub.append(upper)
+
+    # No overlap: at every candidate start, at most one block covers it
+    by_day: Dict[int, List[int]] = {}
+    for j, cand in enumerate(cands):
+        by_day.setdefault(cand.day_idx, []).append(j)
+    for d, js in by_day.items():
+        for p in sorted({cands[j].start for j in js}):
+            cover = [(j, 1.0) for j in js if cands[j].start <= p < cands[j].end]
+            if len(cover) > 1:
+                add_row(cover, 1.0)
+
+    # Daily caps and window-scaled weekly weights
+    scale = max(1.0, float(num_days) / 7.0)
+    for bt in BlockType:
+        cap = cfg.hard.cap_blocks_per_day.get(bt)
+        if cap is not None:
+            for d, js in by_day.items():
+                sel = [(j, 1.0) for j in js if cands[j].bt == bt]
+                if sel:
+                    add_row(sel, float(cap))
+        target = int(math.ceil(cfg.weekly_weights.get(bt, 0) * scale)) if bt in cfg.weekly_weights else None
+        if target is not None:
+            sel = [(j, 1.0) for j, cand in enumerate(cands) if cand.bt == bt]
+            if sel:
+                add_row(sel, float(target))
+
+    # Task minutes on day d fit in that day's blocks; per-group remaining minutes
+    for bt in BlockType:
+        if not groups[bt]:
+            continue
+        for d in days_with[bt]:
+            entries = [(w_index[(bt, k, d)], 1.0) for k in range(len(groups[bt]))]
+            entries += [(j, -float(cands[j].minutes)) for j in by_day.get(d, []) if cands[j].bt == bt]
+            add_row(entries, 0.0)
+        for k, grp in enumerate(groups[bt]):
+            add_row([(w_index[(bt, k, d)], 1.0) for d in days_with[bt]],
+                    float(sum(t.remaining_minutes for t in grp)))
+
+    A = coo_matrix((vals, (rows, cols)), shape=(len(ub), n)).tocsr()
+    integrality = np.zeros(n)
+    integrality[:n_x] = 1
+    upper = np.full(n, np.inf)
+    upper[:n_x] = 1.0
+    res = milp(
+        c,
+        constraints=LinearConstraint(A, -np.inf, np.array(ub)),
+        integrality=integrality,
+        bounds=Bounds(np.zeros(n), upper),
+        options={"time_limit": max(0.1, budget_s), "disp": False},
+    )
+    if res.x is None:
+        return None, False
+    logger.info({"scheduler": "ilp_solved", "status": res.status, "candidates": n_x,
+                 "vars": n, "rows": len(ub), "objective": round(float(-res.fun), 2)})
+    return _materialize(days, cands, res.x, groups, w_index), res.status == 0
+
+
+def _materialize(days, cands, x, groups, w_index) -> Plan:
+    # Remaining per-task minutes (local copy; caller's Task objects are untouched)
+    left = {id(t): t.remaining_minutes for grp_list in groups.values() for grp in grp_list for t in grp}
+    chosen = sorted((cands[j] for j in range(len(cands)) if x[j] > 0.5), key=lambda cd: cd.start)
+    budget = {key: int(round(x[j])) for key, j in w_index.items() if x[j] > 0.5}
+
+    plan_days: List[PlanDay] = []
+    for d, day in enumerate(days):
+        blocks: List[Event] = []
+        counts = {bt: 0 for bt in BlockType}
+        for cand in (cd for cd in chosen if cd.day_idx == d):
+            bt = cand.bt
+            need = cand.minutes
+            ids: List[str] = []
+            titles: List[str] = []
+            for k, grp in enumerate(groups[bt]):
+                if need <= 0:
+                    break
+                avail = budget.get((bt, k, d), 0)
+                for t in grp:
+                    if need <= 0 or avail <= 0:
+                        break
+                    use = min(need, avail, left[id(t)])
+                    if use <= 0:
+                        continue
+                    left[id(t)] -= use
+                    avail -= use
+                    need -= use
+                    if t.id not in ids:
+                        ids.append(t.id); titles.append(t.title)
+                budget[(bt, k, d)] = avail
+            if not ids:
+                continue
+            iv = Interval(cand.start, cand.end)
+            blocks.append(Event(
+                start=iv.start,
+                end=iv.end,
+                summary=hbs.summary_for(bt, iv, titles),
+                description=hbs.description_for(bt, ids, titles),
+                block_type=bt,
+                task_ids=ids,
+                task_titles=titles,
+            ))
+            counts[bt] += 1
+        plan_days.append(PlanDay(day, blocks, counts))
+    return Plan(plan_days)
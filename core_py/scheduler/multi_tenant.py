@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Multi-user block planning — one run for the whole team.
+
+Users come from a YAML/JSON file:
+
+  users:
+    - user: alex
+      fixed_calendars: [alex@shop.co, shop-holidays@group.calendar.google.com]
+      suggestions_calendar: c_abc123@group.calendar.google.com
+      clickup_assignee: "4512345"
+      config: core_py/scheduler/block_rules_alex.yaml   # optional; default rules otherwise
+
+Fetches are shared in the parent process:
+- ClickUp: one team-task listing for all assignees, split per assignee
+- Google: the union of fixed calendars is fetched once (a shared holidays
+  calendar is read once, not per user), then merged per user. By default each
+  calendar is one paged events listing for the window, every event blocking time
+  like the single-user CLI; --fixed-source freebusy makes it a single
+  freebusy.query instead (transparent events ignored; the token's account needs
+  free/busy access to every calendar listed)
+
+Each user is then planned in a worker process (ProcessPoolExecutor, so planning
+scales across cores, ILP included), and optionally applied via the batched
+reconcile writer. Everything comes back as one JSON report.
+
+Usage (Windows CMD):
+  (venv) C:\\Helios> set PYTHONPATH=%CD%
+  (venv) C:\\Helios> python -m core_py.scheduler.multi_tenant --users team.yaml
+  (venv) C:\\Helios> python -m core_py.scheduler.multi_tenant --users team.yaml --solver ilp --apply
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from core_py.scheduler import helios_block_scheduler as hbs
+
+try:
+    import yaml  # type: ignore
+except Exception:
+    yaml = None
+
+
+@dataclass
+class TenantConfig:
+    user: str
+    fixed_calendars: List[str]
+    suggestions_calendar: str
+    clickup_assignee: str
+    config: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+def load_tenants(path: str) -> List[TenantConfig]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            if not yaml:
+                raise SystemExit("PyYAML is required for YAML user files (or use JSON).")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    rows = data.get("users", data) if isinstance(data, dict) else data
+    out: List[TenantConfig] = []
+    for r in rows or []:
+        fixed = r.get("fixed_calendars") or r.get("fixed_calendar") or []
+        if isinstance(fixed, str):
+            fixed = [c.strip() for c in fixed.split(",") if c.strip()]
+        out.append(TenantConfig(
+            user=str(r["user"]),
+            fixed_calendars=list(fixed),
+            suggestions_calendar=str(r["suggestions_calendar"]),
+            clickup_assignee=str(r.get("clickup_assignee") or ""),
+            config=r.get("config"),
+            extra={k: v for k, v in r.items() if k not in (
+                "user", "fixed_calendars", "fixed_calendar", "suggestions_calendar", "clickup_assignee", "config")},
+        ))
+    return out
+
+
+# ---------------- Shared fetches (parent process) ----------------
+
+def fetch_shared(tenants: List[TenantConfig], start: dt.date, num_days: int, source: str = "events"):
+    """Returns ({user: fixed_by_day}, {user: grouped_plain}, stats)."""
+    stats: Dict[str, Any] = {}
+    time_min = hbs.as_utc(dt.datetime.combine(start, dt.time(0, 0)))
+    time_max = hbs.as_utc(dt.datetime.combine(start + dt.timedelta(days=num_days), dt.time(0, 0)))
+
+    all_cals = sorted({c for t in tenants for c in t.fixed_calendars})
+    cal = hbs.CalendarClient(",".join(all_cals), "")
+    t0 = time.perf_counter()
+    by_cal = cal.busy_by_calendar(all_cals, time_min, time_max, source=source) if all_cals else {}
+    stats["google_ms"] = int((time.perf_counter() - t0) * 1000)
+    stats["fixed_calendars"] = len(all_cals)
+    stats["fixed_calendar_refs"] = sum(len(t.fixed_calendars) for t in tenants)
+
+    fixed = {
+        t.user: hbs.index_busy_by_day([s for c in t.fixed_calendars for s in by_cal.get(c, [])])
+        for t in tenants
+    }
+
+    t0 = time.perf_counter()
+    uids = sorted({t.clickup_assignee for t in tenants if t.clickup_assignee})
+    cu = hbs.RealClickUpClient()
+    by_uid = cu.fetch_tasks_grouped_by_assignee(uids) if uids else {}
+    stats["clickup_ms"] = int((time.perf_counter() - t0) * 1000)
+    stats["clickup_assignees"] = len(uids)
+    grouped = {t.user: by_uid.get(t.clickup_assignee, {}) for t in tenants}
+    return fixed, grouped, stats
+
+
+# ---------------- Worker (child process) ----------------
+
+def _plan_one(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level so it pickles under spawn (Windows)."""
+    from core_py.scheduler.plan_store import event_to_json
+    t0 = time.perf_counter()
+    try:
+        cfg = hbs.load_config(payload.get("config"))
+        fixed = payload["fixed_by_day"]
+        tasks = hbs._adapt_grouped_for_scheduler(payload["grouped"])
+        start = payload["start"]
+        plan = hbs.plan_week(start, payload["num_days"], cfg, lambda day: fixed.get(day, []), tasks,
+                             solver=payload["solver"])
+        blocks = [ev for d in plan.days for ev in d.blocks]
+        counts: Dict[str, int] = {}
+        for ev in blocks:
+            counts[ev.block_type.value] = counts.get(ev.block_type.value, 0) + 1
+        return {
+            "user": payload["user"],
+            "ok": True,
+            "blocks": len(blocks),
+            "block_minutes": sum(int((ev.end - ev.start).total_seconds() // 60) for ev in blocks),
+            "counts": counts,
+            "plan_ms": int((time.perf_counter() - t0) * 1000),
+            "events": [event_to_json(ev) for ev in blocks],
+            "pid": os.getpid(),
+        }
+    except Exception as e:
+        return {"user": payload["user"], "ok": False, "error": f"{type(e).__name__}: {e}",
+                "plan_ms": int((time.perf_counter() - t0) * 1000)}
+
+
+def _apply_one(tenant: TenantConfig, result: Dict[str, Any], start: dt.date, num_days: int) -> Dict[str, int]:
+    from core_py.scheduler.plan_store import event_from_json
+    cal = hbs.CalendarClient(",".join(tenant.fixed_calendars), tenant.suggestions_calendar)
+    evs = [event_from_json(e) for e in result.get("events", [])]
+    desired = {hbs.idempotency_key(ev): hbs.to_gcal_event(ev) for ev in evs}
+    return cal.reconcile_suggestions(
+        hbs.as_utc(dt.datetime.combine(start, dt.time(0, 0))),
+        hbs.as_utc(dt.datetime.combine(start + dt.timedelta(days=num_days), dt.time(23, 59))),
+        desired,
+    )
+
+
+def plan_tenants(
+    tenants: List[TenantConfig],
+    start: dt.date,
+    num_days: int,
+    solver: str = "greedy",
+    workers: Optional[int] = None,
+    apply: bool = False,
+    fixed_source: str = "events",
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    fixed, grouped, shared = fetch_shared(tenants, start, num_days, source=fixed_source)
+
+    payloads = [{
+        "user": t.user, "config": t.config, "start": start, "num_days": num_days, "solver": solver,
+        "fixed_by_day": fixed[t.user], "grouped": grouped[t.user],
+    } for t in tenants]
+    workers = workers or min(len(payloads), os.cpu_count() or 1) or 1
+    if workers > 1 and len(payloads) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(_plan_one, payloads))
+    else:
+        results = [_plan_one(p) for p in payloads]
+
+    if apply:
+        by_user = {t.user: t for t in tenants}
+        ok = [r for r in results if r.get("ok")]
+        with ThreadPoolExecutor(max_workers=min(8, len(ok) or 1)) as ex:  # I/O bound; one Google service per user
+            futs = {r["user"]: ex.submit(_apply_one, by_user[r["user"]], r, start, num_days) for r in ok}
+        for r in ok:
+            try:
+                r["applied"] = futs[r["user"]].result()
+            except Exception as e:
+                r["applied"] = {"error": str(e)}
+
+    return {
+        "start_date": start.isoformat(),
+        "window_days": num_days,
+        "solver": solver,
+        "workers": workers,
+        "shared_fetch": shared,
+        "users": results,
+        "elapsed_ms": int((time.perf_counter() - t0) * 1000),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Plan block suggestions for several users in parallel")
+    ap.add_argument("--users", required=True, help="YAML/JSON file with the users list")
+    ap.add_argument("--window-days", type=int, default=14)
+    ap.add_argument("--start-date", type=str, default=None, help="YYYY-MM-DD; default=today")
+    ap.add_argument("--solver", choices=["greedy", "ilp"], default="greedy")
+    ap.add_argument("--workers", type=int, default=None, help="Worker processes (default: min(users, cores))")
+    ap.add_argument("--fixed-source", choices=["events", "freebusy", "store"], default="events")
+    ap.add_argument("--apply", action="store_true", help="Reconcile each user's suggestions calendar")
+    ap.add_argument("--include-events", action="store_true", help="Keep per-block events in the report")
+    args = ap.parse_args()
+
+    tenants = load_tenants(args.users)
+    if not tenants:
+        raise SystemExit("No users configured.")
+    start = dt.date.fromisoformat(args.start_date) if args.start_date else dt.date.today()
+    report = plan_tenants(tenants, start, args.window_days, solver=args.solver, workers=args.workers,
+                          apply=args.apply, fixed_source=args.fixed_source)
+    if not args.include_events:
+        for r in report["users"]:
+            r.pop("events", None)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Persistent plan cache + incremental replanning for the block scheduler.
+
+Each planned day is stored in helios.scheduler_plan_days with the hashes of the
+inputs that produced it:
+
+- config_hash  — SchedulerConfig (rules, weights, windows, caps)
+- fixed_hash   — that day's fixed events
+- state_hash   — demand the day can consume (per bucket, the queue prefix that fits
+                 in the day's capacity, see day_budgets()), blocks already counted
+                 against the weekly targets, the targets themselves (scaled to the
+                 window length, so a different num_days never reuses a day) + config_hash
+
+Greedy planning is sequential, so a day is reusable exactly when all three match:
+its blocks are replayed against the demand (same consumption as recomputing) and
+only dirty days are re-run through plan_day(). Days before `today` are frozen:
+their stored blocks are returned as-is and not re-planned. Editing a task deep in
+a queue therefore only dirties the days that actually reach it.
+
+replan(save=False) plans against the store without writing to it (dry runs and
+/schedule/plan previews), so a later apply still diffs against what was applied.
+
+replan() returns the Plan plus a minimal diff of blocks (by idempotency key).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime as dt
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from core_py.db.session import db_session
+from core_py.scheduler.free_busy import merge_spans
+from core_py.scheduler.helios_block_scheduler import (
+    BlockType, Demand, Event, Plan, PlanDay, SchedulerConfig, Task,
+    compute_demand, content_hash, day_free_time, idempotency_key, plan_day, scaled_weekly_targets,
+    to_gcal_event,
+)
+
+DDL = """
+CREATE SCHEMA IF NOT EXISTS helios;
+CREATE TABLE IF NOT EXISTS helios.scheduler_plan_days (
+  plan_key     TEXT NOT NULL,
+  day          DATE NOT NULL,
+  config_hash  TEXT NOT NULL,
+  fixed_hash   TEXT NOT NULL,
+  state_hash   TEXT NOT NULL,
+  blocks       JSONB NOT NULL DEFAULT '[]'::jsonb,
+  updated_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (plan_key, day)
+);
+CREATE TABLE IF NOT EXISTS helios.scheduler_plan_meta (
+  plan_key     TEXT PRIMARY KEY,
+  start_date   DATE NOT NULL,
+  num_days     INT NOT NULL,
+  config_hash  TEXT NOT NULL,
+  updated_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+ALTER TABLE helios.scheduler_plan_meta DROP COLUMN IF EXISTS tasks_hash;
+"""
+
+_ddl_done = False
+
+
+def _ensure_tables(s):
+    global _ddl_done
+    if not _ddl_done:
+        s.execute(text(DDL))
+        _ddl_done = True
+
+
+# =========================
+# Hashing
+# =========================
+
+def _digest(obj) -> str:
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def config_hash(cfg: SchedulerConfig) -> str:
+    return _digest(dataclasses.asdict(cfg))
+
+
+def fixed_hash(fixed_events) -> str:
+    spans = merge_spans((ev["start"], ev["end"]) for ev in fixed_events)
+    return _digest([(s.isoformat(), e.isoformat()) for s, e in spans])
+
+
+def day_budgets(cfg: SchedulerConfig, day: dt.date, fixed_events) -> Dict[BlockType, int]:
+    """
+    Upper bound on the minutes plan_day() can take from each bucket's queue that day:
+    the free time it may be placed in, and at most cap_blocks_per_day blocks of
+    duration_max each.
+    """
+    work_free, personal_free = day_free_time(cfg, day, fixed_events)
+    work, personal = work_free.total_minutes(), personal_free.total_minutes()
+    out = {}
+    for bt in BlockType:
+        free = personal if bt == BlockType.PERSONAL else work
+        cap = cfg.hard.cap_blocks_per_day.get(bt, 99)
+        out[bt] = min(free, cap * cfg.rules[bt].duration_max)
+    return out
+
+
+def state_hash(demand: Demand, scheduled_counts: Dict[BlockType, int], cfg_hash: str,
+               budgets: Dict[BlockType, int], scaled_weekly: Dict[BlockType, int]) -> str:
+    return _digest({
+        "cfg": cfg_hash,
+        "counts": {bt.value: n for bt, n in scheduled_counts.items()},
+        "targets": {bt.value: n for bt, n in scaled_weekly.items()},
+        "queues": {bt.value: demand.queue(bt).snapshot(budgets.get(bt, 0)) for bt in BlockType},
+    })
+
+
+# =========================
+# Block (de)serialization
+# =========================
+
+def event_to_json(ev: Event) -> dict:
+    return {
+        "start": ev.start.isoformat(),
+        "end": ev.end.isoformat(),
+        "summary": ev.summary,
+        "description": ev.description,
+        "block_type": ev.block_type.value,
+        "task_ids": list(ev.task_ids),
+        "task_titles": list(ev.task_titles),
+    }
+
+
+def event_from_json(d: dict) -> Event:
+    return Event(
+        start=dt.datetime.fromisoformat(d["start"]),
+        end=dt.datetime.fromisoformat(d["end"]),
+        summary=d.get("summary") or "",
+        description=d.get("description") or "",
+        block_type=BlockType(d["block_type"]),
+        task_ids=list(d.get("task_ids") or []),
+        task_titles=list(d.get("task_titles") or []),
+    )
+
+
+# =========================
+# Store
+# =========================
+
+class PlanStore:
+    """helios.scheduler_plan_days / scheduler_plan_meta access."""
+
+    def load(self, plan_key: str, start: dt.date, end: dt.date) -> Dict[dt.date, dict]:
+        with db_session() as s:
+            _ensure_tables(s)
+            rows = s.execute(text("""
+                SELECT day, config_hash, fixed_hash, state_hash, blocks
+                FROM helios.scheduler_plan_days
+                WHERE plan_key = :k AND day >= :a AND day < :b
+            """), {"k": plan_key, "a": start, "b": end}).mappings().all()
+        return {r["day"]: dict(r) for r in rows}
+
+    def save(self, plan_key: str, rows: List[dict], meta: dict):
+        with db_session() as s:
+            _ensure_tables(s)
+            if rows:
+                s.execute(text("""
+                    INSERT INTO helios.scheduler_plan_days (plan_key, day, config_hash, fixed_hash, state_hash, blocks, updated_at)
+                    VALUES (:k, :day, :config_hash, :fixed_hash, :state_hash, CAST(:blocks AS JSONB), now())
+                    ON CONFLICT (plan_key, day) DO UPDATE SET
+                      config_hash=EXCLUDED.config_hash,
+                      fixed_hash=EXCLUDED.fixed_hash,
+                      state_hash=EXCLUDED.state_hash,
+                      blocks=EXCLUDED.blocks,
+                      updated_at=now()
+                """), [{"k": plan_key, **r, "blocks": json.dumps(r["blocks"])} for r in rows])  # executemany
+            s.execute(text("""
+                INSERT INTO helios.scheduler_plan_meta (plan_key, start_date, num_days, config_hash, updated_at)
+                VALUES (:k, :start_date, :num_days, :config_hash, now())
+                ON CONFLICT (plan_key) DO UPDATE SET
+                  start_date=EXCLUDED.start_date,
+                  num_days=EXCLUDED.num_days,
+                  config_hash=EXCLUDED.config_hash,
+                  updated_at=now()
+            """), {"k": plan_key, **meta})
+
+
+# =========================
+# Incremental replanning
+# =========================
+
+def _replay(demand: Demand, scheduled_counts: Dict[BlockType, int], blocks: List[Event]):
+    """Apply stored blocks' consumption exactly as plan_day's allocate() would."""
+    for ev in blocks:
+        minutes = int((ev.end - ev.start).total_seconds() // 60)
+        demand.queue(ev.block_type).take(minutes)
+        demand.minutes_by_block[ev.block_type] = max(0, demand.minutes_by_block.get(ev.block_type, 0) - minutes)
+        scheduled_counts[ev.block_type] += 1
+
+
+def _counts(blocks: List[Event]) -> Dict[BlockType, int]:
+    out = {bt: 0 for bt in BlockType}
+    for ev in blocks:
+        out[ev.block_type] += 1
+    return out
+
+
+def _diff_blocks(old: List[Event], new: List[Event], diff: Dict[str, list]):
+    before = {idempotency_key(ev): ev for ev in old}
+    after = {idempotency_key(ev): ev for ev in new}
+    for k, ev in after.items():
+        if k not in before:
+            diff["added"].append(event_to_json(ev))
+        elif content_hash(to_gcal_event(ev)) != content_hash(to_gcal_event(before[k])):
+            diff["changed"].append(event_to_json(ev))
+    for k, ev in before.items():
+        if k not in after:
+            diff["removed"].append(event_to_json(ev))
+
+
+def replan(
+    start_date: dt.date,
+    num_days: int,
+    cfg: SchedulerConfig,
+    fixed_events_fetcher,
+    clickup_grouped_tasks: Dict[BlockType, List[Task]],
+    plan_key: str = "default",
+    today: Optional[dt.date] = None,
+    store: Optional[PlanStore] = None,
+    save: bool = True,
+) -> Tuple[Plan, dict]:
+    """
+    Greedy plan_week that reuses stored days whose inputs are unchanged; returns (plan, diff).
+    save=False leaves the store untouched (preview / dry run).
+    """
+    store = store or PlanStore()
+    today = today or dt.date.today()
+    end_date = start_date + dt.timedelta(days=num_days)
+    cfg_h = config_hash(cfg)
+    stored = store.load(plan_key, start_date, end_date)
+
+    demand = compute_demand(clickup_grouped_tasks)
+    scaled_weekly = scaled_weekly_targets(cfg, num_days)
+    scheduled_counts: Dict[BlockType, int] = {bt: 0 for bt in BlockType}
+
+    days: List[PlanDay] = []
+    dirty_rows: List[dict] = []
+    diff: Dict[str, list] = {"added": [], "changed": [], "removed": [], "replanned_days": []}
+    reused = frozen = 0
+
+    for i in range(num_days):
+        day = start_date + dt.timedelta(days=i)
+        row = stored.get(day)
+        old_blocks = [event_from_json(b) for b in (row or {}).get("blocks") or []]
+
+        if day < today and row is not None:
+            # Past: keep what was planned; ClickUp time tracking already reflects the work
+            for ev in old_blocks:
+                scheduled_counts[ev.block_type] += 1
+            days.append(PlanDay(day, old_blocks, _counts(old_blocks)))
+            frozen += 1
+            continue
+
+        fixed = list(fixed_events_fetcher(day))
+        f_h = fixed_hash(fixed)
+        s_h = state_hash(demand, scheduled_counts, cfg_h, day_budgets(cfg, day, fixed), scaled_weekly)
+        if row is not None and row["fixed_hash"] == f_h and row["state_hash"] == s_h and row["config_hash"] == cfg_h:
+            _replay(demand, scheduled_counts, old_blocks)
+            days.append(PlanDay(day, old_blocks, _counts(old_blocks)))
+            reused += 1
+            continue
+
+        pd = plan_day(day, cfg, demand, scheduled_counts, scaled_weekly, fixed)
+        days.append(pd)
+        _diff_blocks(old_blocks, pd.blocks, diff)
+        diff["replanned_days"].append(day.isoformat())
+        dirty_rows.append({
+            "day": day, "config_hash": cfg_h, "fixed_hash": f_h, "state_hash": s_h,
+            "blocks": [event_to_json(ev) for ev in pd.blocks],
+        })
+
+    if save:
+        store.save(plan_key, dirty_rows, {
+            "start_date": start_date, "num_days": num_days,
+            "config_hash": cfg_h,
+        })
+    diff["reused_days"] = reused
+    diff["frozen_days"] = frozen
+    return Plan(days), diff
@@ -0,0 +1,259 @@
+"""
+Reflow the current Helios block from inside the API process (POST /api/schedule/reflow-now).
+
+Same behaviour as core_py/scripts/helios_reflow_noe.py — shorten the block happening
+now to end now, and insert a new block for the rest of it pulled from the same bucket —
+without the per-click round trips:
+
+- BlockIndex keeps today's Helios blocks from the Suggestions calendar in memory
+  (sorted by start). It is reloaded after INDEX_TTL_S, when the day rolls over, or
+  when invalidated (Google push notification, /schedule/apply); our own reflow writes
+  are applied to it directly.
+- Replacement tasks come from SchedulerService.grouped_tasks() (cached ClickUp snapshot).
+- The patch + insert go out as one batch request.
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime as dt
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core_py.scheduler import helios_block_scheduler as hbs
+
+logger = logging.getLogger("helios.scheduler")
+
+INDEX_TTL_S = float(os.getenv("HELIOS_REFLOW_INDEX_TTL_S", "300"))
+
+LABELS = {
+    "client_deep_work": "Client Deep Work",
+    "systems_development": "Systems Development",
+    "marketing_creative": "Marketing Creative",
+    "admin_processing": "Admin Processing",
+    "personal": "Personal",
+}
+
+
+def _block_from_event(e: dict) -> Optional[Dict[str, Any]]:
+    """Normalized Helios block from a list_events() item, or None for anything else."""
+    priv = (e.get("extendedProperties") or {}).get("private") or {}
+    if str(priv.get("helios_generated", "")).lower() != "true":
+        return None
+    s, en = e.get("start"), e.get("end")
+    if not isinstance(s, dt.datetime) or not isinstance(en, dt.datetime) or not e.get("id"):
+        return None
+    return {
+        "id": e["id"],
+        "start": hbs.as_utc(s),
+        "end": hbs.as_utc(en),
+        "summary": e.get("summary") or "",
+        "block_type": str(priv.get("helios_block_type") or "").strip(),
+        "task_ids": [x for x in str(priv.get("helios_task_ids") or "").split(",") if x],
+    }
+
+
+class BlockIndex:
+    """Today's Helios blocks on one calendar, sorted by start."""
+
+    def __init__(self, ttl_s: float = INDEX_TTL_S):
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._day: Optional[dt.date] = None
+        self._loaded_at = 0.0
+        self._blocks: List[Dict[str, Any]] = []
+        self._starts: List[dt.datetime] = []
+        self.loads = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._day = None
+
+    def _fresh(self, day: dt.date) -> bool:
+        return self._day == day and time.monotonic() - self._loaded_at < self.ttl_s
+
+    def _load(self, cal: hbs.CalendarClient, day: dt.date):
+        t_min = hbs.as_utc(dt.datetime.combine(day, dt.time(0, 0)))
+        items = cal.list_events(cal.suggestions_id, t_min, t_min + dt.timedelta(days=1))
+        blocks = [b for b in (_block_from_event(e) for e in items) if b]
+        self._set(blocks)
+        self._day = day
+        self._loaded_at = time.monotonic()
+        self.loads += 1
+
+    def _set(self, blocks: List[Dict[str, Any]]):
+        blocks.sort(key=lambda b: b["start"])
+        self._blocks = blocks
+        self._starts = [b["start"] for b in blocks]
+
+    def current(self, cal: hbs.CalendarClient, now: dt.datetime) -> Optional[Dict[str, Any]]:
+        """The Helios block covering `now` (latest-starting one if they overlap)."""
+        with self._lock:
+            if not self._fresh(now.date()):
+                self._load(cal, now.date())
+            i = bisect.bisect_right(self._starts, now)
+            while i > 0:
+                i -= 1
+                b = self._blocks[i]
+                if b["start"] <= now < b["end"]:
+                    return dict(b)
+                if now - b["start"] > dt.timedelta(hours=12):
+                    break
+            return None
+
+    def blocks(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(b) for b in self._blocks]
+
+    def record_reflow(self, block_id: str, new_end: dt.datetime, created: Optional[Dict[str, Any]]):
+        """Apply our own writes so the next click doesn't need a reload."""
+        with self._lock:
+            blocks = [dict(b) for b in self._blocks]
+            for b in blocks:
+                if b["id"] == block_id:
+                    b["end"] = new_end
+            if created:
+                blocks.append(created)
+            self._set(blocks)
+
+
+_index = BlockIndex()
+
+
+def get_block_index() -> BlockIndex:
+    return _index
+
+
+def pick_next_tasks(grouped: dict, bucket_key: str, minutes_needed: int, exclude_ids: set,
+                    per_task_cap: int) -> Tuple[List[str], List[str]]:
+    """(task_ids, titles) filling ~minutes_needed from the bucket; grouped buckets are already priority/due sorted."""
+    remaining = max(0, int(minutes_needed))
+    ids: List[str] = []
+    titles: List[str] = []
+    for t in grouped.get(bucket_key, []) or []:
+        tid = str(t.get("id") or "")
+        if not tid or tid in exclude_ids:
+            continue
+        try:
+            rem = int(t.get("remaining_minutes"))
+        except Exception:
+            continue
+        take = min(rem, remaining)
+        if per_task_cap > 0:
+            take = min(take, per_task_cap)
+        if take <= 0:
+            continue
+        ids.append(tid)
+        titles.append(str(t.get("name") or "(Untitled)"))
+        remaining -= take
+        if remaining <= 0:
+            break
+    return ids, titles
+
+
+def _summary(bucket_key: str, titles: List[str], minutes: int) -> str:
+    label = LABELS.get(bucket_key, bucket_key)
+    h, m = divmod(max(0, int(minutes)), 60)
+    dur = ((f"{h}h " if h else "") + (f"{m}m" if m else "")).strip()
+    if not titles:
+        return f"[BLOCK] {label} (pull-forward) ({dur})"
+    if len(titles) == 1:
+        return f"[BLOCK] {label}: {titles[0]} ({dur})"
+    if len(titles) == 2:
+        return f"[BLOCK] {label}: {titles[0]}; {titles[1]} ({dur})"
+    return f"[BLOCK] {label}: {titles[0]}; {titles[1]} +{len(titles)-2} more ({dur})"
+
+
+def _description(bucket_key: str, task_ids: List[str], titles: List[str]) -> str:
+    pairs = [f"{tid} :: {ttl}" for tid, ttl in zip(task_ids, titles)]
+    return (
+        "Auto-reflowed block (finished early).\n"
+        f"Bucket: {bucket_key}\n"
+        "Pulled forward:\n  - " + "\n  - ".join(pairs)
+    )
+
+
+def _rfc3339(d: dt.datetime) -> str:
+    return hbs.as_utc(d).isoformat().replace("+00:00", "Z")
+
+
+def reflow_now(service, now: Optional[dt.datetime] = None, min_chunk: int = 15, per_task_cap: int = 60,
+               dry_run: bool = False, index: Optional[BlockIndex] = None) -> Dict[str, Any]:
+    """
+    Reflow the block covering `now` on the service's Suggestions calendar.
+    Returns {"status": ..., ...}; status is "reflowed", "dry_run" or a no-op reason.
+    """
+    t0 = time.perf_counter()
+    now = hbs.as_utc(now or dt.datetime.now(dt.timezone.utc)).replace(microsecond=0)
+    index = index or _index
+    cal = service.calendar()
+
+    def _out(status: str, **kw) -> Dict[str, Any]:
+        return {"status": status, "now": now.isoformat(), **kw,
+                "elapsed_ms": int((time.perf_counter() - t0) * 1000)}
+
+    cur = index.current(cal, now)
+    if not cur:
+        return _out("no_current_block")
+    left = int((cur["end"] - now).total_seconds() // 60)
+    block = {"id": cur["id"], "summary": cur["summary"], "block_type": cur["block_type"],
+             "start": cur["start"].isoformat(), "end": cur["end"].isoformat()}
+    if left < min_chunk:
+        return _out("below_min_chunk", block=block, minutes_left=left)
+    if not cur["block_type"]:
+        return _out("no_block_type", block=block)
+
+    grouped = service.grouped_tasks()
+    new_ids, new_titles = pick_next_tasks(grouped, cur["block_type"], left, set(cur["task_ids"]),
+                                          max(0, per_task_cap))
+    if not new_ids:
+        return _out("no_candidates", block=block, minutes_left=left)
+
+    new_body = {
+        "summary": _summary(cur["block_type"], new_titles, left),
+        "description": _description(cur["block_type"], new_ids, new_titles),
+        "start": {"dateTime": _rfc3339(now), "timeZone": "UTC"},
+        "end": {"dateTime": _rfc3339(cur["end"]), "timeZone": "UTC"},
+        "extendedProperties": {"private": {
+            "helios_generated": "true",
+            "helios_version": "v1",
+            "helios_block_type": cur["block_type"],
+            "helios_task_ids": ",".join(new_ids),
+            "helios_idem": f"reflow:{cur['block_type']}:{now.isoformat()}",
+        }},
+    }
+    result = {"block": block, "minutes_left": left, "task_ids": new_ids, "task_titles": new_titles}
+    if dry_run:
+        return _out("dry_run", **result)
+
+    svc = cal._service()
+    responses: Dict[str, Any] = {}
+    errors: List[str] = []
+
+    def _callback(request_id, response, exception):
+        if exception is not None:
+            errors.append(f"{request_id}: {exception}")
+        else:
+            responses[request_id] = response
+
+    batch = svc.new_batch_http_request(callback=_callback)
+    batch.add(svc.events().patch(calendarId=cal.suggestions_id, eventId=cur["id"],
+                                 body={"end": {"dateTime": _rfc3339(now), "timeZone": "UTC"}}),
+              request_id="patch")
+    batch.add(svc.events().insert(calendarId=cal.suggestions_id, body=new_body), request_id="insert")
+    batch.execute()
+
+    if errors:
+        index.invalidate()  # partial write; reload from Google next time
+        logger.warning({"reflow": "write_failed", "block_id": cur["id"], "errors": errors})
+        return _out("error", errors=errors, **result)
+
+    created = responses.get("insert") or {}
+    index.record_reflow(cur["id"], now, {
+        "id": created.get("id") or "", "start": now, "end": cur["end"], "summary": new_body["summary"],
+        "block_type": cur["block_type"], "task_ids": new_ids,
+    } if created.get("id") else None)
+    return _out("reflowed", created_id=created.get("id"), **result)
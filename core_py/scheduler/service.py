@@ -0,0 +1,228 @@
+"""
+Block scheduler as an in-process service (used by /api/schedule/plan and /api/schedule/apply).
+
+Keeps what the CLI rebuilds on every run warm for the life of the API process:
+- one CalendarClient (Google libs imported + credentials/service built once)
+- one ClickUpClient, with the grouped task snapshot cached for TASKS_TTL_S
+- the block-rules config, reloaded only when the YAML file's mtime changes
+- fixed busy time per window, cached for FIXED_TTL_S (same events listing as the CLI by
+  default; HELIOS_SCHEDULER_FIXED_SOURCE=store reads the local event store instead,
+  see core_py/integrations/calendar_sync.py)
+
+Identical concurrent plan requests (same window/solver/mode) coalesce onto a single
+computation; applies are serialized so two writers never reconcile the same
+calendar at once. Each cache entry is filled under its own lock, so concurrent
+requests share one rebuild/fetch and a slow ClickUp fetch never blocks a plan that
+only needs the calendar.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+
+from core_py.scheduler import helios_block_scheduler as hbs
+
+logger = logging.getLogger("helios.scheduler")
+
+CONFIG_PATH = os.getenv("HELIOS_BLOCK_RULES")  # optional block_rules.yaml
+TASKS_TTL_S = float(os.getenv("HELIOS_SCHEDULER_TASKS_TTL_S", "60"))
+FIXED_TTL_S = float(os.getenv("HELIOS_SCHEDULER_FIXED_TTL_S", "60"))
+# events | freebusy | store. Same default as the CLI and multi_tenant so /api/schedule/plan
+# blocks the same fixed time for the same calendars; freebusy and store skip events
+# marked "free" (transparent), which the events listing keeps.
+FIXED_SOURCE = os.getenv("HELIOS_SCHEDULER_FIXED_SOURCE", "events")
+
+
+def plan_to_json(plan: hbs.Plan) -> Dict[str, Any]:
+    from core_py.scheduler.plan_store import event_to_json
+    return {"days": [
+        {
+            "date": d.date.isoformat(),
+            "counts": {bt.value: n for bt, n in d.counts.items()},
+            "blocks": [event_to_json(ev) for ev in d.blocks],
+        }
+        for d in plan.days
+    ]}
+
+
+class SchedulerService:
+    def __init__(self, fixed_calendar_id: Optional[str] = None, suggestions_calendar_id: Optional[str] = None,
+                 config_path: Optional[str] = CONFIG_PATH):
+        self.fixed_calendar_id = fixed_calendar_id or hbs.FIXED_CALENDAR_ID
+        self.suggestions_calendar_id = suggestions_calendar_id or hbs.FLEXIBLE_CALENDAR_ID
+        self.config_path = config_path
+        self._lock = threading.Lock()          # guards the caches + in-flight map
+        self._apply_lock = threading.Lock()
+        self._fill_locks: Dict[Any, threading.Lock] = {}
+        self._cfg: Optional[hbs.SchedulerConfig] = None
+        self._cfg_mtime: Optional[float] = None
+        self._cal: Optional[hbs.CalendarClient] = None
+        self._clickup = None
+        self._tasks: Optional[Tuple[float, dict]] = None
+        self._fixed: Dict[Tuple[dt.date, int], Tuple[float, dict]] = {}
+        self._inflight: Dict[tuple, Future] = {}
+
+    # ---- warm dependencies ----
+
+    def _fill_lock(self, key) -> threading.Lock:
+        """Per-entry lock held while (re)filling a cache; callers re-check the cache inside it."""
+        with self._lock:
+            lock = self._fill_locks.get(key)
+            if lock is None:
+                lock = self._fill_locks[key] = threading.Lock()
+            return lock
+
+    def config(self) -> hbs.SchedulerConfig:
+        mtime = None
+        if self.config_path and os.path.exists(self.config_path):
+            mtime = os.path.getmtime(self.config_path)
+        with self._fill_lock("config"):
+            if self._cfg is None or mtime != self._cfg_mtime:
+                self._cfg = hbs.load_config(self.config_path)
+                self._cfg_mtime = mtime
+            return self._cfg
+
+    def calendar(self) -> hbs.CalendarClient:
+        with self._fill_lock("calendar"):
+            if self._cal is None:
+                if not self.fixed_calendar_id or not self.suggestions_calendar_id:
+                    raise RuntimeError("Missing calendar IDs. Set FIXED_CALENDAR_ID/FLEXIBLE_CALENDAR_ID.")
+                self._cal = hbs.CalendarClient(self.fixed_calendar_id, self.suggestions_calendar_id)
+            return self._cal
+
+    def grouped_tasks(self, refresh: bool = False) -> dict:
+        """Plain grouped ClickUp snapshot (cached); adapt per plan since planning consumes Task minutes."""
+        asked = time.monotonic()
+        with self._fill_lock("tasks"):
+            hit = self._tasks
+            # a refresh is satisfied by a fetch that started after it was asked for
+            if hit and (hit[0] >= asked if refresh else time.monotonic() - hit[0] < TASKS_TTL_S):
+                return hit[1]
+            if self._clickup is None:
+                self._clickup = hbs.RealClickUpClient()
+            now = time.monotonic()
+            grouped = self._clickup.fetch_tasks_grouped()
+            with self._lock:
+                self._tasks = (now, grouped)
+            return grouped
+
+    def fixed_by_day(self, start: dt.date, num_days: int, refresh: bool = False) -> dict:
+        key = (start, num_days)
+        asked = time.monotonic()
+        with self._fill_lock(("fixed",) + key):
+            hit = self._fixed.get(key)
+            if hit and (hit[0] >= asked if refresh else time.monotonic() - hit[0] < FIXED_TTL_S):
+                return hit[1]
+            now = time.monotonic()
+            idx = self.calendar().fixed_busy_by_day(start, num_days, source=FIXED_SOURCE)
+            with self._lock:
+                self._fixed = {k: v for k, v in self._fixed.items() if now - v[0] < FIXED_TTL_S}
+                self._fixed[key] = (now, idx)
+                for k in [k for k, lk in self._fill_locks.items()
+                          if k[0] == "fixed" and k[1:] not in self._fixed and not lk.locked()]:
+                    del self._fill_locks[k]
+            return idx
+
+    def invalidate(self, tasks: bool = True, fixed: bool = True):
+        with self._lock:
+            if tasks:
+                self._tasks = None
+            if fixed:
+                self._fixed = {}
+
+    def warm(self):
+        """Build config, Google service and ClickUp client ahead of the first request."""
+        try:
+            self.config()
+            self.calendar()._service()
+            self.grouped_tasks()
+        except Exception as e:
+            logger.warning({"scheduler": "warm_failed", "error": str(e)})
+
+    # ---- planning ----
+
+    def plan(self, start: Optional[dt.date] = None, num_days: int = 14, solver: str = "greedy",
+             incremental: bool = False, plan_key: str = "default", refresh: bool = False,
+             save: bool = False) -> Dict[str, Any]:
+        """save=True (apply only) writes incremental results back to the plan store."""
+        start = start or dt.date.today()
+        key = (start, num_days, solver, incremental, plan_key, refresh, save)
+        with self._lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+        if not owner:
+            out = fut.result()
+            return {**out, "coalesced": True}
+        try:
+            out = self._plan(start, num_days, solver, incremental, plan_key, refresh, save)
+            fut.set_result(out)
+            return out
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _plan(self, start, num_days, solver, incremental, plan_key, refresh, save) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        cfg = self.config()
+        fixed = self.fixed_by_day(start, num_days, refresh=refresh)
+        tasks = hbs._adapt_grouped_for_scheduler(self.grouped_tasks(refresh=refresh))
+
+        def fetcher(day: dt.date):
+            return fixed.get(day, [])
+
+        diff = None
+        if incremental:
+            from core_py.scheduler.plan_store import replan
+            plan, diff = replan(start, num_days, cfg, fetcher, tasks, plan_key=plan_key, save=save)
+        else:
+            plan = hbs.plan_week(start, num_days, cfg, fetcher, tasks, solver=solver)
+        out = {
+            "start_date": start.isoformat(),
+            "window_days": num_days,
+            "solver": "greedy" if incremental else solver,
+            "plan": plan_to_json(plan),
+            "elapsed_ms": int((time.perf_counter() - t0) * 1000),
+            "_plan": plan,
+        }
+        if diff is not None:
+            out["diff"] = diff
+        return out
+
+    def apply(self, start: Optional[dt.date] = None, num_days: int = 14, solver: str = "greedy",
+              incremental: bool = False, plan_key: str = "default", respect_existing: bool = False,
+              refresh: bool = True) -> Dict[str, Any]:
+        with self._apply_lock:
+            out = self.plan(start, num_days, solver, incremental, plan_key, refresh, save=True)
+            plan = out["_plan"]
+            start = dt.date.fromisoformat(out["start_date"])
+            desired = {hbs.idempotency_key(ev): hbs.to_gcal_event(ev) for d in plan.days for ev in d.blocks}
+            window_min = hbs.as_utc(dt.datetime.combine(start, dt.time(0, 0)))
+            window_max = hbs.as_utc(dt.datetime.combine(start + dt.timedelta(days=num_days), dt.time(23, 59)))
+            out["applied"] = self.calendar().reconcile_suggestions(
+                window_min, window_max, desired, delete_unmatched=not respect_existing)
+            from core_py.scheduler.reflow import get_block_index
+            get_block_index().invalidate()
+            return out
+
+
+_service: Optional[SchedulerService] = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> SchedulerService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SchedulerService()
+        return _service
@@ -31,14 +31,10 @@ from core_py.integrations.clickup_client import ClickUpClient
 class CalendarClient:
     def __init__(self, calendar_id: str):
         self.calendar_id = calendar_id
-        self._svc = None
 
     def _service(self):
-        if self._svc is not None:
-            return self._svc
-        from google.oauth2.credentials import Credentials
-        from googleapiclient.discovery import build
-        from google.auth.transport.requests import Request as GoogleRequest
+        # Shared provider: refreshes ahead of expiry and rewrites the token file atomically
+        from core_py.integrations.google_client import get_google_provider
 
         token_candidates = [
             os.environ.get("HELIOS_GCAL_TOKEN_FILE") or "",
@@ -49,17 +45,7 @@ class CalendarClient:
         token_file = next((p for p in token_candidates if p and os.path.exists(p)), None)
         if not token_file:
             raise RuntimeError("Google token not found; set HELIOS_GCAL_TOKEN_FILE or place helios_token_rw.json nearby")
-        scopes = ["https://www.googleapis.com/auth/calendar"]
-        creds = Credentials.from_authorized_user_file(token_file, scopes)
-        if not creds.valid:
-            if creds.expired and creds.refresh_token:
-                creds.refresh(GoogleRequest())
-                with open(token_file, "w", encoding="utf-8") as f:
-                    f.write(creds.to_json())
-            else:
-                raise RuntimeError("Invalid/expired Google credentials")
-        self._svc = build("calendar", "v3", credentials=creds)
-        return self._svc
+        return get_google_provider(token_file).service("calendar", "v3", ["https://www.googleapis.com/auth/calendar"])
 
     @staticmethod
     def _rfc3339(d: dt.datetime) -> str:
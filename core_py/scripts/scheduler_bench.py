@@ -0,0 +1,304 @@
+# core_py/scripts/scheduler_bench.py
+"""
+Offline benchmark + quality harness for the block scheduler.
+
+Generates deterministic synthetic inputs (fixed-event calendars and ClickUp-shaped
+task groups run through _adapt_grouped_for_scheduler) at several scales, runs the
+planner with stub fetchers and reports per scenario:
+  - runtime (median of --repeat runs) and peak traced memory (tracemalloc)
+  - blocks placed, block minutes, demand minutes, coverage
+  - constraint violations (fixed-event overlap, block overlap, duration band,
+    placement bucket / personal window, daily caps, weekly targets, systems
+    minimum, work on weekends)
+Also micro-benchmarks subtract_busy and TaskQueue.take (the allocate() hot path).
+
+The committed baseline (scheduler_bench_baseline.json, greedy at the default scales)
+is compared on every run that finds it: a scenario regresses when it is slower or
+peaks higher than baseline × (1 + --runtime-tolerance), places fewer minutes or has
+more violations; micro-benchmarks use the same tolerance. Regressions are printed
+either way, --compare also exits 1 on them. Runtimes depend on the machine, so
+refresh the baseline with --save-baseline on the machine you compare on.
+
+Usage (Windows CMD):
+  (venv) C:\\Helios> set PYTHONPATH=%CD%
+  (venv) C:\\Helios> python -m core_py.scripts.scheduler_bench
+  (venv) C:\\Helios> python -m core_py.scripts.scheduler_bench --save-baseline
+  (venv) C:\\Helios> python -m core_py.scripts.scheduler_bench --compare
+  # Options
+  --scales 10x7,1000x30   tasks x days (default 10x7,100x14,1000x30,10000x90)
+  --solvers greedy,ilp    ilp needs scipy; skipped above --ilp-max-tasks
+  --repeat 3              runs per scenario (median runtime)
+  --baseline PATH         default core_py/scripts/scheduler_bench_baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+from core_py.scheduler import helios_block_scheduler as hbs
+from core_py.scheduler.helios_block_scheduler import BlockType
+
+DEFAULT_SCALES = "10x7,100x14,1000x30,10000x90"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "scheduler_bench_baseline.json")
+START = dt.date(2025, 1, 6)  # a Monday, so windows are comparable run to run
+
+BUCKET_KEYS = {
+    BlockType.CLIENT_DEEP_WORK: "clients",
+    BlockType.SYSTEMS_DEVELOPMENT: "systems",
+    BlockType.MARKETING_CREATIVE: "marketing",
+    BlockType.ADMIN_PROCESSING: "admin",
+    BlockType.PERSONAL: "personal",
+}
+BUCKET_MIX = [  # share of tasks per bucket
+    (BlockType.CLIENT_DEEP_WORK, 0.35),
+    (BlockType.SYSTEMS_DEVELOPMENT, 0.15),
+    (BlockType.MARKETING_CREATIVE, 0.10),
+    (BlockType.ADMIN_PROCESSING, 0.30),
+    (BlockType.PERSONAL, 0.10),
+]
+
+
+# ---------------- Synthetic inputs ----------------
+
+def synth_grouped(n_tasks: int, num_days: int, seed: int) -> Dict[str, List[Dict[str, Any]]]:
+    """ClickUp-shaped plain dicts (what ClickUpClient.fetch_tasks_grouped returns)."""
+    r = random.Random(seed)
+    out: Dict[str, List[Dict[str, Any]]] = {v: [] for v in BUCKET_KEYS.values()}
+    start_ms = int(dt.datetime.combine(START, dt.time(0, 0), tzinfo=dt.timezone.utc).timestamp() * 1000)
+    i = 0
+    for bt, share in BUCKET_MIX:
+        for _ in range(max(1, int(round(n_tasks * share)))):
+            est = r.choice([15, 30, 45, 60, 90, 120, 180, 240]) * 60000
+            due = start_ms + r.randint(0, num_days + 7) * 86400000 if r.random() < 0.6 else None
+            out[BUCKET_KEYS[bt]].append({
+                "id": f"t{i}",
+                "name": f"Synthetic task {i}",
+                "priority": r.choice([None, 1, 2, 2, 3, 3, 4]),
+                "due_date": due,
+                "time_estimate": est,
+                "time_spent": int(est * r.choice([0, 0, 0.25, 0.5])),
+            })
+            i += 1
+    return out
+
+
+def synth_fixed(num_days: int, seed: int, per_day: Tuple[int, int] = (0, 6)) -> Dict[dt.date, List[Dict[str, dt.datetime]]]:
+    r = random.Random(seed + 1)
+    out: Dict[dt.date, List[Dict[str, dt.datetime]]] = {}
+    for d in range(num_days):
+        day = START + dt.timedelta(days=d)
+        evs = []
+        for _ in range(r.randint(*per_day)):
+            s = dt.datetime.combine(day, dt.time(r.randint(7, 19), r.choice([0, 15, 30, 45])), tzinfo=dt.timezone.utc)
+            evs.append({"start": s, "end": s + dt.timedelta(minutes=r.choice([15, 30, 45, 60, 90, 120]))})
+        out[day] = evs
+    return out
+
+
+# ---------------- Quality checks ----------------
+
+def violations(plan: hbs.Plan, cfg: hbs.SchedulerConfig, fixed: Dict[dt.date, list], num_days: int) -> Dict[str, int]:
+    v = {k: 0 for k in ("fixed_overlap", "block_overlap", "duration", "placement", "daily_cap",
+                        "weekly_target", "systems_min", "weekend_work")}
+    targets = hbs.scaled_weekly_targets(cfg, num_days)
+    totals = {bt: 0 for bt in BlockType}
+    for d in plan.days:
+        blocks = sorted(d.blocks, key=lambda e: e.start)
+        for a, b in zip(blocks, blocks[1:]):
+            if b.start < a.end:
+                v["block_overlap"] += 1
+        per_type = {bt: 0 for bt in BlockType}
+        for ev in blocks:
+            bt = ev.block_type
+            per_type[bt] += 1
+            totals[bt] += 1
+            mins = int((ev.end - ev.start).total_seconds() // 60)
+            rule = cfg.rules[bt]
+            if not (rule.duration_min <= mins <= rule.duration_max):
+                v["duration"] += 1
+            if any(ev.start < f["end"] and f["start"] < ev.end for f in fixed.get(d.date, [])):
+                v["fixed_overlap"] += 1
+            if bt == BlockType.PERSONAL:
+                if not hbs.in_personal_window(cfg, d.date, hbs.Interval(ev.start, ev.end)):
+                    v["placement"] += 1
+            else:
+                if d.date.weekday() >= 5:
+                    v["weekend_work"] += 1
+                if hbs.bucket_for_time(ev.start.time()) not in rule.placements and "gaps" not in rule.placements:
+                    v["placement"] += 1
+            if bt == BlockType.SYSTEMS_DEVELOPMENT and mins < cfg.hard.min_contiguous_minutes_for_systems:
+                v["systems_min"] += 1
+        for bt, cap in cfg.hard.cap_blocks_per_day.items():
+            if per_type[bt] > cap:
+                v["daily_cap"] += per_type[bt] - cap
+    for bt, n in totals.items():
+        if n > targets.get(bt, n):
+            v["weekly_target"] += n - targets[bt]
+    return v
+
+
+# ---------------- Runner ----------------
+
+def run_scenario(n_tasks: int, num_days: int, solver: str, repeat: int, seed: int) -> Dict[str, Any]:
+    cfg = hbs.load_config(None)
+    grouped = synth_grouped(n_tasks, num_days, seed)
+    fixed = synth_fixed(num_days, seed)
+    fetcher = lambda day: fixed.get(day, [])
+
+    times: List[float] = []
+    plan = None
+    demand = 0
+    for _ in range(max(1, repeat)):
+        tasks = hbs._adapt_grouped_for_scheduler(grouped)  # fresh: planning consumes Task minutes
+        demand = sum(t.remaining_minutes for lst in tasks.values() for t in lst)
+        t0 = time.perf_counter()
+        plan = hbs.plan_week(START, num_days, cfg, fetcher, tasks, solver=solver)
+        times.append(time.perf_counter() - t0)
+
+    # Separate traced run: tracemalloc slows allocation-heavy code too much to time under it
+    tasks = hbs._adapt_grouped_for_scheduler(grouped)
+    tracemalloc.start()
+    hbs.plan_week(START, num_days, cfg, fetcher, tasks, solver=solver)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    blocks = [ev for d in plan.days for ev in d.blocks]
+    block_minutes = sum(int((ev.end - ev.start).total_seconds() // 60) for ev in blocks)
+    viol = violations(plan, cfg, fixed, num_days)
+    return {
+        "scenario": f"{solver}:{n_tasks}x{num_days}",
+        "tasks": n_tasks,
+        "days": num_days,
+        "solver": solver,
+        "runtime_ms": round(statistics.median(times) * 1000, 2),
+        "peak_kb": round(peak / 1024, 1),
+        "blocks": len(blocks),
+        "block_minutes": block_minutes,
+        "demand_minutes": demand,
+        "coverage": round(min(block_minutes, demand) / demand, 4) if demand else 1.0,
+        "violations": viol,
+        "violations_total": sum(viol.values()),
+    }
+
+
+def micro_benchmarks(seed: int) -> Dict[str, float]:
+    r = random.Random(seed)
+    base = dt.datetime.combine(START, dt.time(0, 0), tzinfo=dt.timezone.utc)
+    free = hbs.Interval(base, base + dt.timedelta(days=90))
+    busies = [hbs.Interval(s, s + dt.timedelta(minutes=30))
+              for s in (base + dt.timedelta(minutes=r.randint(0, 90 * 1440)) for _ in range(5000))]
+    t0 = time.perf_counter()
+    hbs.subtract_busy(free, busies)
+    sub_ms = (time.perf_counter() - t0) * 1000
+
+    tasks = [hbs.Task(id=str(i), title="t", block_type=BlockType.ADMIN_PROCESSING,
+                      remaining_minutes=r.randint(5, 120), priority=r.choice([None, 1, 2, 3]))
+             for i in range(10000)]
+    q = hbs.TaskQueue(tasks)
+    t0 = time.perf_counter()
+    while q:
+        q.take(60)
+    take_ms = (time.perf_counter() - t0) * 1000
+    return {"subtract_busy_5000_ms": round(sub_ms, 2), "taskqueue_drain_10000_ms": round(take_ms, 2)}
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float,
+            micro: Dict[str, float] | None = None) -> List[str]:
+    base = {r["scenario"]: r for r in baseline.get("results", [])}
+    problems = []
+    for r in results:
+        b = base.get(r["scenario"])
+        if not b:
+            continue
+        if r["runtime_ms"] > b["runtime_ms"] * (1 + tolerance) and r["runtime_ms"] - b["runtime_ms"] > 5:
+            problems.append(f"{r['scenario']}: runtime {r['runtime_ms']}ms vs baseline {b['runtime_ms']}ms")
+        if r["peak_kb"] > b["peak_kb"] * (1 + tolerance) and r["peak_kb"] - b["peak_kb"] > 64:
+            problems.append(f"{r['scenario']}: peak {r['peak_kb']} KiB vs baseline {b['peak_kb']} KiB")
+        if r["block_minutes"] < b["block_minutes"]:
+            problems.append(f"{r['scenario']}: block minutes {r['block_minutes']} < baseline {b['block_minutes']}")
+        if r["violations_total"] > b["violations_total"]:
+            problems.append(f"{r['scenario']}: violations {r['violations']} (baseline {b['violations_total']})")
+    for name, ms in (micro or {}).items():
+        b_ms = baseline.get("micro", {}).get(name)
+        if b_ms is not None and ms > b_ms * (1 + tolerance) and ms - b_ms > 5:
+            problems.append(f"{name}: {ms}ms vs baseline {b_ms}ms")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline block scheduler benchmark")
+    ap.add_argument("--scales", default=DEFAULT_SCALES, help="Comma-separated TASKSxDAYS")
+    ap.add_argument("--solvers", default="greedy", help="Comma-separated: greedy,ilp")
+    ap.add_argument("--ilp-max-tasks", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--compare", action="store_true", help="Exit 1 on regressions (and when there is no baseline)")
+    ap.add_argument("--runtime-tolerance", type=float, default=0.5, help="Allowed slowdown vs baseline (0.5 = +50%%)")
+    ap.add_argument("--json", action="store_true", help="Print the full JSON report")
+    args = ap.parse_args()
+
+    results = []
+    for scale in [s for s in args.scales.split(",") if s.strip()]:
+        n_tasks, num_days = (int(x) for x in scale.lower().split("x"))
+        for solver in [s.strip() for s in args.solvers.split(",") if s.strip()]:
+            if solver == "ilp" and n_tasks > args.ilp_max_tasks:
+                continue
+            res = run_scenario(n_tasks, num_days, solver, args.repeat, args.seed)
+            results.append(res)
+            if not args.json:
+                print(f"{res['scenario']:<18} {res['runtime_ms']:>9.2f} ms  {res['peak_kb']:>9.1f} KiB  "
+                      f"blocks={res['blocks']:<4} minutes={res['block_minutes']:<6} "
+                      f"coverage={res['coverage']:.2%}  violations={res['violations_total']}")
+
+    report = {
+        "generated_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+        "micro": micro_benchmarks(args.seed),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report["micro"]))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.runtime_tolerance, report["micro"])
+        known = {r["scenario"] for r in baseline.get("results", [])}
+        missing = [r["scenario"] for r in results if r["scenario"] not in known]
+        if missing:
+            print(f"Not in baseline (not compared): {', '.join(missing)}")
+        if (baseline.get("machine"), baseline.get("python")) != (report["machine"], report["python"]):
+            print(f"Baseline is from {baseline.get('machine')} / Python {baseline.get('python')}; "
+                  "runtime comparisons are indicative only")
+        for p in problems:
+            print("REGRESSION", p)
+        if problems and args.compare:
+            sys.exit(1)
+        if not problems:
+            print(f"No regressions vs baseline ({os.path.basename(args.baseline)}).")
+    elif args.compare:
+        raise SystemExit(f"No baseline at {args.baseline}; run with --save-baseline first.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# core_py/services/client_matcher.py
+# Attendee email -> client matching for calendar views, resolved in process.
+#
+# The index (client emails, exact domains, wildcard domains, client names) is
+# loaded with one query and kept for INDEX_TTL_S; the contacts routes
+# invalidate it when they change clients/emails/domains. Matching a whole
+# day's attendees is then dictionary lookups only.
+
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+
+from core_py.db.session import db_session
+
+INDEX_TTL_S = float(os.getenv("HELIOS_CLIENT_INDEX_TTL_S", "300"))
+
+_email_re = re.compile(r"^\s*([^@\s]+)@([^@\s]+)\s*$")
+
+
+def normalize_email(addr: str) -> str:
+    """lowercase + strip '+tag' (same rule as allowlist_client)."""
+    addr = (addr or "").strip().lower()
+    m = _email_re.match(addr)
+    if not m:
+        return addr
+    return f"{m.group(1).split('+', 1)[0]}@{m.group(2)}"
+
+
+def _domain_of(addr: str) -> str:
+    m = _email_re.match(addr or "")
+    return m.group(2).lower().strip() if m else ""
+
+
+class ClientMatcher:
+    def __init__(self, ttl_s: float = INDEX_TTL_S):
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._names: Dict[str, str] = {}
+        self._emails: Dict[str, List[str]] = {}
+        self._exact: Dict[str, List[str]] = {}
+        self._wild: Dict[str, List[str]] = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _load(self):
+        with db_session() as s:
+            rows = s.execute(text("""
+                SELECT c.id AS client_id, c.name, 'email' AS kind, lower(e.email) AS value, FALSE AS wildcard
+                FROM clients c JOIN client_emails e ON e.client_id = c.id
+                UNION ALL
+                SELECT c.id, c.name, 'domain', lower(d.domain), coalesce(d.wildcard, FALSE)
+                FROM clients c JOIN client_domains d ON d.client_id = c.id
+            """)).mappings().all()
+        names: Dict[str, str] = {}
+        emails: Dict[str, List[str]] = {}
+        exact: Dict[str, List[str]] = {}
+        wild: Dict[str, List[str]] = {}
+        for r in rows:
+            names[r["client_id"]] = r["name"]
+            value = (r["value"] or "").strip()
+            if not value:
+                continue
+            if r["kind"] == "email":
+                target = emails
+                value = normalize_email(value)
+            else:
+                target = wild if r["wildcard"] else exact
+                value = value.lstrip("*.").lstrip("@")
+            ids = target.setdefault(value, [])
+            if r["client_id"] not in ids:
+                ids.append(r["client_id"])
+        self._names, self._emails, self._exact, self._wild = names, emails, exact, wild
+        self._loaded_at = time.monotonic()
+
+    def _ensure(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl_s:
+            self._load()
+
+    def _match_one(self, email: str) -> List[dict]:
+        e = normalize_email(email)
+        if not e:
+            return []
+        out: List[dict] = []
+        seen = set()
+
+        def _add(ids: Iterable[str], how: str, value: str):
+            for cid in ids:
+                if cid not in seen:
+                    seen.add(cid)
+                    out.append({"client_id": cid, "name": self._names.get(cid), "email": email,
+                                "matched_by": how, "value": value})
+
+        _add(self._emails.get(e, []), "email", e)
+        dom = _domain_of(e)
+        _add(self._exact.get(dom, []), "domain", dom)
+        # wildcard: the domain itself or any subdomain (a.b.client.com -> b.client.com, client.com, ...)
+        parts = dom.split(".")
+        for i in range(len(parts) - 1):
+            suffix = ".".join(parts[i:])
+            _add(self._wild.get(suffix, []), "wildcard_domain", suffix)
+        return out
+
+    def match_many(self, emails: Iterable[str]) -> Dict[str, List[dict]]:
+        """{email: [match, ...]} for every distinct email given."""
+        with self._lock:
+            self._ensure()
+            return {em: self._match_one(em) for em in dict.fromkeys(e for e in emails if e)}
+
+    def clients_for(self, emails: Iterable[str], matches: Dict[str, List[dict]]) -> List[dict]:
+        """Per-event view: one entry per client across the event's attendees."""
+        out: List[dict] = []
+        seen = set()
+        for em in emails:
+            for m in matches.get(em, []):
+                if m["client_id"] not in seen:
+                    seen.add(m["client_id"])
+                    out.append(m)
+        return out
+
+
+_matcher = ClientMatcher()
+
+
+def get_client_matcher() -> ClientMatcher:
+    return _matcher
@@ -0,0 +1,356 @@
+# core_py/services/metrics.py
+# Minimal in-process Prometheus registry + per-request instrumentation context.
+#
+# - Counter / Gauge / Histogram with label support, rendered in the Prometheus
+#   text exposition format by render() (served at /metrics).
+# - RequestStats lives in a ContextVar set by the request middleware; Starlette
+#   copies the context into the threadpool for sync routes, so DB hooks and
+#   outbound HTTP calls made while serving a request can attribute time to it.
+# - instrument_http() wraps the transports used across the codebase (requests,
+#   httpx, httplib2 for googleapiclient) and records time per upstream.
+
+import os
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+# -----------------------------------------------------------------------------
+# Registry
+# -----------------------------------------------------------------------------
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_fmt_labels(self.label_names, k)} {_fmt_num(v)}" for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_fmt_labels(self.label_names, k)} {_fmt_num(v)}" for k, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket_counts, sum, count]
+
+    def observe(self, value: float, **labels):
+        k = self._key(labels)
+        with self._lock:
+            s = self._series.get(k)
+            if s is None:
+                s = self._series[k] = [[0] * len(self.buckets), 0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[0][i] += 1
+                    break
+            s[1] += value
+            s[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._series.items()]
+        out = self.header()
+        for k, (counts, total, n) in items:
+            cum = 0
+            for b, c in zip(self.buckets, counts):
+                cum += c
+                le = 'le="' + _fmt_num(b) + '"'
+                out.append(f"{self.name}_bucket{_fmt_labels(self.label_names, k, le)} {cum}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.label_names, k)} {_fmt_num(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.label_names, k)} {n}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn: Callable[[], List[str]]):
+        """fn() returns ready-made exposition lines, computed at scrape time."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        for fn in self._collectors:
+            try:
+                lines.extend(fn())
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "helios_http_requests_total", "HTTP requests served.", ("method", "route", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "helios_http_request_duration_seconds", "End-to-end request latency.", ("method", "route")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "helios_http_requests_in_flight", "Requests currently being served.", ("route",)))
+REQUEST_DB_SECONDS = REGISTRY.register(Histogram(
+    "helios_http_request_db_seconds", "DB time spent per request.", ("route",)))
+REQUEST_DB_QUERIES = REGISTRY.register(Histogram(
+    "helios_http_request_db_queries", "DB queries issued per request.", ("route",), buckets=COUNT_BUCKETS))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "helios_db_query_duration_seconds", "Individual DB statement latency."))
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    "helios_upstream_request_duration_seconds", "Outbound HTTP latency per upstream and calling route.",
+    ("upstream", "route")))
+UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    "helios_upstream_requests_total", "Outbound HTTP requests per upstream.", ("upstream", "status")))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# -----------------------------------------------------------------------------
+# Per-request context
+# -----------------------------------------------------------------------------
+@dataclass
+class RequestStats:
+    route: str
+    db_seconds: float = 0.0
+    db_queries: int = 0
+    upstream_seconds: Dict[str, float] = field(default_factory=dict)
+    upstream_calls: Dict[str, int] = field(default_factory=dict)
+    statements: Dict[str, int] = field(default_factory=dict)  # fingerprint -> count (query audit)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("helios_request_stats", default=None)
+
+
+def begin_request(route: str):
+    """Returns a token for end_request(); call from the HTTP middleware."""
+    return _current.set(RequestStats(route=route))
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_request() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def record_db(seconds: float):
+    DB_QUERY_SECONDS.observe(seconds)
+    stats = _current.get()
+    if stats is not None:
+        stats.db_seconds += seconds
+        stats.db_queries += 1
+
+
+def observe_request(stats: RequestStats, method: str, status: int, seconds: float):
+    HTTP_REQUESTS.inc(method=method, route=stats.route, status=str(status))
+    HTTP_LATENCY.observe(seconds, method=method, route=stats.route)
+    REQUEST_DB_SECONDS.observe(stats.db_seconds, route=stats.route)
+    REQUEST_DB_QUERIES.observe(stats.db_queries, route=stats.route)
+
+
+# -----------------------------------------------------------------------------
+# Outbound HTTP
+# -----------------------------------------------------------------------------
+def _ollama_host() -> str:
+    raw = os.getenv("OLLAMA_HOST") or "localhost:11434"
+    return urlsplit(raw if "://" in raw else f"http://{raw}").netloc.lower()
+
+
+UPSTREAM_HOSTS: List[Tuple[str, str]] = [
+    ("clickup.com", "clickup"),
+    ("googleapis.com", "google"),
+    ("google.com", "google"),
+    ("starlingbank.com", "starling"),
+    ("reclaim.ai", "reclaim"),
+    ("toggl.com", "toggl"),
+    ("todoist.com", "todoist"),
+]
+
+
+def upstream_for_url(url) -> str:
+    netloc = urlsplit(str(url)).netloc.lower()
+    if netloc == _ollama_host() or netloc.endswith(":11434"):
+        return "ollama"
+    host = netloc.split(":", 1)[0]
+    for suffix, name in UPSTREAM_HOSTS:
+        if host == suffix or host.endswith("." + suffix):
+            return name
+    if host in ("localhost", "127.0.0.1"):
+        return "self"
+    return "other"
+
+
+def record_upstream(upstream: str, seconds: float, status):
+    stats = _current.get()
+    route = stats.route if stats is not None else "background"
+    UPSTREAM_LATENCY.observe(seconds, upstream=upstream, route=route)
+    UPSTREAM_REQUESTS.inc(upstream=upstream, status=str(status))
+    if stats is not None:
+        stats.upstream_seconds[upstream] = stats.upstream_seconds.get(upstream, 0.0) + seconds
+        stats.upstream_calls[upstream] = stats.upstream_calls.get(upstream, 0) + 1
+
+
+_http_instrumented = False
+
+
+def instrument_http():
+    """Wrap requests/httpx/httplib2 transports once. Safe to call repeatedly."""
+    global _http_instrumented
+    if _http_instrumented:
+        return
+    _http_instrumented = True
+
+    try:
+        import requests
+
+        _orig_send = requests.Session.send
+
+        def _send(self, request, **kwargs):
+            t0 = perf_counter()
+            status = "error"
+            try:
+                resp = _orig_send(self, request, **kwargs)
+                status = resp.status_code
+                return resp
+            finally:
+                record_upstream(upstream_for_url(request.url), perf_counter() - t0, status)
+
+        requests.Session.send = _send
+    except ImportError:
+        pass
+
+    try:
+        import httpx
+
+        _orig_sync = httpx.Client.send
+        _orig_async = httpx.AsyncClient.send
+
+        def _hsend(self, request, **kwargs):
+            t0 = perf_counter()
+            status = "error"
+            try:
+                resp = _orig_sync(self, request, **kwargs)
+                status = resp.status_code
+                return resp
+            finally:
+                record_upstream(upstream_for_url(request.url), perf_counter() - t0, status)
+
+        async def _asend(self, request, **kwargs):
+            t0 = perf_counter()
+            status = "error"
+            try:
+                resp = await _orig_async(self, request, **kwargs)
+                status = resp.status_code
+                return resp
+            finally:
+                record_upstream(upstream_for_url(request.url), perf_counter() - t0, status)
+
+        httpx.Client.send = _hsend
+        httpx.AsyncClient.send = _asend
+    except ImportError:
+        pass
+
+    try:
+        import httplib2  # googleapiclient transport
+
+        _orig_h2 = httplib2.Http.request
+
+        def _h2request(self, uri, *args, **kwargs):
+            t0 = perf_counter()
+            status = "error"
+            try:
+                resp, content = _orig_h2(self, uri, *args, **kwargs)
+                status = getattr(resp, "status", "error")
+                return resp, content
+            finally:
+                record_upstream(upstream_for_url(uri), perf_counter() - t0, status)
+
+        httplib2.Http.request = _h2request
+    except ImportError:
+        pass
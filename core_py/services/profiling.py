@@ -0,0 +1,155 @@
+# core_py/services/profiling.py
+# Opt-in request profiling with a wall-clock stack sampler.
+#
+# A background thread snapshots every thread's stack (sys._current_frames) at a
+# fixed interval while a profiled request runs, skipping idle threads. That covers
+# both async routes (event loop thread) and sync routes (threadpool workers), which
+# cProfile can't do from the middleware. Output is in "folded" format
+# (frame;frame;frame count) — load it in speedscope or pipe it to flamegraph.pl.
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+PROFILE_DIR = os.getenv("HELIOS_PROFILE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "profiles")
+)
+SAMPLE_RATE = float(os.getenv("HELIOS_PROFILE_SAMPLE_RATE", "0"))  # 0..1 of requests
+MIN_MS = int(os.getenv("HELIOS_PROFILE_MIN_MS", "500"))            # keep sampled profiles above this
+INTERVAL_S = float(os.getenv("HELIOS_PROFILE_INTERVAL_MS", "5")) / 1000.0
+KEEP = int(os.getenv("HELIOS_PROFILE_KEEP", "50"))
+
+_ID_RE = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+# Leaf frames that mean "this thread is parked", not doing work for anyone
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socketserver.py", "serve_forever"),
+    ("change_feed.py", "_wait_for_notifies"),  # LISTEN loop parked in select()
+}
+
+_active_lock = threading.Lock()  # one sampler at a time keeps overhead bounded
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+class StackSampler:
+    def __init__(self, interval: float = INTERVAL_S):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.total = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="helios-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        return self.samples
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own or _is_idle(frame):
+                    continue
+                stack: List[str] = []
+                f = frame
+                while f is not None:
+                    stack.append(_frame_label(f))
+                    f = f.f_back
+                stack.append(names.get(tid, f"thread-{tid}"))
+                self.samples[";".join(reversed(stack))] += 1
+            self.total += 1
+
+
+def should_sample() -> bool:
+    if SAMPLE_RATE <= 0:
+        return False
+    import random
+    return random.random() < SAMPLE_RATE
+
+
+def try_start() -> Optional[StackSampler]:
+    """Start a sampler unless another profiled request is already running."""
+    if not _active_lock.acquire(blocking=False):
+        return None
+    sampler = StackSampler()
+    sampler.start()
+    return sampler
+
+
+def finish(sampler: StackSampler) -> Counter:
+    try:
+        return sampler.stop()
+    finally:
+        _active_lock.release()
+
+
+def save_profile(samples: Counter, meta: Dict) -> Optional[str]:
+    """Write <id>.folded + <id>.json; returns the profile id."""
+    if not samples:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", meta.get("route") or "route").strip("_")[:60] or "root"
+    pid = f"{time.strftime('%Y%m%d-%H%M%S')}_{(meta.get('rid') or '')[:8]}_{slug}"
+    with open(os.path.join(PROFILE_DIR, pid + ".folded"), "w", encoding="utf-8") as f:
+        for stack, n in samples.most_common():
+            f.write(f"{stack} {n}\n")
+    with open(os.path.join(PROFILE_DIR, pid + ".json"), "w", encoding="utf-8") as f:
+        json.dump({"id": pid, "samples": sum(samples.values()), **meta}, f)
+    _prune()
+    return pid
+
+
+def _prune():
+    metas = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(".json"))
+    for name in metas[:-KEEP] if KEEP > 0 else []:
+        for ext in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name[:-5] + ext))
+            except OSError:
+                pass
+
+
+def list_profiles() -> List[Dict]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    out = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                out.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return out
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    if not _ID_RE.match(profile_id or ""):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + ".folded")
+    return path if os.path.exists(path) else None
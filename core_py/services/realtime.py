@@ -0,0 +1,192 @@
+# core_py/services/realtime.py
+# Topic-based WebSocket fan-out with a bounded send queue + sender task per client.
+#
+# publish() encodes a message once per topic and only enqueues it (never awaits a
+# socket), so one slow client can't stall the others. When a client's queue is full
+# the oldest pending message is dropped; "coalesce" topics (ticks) keep at most one
+# pending message per client. Clients whose socket stalls past the send timeout are
+# disconnected.
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from fastapi import WebSocket
+
+logger = logging.getLogger("helios.realtime")
+
+TOPICS = ("ticks", "tasks", "fss", "calendar")
+COALESCE_TOPICS = {"ticks"}
+
+WS_QUEUE_MAX = int(os.getenv("HELIOS_WS_QUEUE_MAX", "100"))
+WS_SEND_TIMEOUT_S = float(os.getenv("HELIOS_WS_SEND_TIMEOUT_S", "5"))
+
+
+def known_topics(raw: Optional[Iterable[str] | str]) -> Set[str]:
+    """Accept 'ticks,tasks' or ['ticks', 'tasks']; only known topic names are kept (may be empty)."""
+    if raw is None:
+        return set()
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    elif not isinstance(raw, (list, tuple, set)):
+        return set()
+    return {str(t).strip().lower() for t in raw if str(t).strip()} & set(TOPICS)
+
+
+def parse_topics(raw: Optional[Iterable[str] | str]) -> Set[str]:
+    """Topics for a new connection: known names from `raw`, or all topics if none are given/known."""
+    return known_topics(raw) or set(TOPICS)
+
+
+class _Client:
+    def __init__(self, ws: WebSocket, topics: Set[str]):
+        self.ws = ws
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_QUEUE_MAX)
+        self.pending_coalesced: Set[str] = set()
+        self.dropped = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.sender: Optional[asyncio.Task] = None
+        self.closed = False
+
+
+class RealtimeHub:
+    def __init__(self, max_clients: int):
+        self.max_clients = max_clients
+        self._clients: Dict[WebSocket, _Client] = {}
+        self._seq = 0
+        self.published_total: Dict[str, int] = {t: 0 for t in TOPICS}
+        self.dropped_total = 0
+        self.coalesced_total = 0
+        self.evicted_total = 0
+
+    # ----- connection lifecycle -----
+    def is_full(self) -> bool:
+        return len(self._clients) >= self.max_clients
+
+    def register(self, ws: WebSocket, topics: Set[str]) -> _Client:
+        client = _Client(ws, topics)
+        client.sender = asyncio.create_task(self._sender(client))
+        self._clients[ws] = client
+        return client
+
+    async def unregister(self, ws: WebSocket):
+        client = self._clients.pop(ws, None)
+        if not client:
+            return
+        client.closed = True
+        if client.sender and not client.sender.done():
+            client.sender.cancel()
+            try:
+                await client.sender
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def subscribe(self, ws: WebSocket, topics: Iterable[str] | str):
+        """Add known topics only; unknown names (or an empty list) change nothing."""
+        client = self._clients.get(ws)
+        if client:
+            client.topics |= known_topics(topics)
+
+    def unsubscribe(self, ws: WebSocket, topics: Iterable[str] | str):
+        client = self._clients.get(ws)
+        if client:
+            client.topics -= known_topics(topics)
+
+    async def close_all(self):
+        for ws in list(self._clients):
+            await self.unregister(ws)
+            try:
+                await ws.close(code=1001)
+            except Exception:
+                pass
+
+    # ----- publish / send -----
+    def publish(self, topic: str, data: dict) -> int:
+        """Encode once and enqueue for every subscriber. Returns number of clients enqueued."""
+        self._seq += 1
+        msg = json.dumps({
+            "stream": topic,
+            "seq": self._seq,
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "data": data,
+        })
+        self.published_total[topic] = self.published_total.get(topic, 0) + 1
+
+        delivered = 0
+        for client in list(self._clients.values()):
+            if client.closed or topic not in client.topics:
+                continue
+            if topic in COALESCE_TOPICS and topic in client.pending_coalesced:
+                client.coalesced += 1
+                self.coalesced_total += 1
+                continue
+            if client.queue.full():
+                try:
+                    old_topic, _ = client.queue.get_nowait()
+                    client.pending_coalesced.discard(old_topic)
+                except asyncio.QueueEmpty:
+                    pass
+                client.dropped += 1
+                self.dropped_total += 1
+            client.queue.put_nowait((topic, msg))
+            if topic in COALESCE_TOPICS:
+                client.pending_coalesced.add(topic)
+            delivered += 1
+        return delivered
+
+    def _evict(self, client: _Client, reason: str):
+        logger.warning({"ws_evict": reason, "dropped": client.dropped})
+        self.evicted_total += 1
+        client.closed = True
+        self._clients.pop(client.ws, None)
+        if client.sender and not client.sender.done() and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        asyncio.get_running_loop().create_task(self._close_quietly(client.ws))
+
+    @staticmethod
+    async def _close_quietly(ws: WebSocket):
+        try:
+            await ws.close(code=1013)  # try again later
+        except Exception:
+            pass
+
+    async def _sender(self, client: _Client):
+        try:
+            while True:
+                topic, msg = await client.queue.get()
+                client.pending_coalesced.discard(topic)
+                try:
+                    await asyncio.wait_for(client.ws.send_text(msg), timeout=WS_SEND_TIMEOUT_S)
+                except asyncio.TimeoutError:
+                    self._evict(client, "send_timeout")
+                    return
+                except Exception:
+                    self._clients.pop(client.ws, None)
+                    client.closed = True
+                    return
+                client.sent += 1
+        except asyncio.CancelledError:
+            pass
+
+    # ----- metrics -----
+    def stats(self) -> dict:
+        clients = list(self._clients.values())
+        depths = [c.queue.qsize() for c in clients]
+        by_topic = {t: sum(1 for c in clients if t in c.topics) for t in TOPICS}
+        return {
+            "clients": len(clients),
+            "max_clients": self.max_clients,
+            "queue_max": WS_QUEUE_MAX,
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths) if depths else 0,
+            "subscribers_by_topic": by_topic,
+            "published_total": dict(self.published_total),
+            "dropped_total": self.dropped_total,
+            "coalesced_total": self.coalesced_total,
+            "evicted_total": self.evicted_total,
+        }
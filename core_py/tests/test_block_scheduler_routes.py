@@ -0,0 +1,90 @@
+"""
+/api/schedule/reflow-now and /api/schedule/reflow/notify through the real router,
+with the scheduler service and Google push state faked in memory.
+
+    python -m pytest core_py/tests
+"""
+
+import datetime as dt
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core_py.db.calendar_events_pg import MemoryEventStore
+from core_py.integrations.calendar_sync import CalendarSync
+from core_py.routes import block_scheduler_routes as routes
+
+
+class FakeService:
+    suggestions_calendar_id = "suggestions@group.calendar.google.com"
+
+
+class FakeIndex:
+    def __init__(self):
+        self.invalidated = 0
+
+    def invalidate(self):
+        self.invalidated += 1
+
+
+@pytest.fixture
+def env(monkeypatch):
+    calls = []
+
+    def fake_reflow_now(service, **kw):
+        calls.append(kw)
+        return {"status": "dry_run" if kw["dry_run"] else "reflowed"}
+
+    sync = CalendarSync(store=MemoryEventStore())
+    sync.store.update_state(FakeService.suggestions_calendar_id, channel_id="ch-1", channel_token="secret")
+    index = FakeIndex()
+    monkeypatch.setattr(routes, "get_service", lambda: FakeService())
+    monkeypatch.setattr(routes, "reflow_now", fake_reflow_now)
+    monkeypatch.setattr(routes, "get_calendar_sync", lambda: sync)
+    monkeypatch.setattr(routes, "get_block_index", lambda: index)
+
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+    return TestClient(app), calls, sync, index
+
+
+def test_reflow_now_parses_body(env):
+    client, calls, _sync, _index = env
+    res = client.post("/api/schedule/reflow-now",
+                      json={"now": "2026-10-19T10:30:00Z", "min_chunk": 20, "dry_run": True})
+    assert res.status_code == 200, res.text
+    assert res.json()["status"] == "dry_run"
+    assert calls == [{"now": dt.datetime(2026, 10, 19, 10, 30, tzinfo=dt.timezone.utc),
+                      "min_chunk": 20, "per_task_cap": 60, "dry_run": True}]
+
+
+def test_reflow_now_defaults_and_validation(env):
+    client, calls, _sync, _index = env
+    assert client.post("/api/schedule/reflow-now", json={}).status_code == 200
+    assert calls[-1]["now"] is None and calls[-1]["min_chunk"] == 15 and calls[-1]["dry_run"] is False
+    assert client.post("/api/schedule/reflow-now", json={"min_chunk": 0}).status_code == 422
+
+
+def test_notify_requires_known_channel_and_token(env):
+    client, _calls, _sync, index = env
+    headers = {"X-Goog-Channel-ID": "ch-1", "X-Goog-Resource-State": "exists"}
+    assert client.post("/api/schedule/reflow/notify", headers=headers).status_code == 403
+    assert client.post("/api/schedule/reflow/notify",
+                       headers={**headers, "X-Goog-Channel-Token": "wrong"}).status_code == 403
+    assert client.post("/api/schedule/reflow/notify",
+                       headers={**headers, "X-Goog-Channel-ID": "other", "X-Goog-Channel-Token": "secret"}
+                       ).status_code == 403
+    assert index.invalidated == 0
+
+    res = client.post("/api/schedule/reflow/notify", headers={**headers, "X-Goog-Channel-Token": "secret"})
+    assert res.status_code == 200 and res.json() == {"ok": True, "state": "exists"}
+    assert index.invalidated == 1
+
+
+def test_notify_sync_handshake_keeps_index(env):
+    client, _calls, _sync, index = env
+    res = client.post("/api/schedule/reflow/notify", headers={
+        "X-Goog-Channel-ID": "ch-1", "X-Goog-Channel-Token": "secret", "X-Goog-Resource-State": "sync"})
+    assert res.status_code == 200
+    assert index.invalidated == 0